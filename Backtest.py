@@ -14,6 +14,8 @@ import time
 import multiprocessing
 import pandas as pd
 from pbgui_func import pbdir, pbvenv, PBGDIR, config_pretty_str
+from pbgui_purefunc import write_json_atomic, load_ini_list, save_ini_list, save_ini, save_ini_defaults
+from Log import LogRotator
 import uuid
 from Base import Base
 from Config import Config
@@ -206,8 +208,7 @@ class BacktestItem(Base):
             dest.mkdir(parents=True)
         self._config.config_file = f'{self.file}.cfg'
         self._config.save_config()
-        with open(self.file, "w", encoding='utf-8') as f:
-            json.dump(bt_dict, f, indent=4)
+        write_json_atomic(self.file, bt_dict, indent=4)
 
     def remove(self):
         self.file.unlink(missing_ok=True)
@@ -314,15 +315,10 @@ class BacktestItem(Base):
 class BacktestQueue:
     def __init__(self):
         self.items = []
+        save_ini_defaults("backtest", {"autostart": "False", "cpu": "1"})
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("backtest"):
-            pb_config.add_section("backtest")
-            pb_config.set("backtest", "autostart", "False")
-            pb_config.set("backtest", "cpu", "1")
-            with open('pbgui.ini', 'w') as f:
-                pb_config.write(f)
-        self._autostart = eval(pb_config.get("backtest", "autostart"))
+        self._autostart = pb_config.getboolean("backtest", "autostart")
         self._cpu = int(pb_config.get("backtest", "cpu"))
         if self._autostart:
             self.run()
@@ -339,11 +335,7 @@ class BacktestQueue:
     @cpu.setter
     def cpu(self, new_cpu):
         self._cpu = new_cpu
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest", "cpu", str(self._cpu))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest", "cpu", str(self._cpu))
 
     @property
     def autostart(self):
@@ -352,11 +344,7 @@ class BacktestQueue:
     @autostart.setter
     def autostart(self, new_autostart):
         self._autostart = new_autostart
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest", "autostart", str(self._autostart))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest", "autostart", str(self._autostart))
         if self._autostart:
             self.run()
         else:
@@ -424,9 +412,7 @@ class BacktestQueue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/Backtest.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
@@ -525,20 +511,10 @@ class BacktestResults:
         self.backtests.remove(bt_result)
 
     def load_view_col(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if pb_config.has_option("backtest", "view_col"):
-            return eval(pb_config.get("backtest", "view_col"))
-        return []
+        return load_ini_list("backtest", "view_col")
 
     def save_view_col(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if not pb_config.has_section("backtest"):
-            pb_config.add_section("backtest")
-        pb_config.set("backtest", "view_col", f'{self.view_col}')
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini_list("backtest", "view_col", self.view_col)
 
     def setup_table(self):
         # Remove or add keys after selecting them
@@ -946,7 +922,7 @@ def main():
                 time.sleep(5)
             pb_config = configparser.ConfigParser()
             pb_config.read('pbgui.ini')
-            if not eval(pb_config.get("backtest", "autostart")):
+            if not pb_config.getboolean("backtest", "autostart"):
                 return
             if item.status() == "not started":
                 print(f'{datetime.datetime.now().isoformat(sep=" ", timespec="seconds")} Backtesting {item.file} started')
@@ -17,6 +17,8 @@ import time
 import multiprocessing
 import pandas as pd
 from pbgui_func import PBGDIR, pbvenv, pbdir, validateJSON, config_pretty_str, replace_special_chars
+from pbgui_purefunc import write_json_atomic, load_symbols_from_ini, save_ini, save_ini_defaults
+from Log import LogRotator
 import uuid
 from Base import Base
 from Config import Config
@@ -145,15 +147,10 @@ class BacktestMultiQueueItem():
 class BacktestMultiQueue:
     def __init__(self):
         self.items = []
+        save_ini_defaults("backtest_multi", {"autostart": "False", "cpu": "1"})
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("backtest_multi"):
-            pb_config.add_section("backtest_multi")
-            pb_config.set("backtest_multi", "autostart", "False")
-            pb_config.set("backtest_multi", "cpu", "1")
-            with open('pbgui.ini', 'w') as f:
-                pb_config.write(f)
-        self._autostart = eval(pb_config.get("backtest_multi", "autostart"))
+        self._autostart = pb_config.getboolean("backtest_multi", "autostart")
         self._cpu = int(pb_config.get("backtest_multi", "cpu"))
         if self._autostart:
             self.run()
@@ -170,11 +167,7 @@ class BacktestMultiQueue:
     @cpu.setter
     def cpu(self, new_cpu):
         self._cpu = new_cpu
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest_multi", "cpu", str(self._cpu))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest_multi", "cpu", str(self._cpu))
 
     @property
     def autostart(self):
@@ -183,11 +176,7 @@ class BacktestMultiQueue:
     @autostart.setter
     def autostart(self, new_autostart):
         self._autostart = new_autostart
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest_multi", "autostart", str(self._autostart))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest_multi", "autostart", str(self._autostart))
         if self._autostart:
             self.run()
         else:
@@ -261,9 +250,7 @@ class BacktestMultiQueue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/BacktestMulti.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
@@ -461,12 +448,7 @@ class BacktestMultiItem:
         self.unstuck_close_pct_step = 0.005
 
     def load_symbols(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if pb_config.has_option("exchanges", f'{self.exchange}.swap'):
-            return eval(pb_config.get("exchanges", f'{self.exchange}.swap'))
-        else:
-            return []
+        return load_symbols_from_ini(self.exchange, "swap")
 
     def create_from_multi(self, path: str):
         self.name = PurePath(path).name
@@ -989,8 +971,7 @@ class BacktestMultiItem:
         }
         if not dest.exists():
             dest.mkdir(parents=True)
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(bt_dict, f, indent=4)
+        write_json_atomic(file, bt_dict, indent=4)
 
     def remove(self):
         self.remove_all_results()
@@ -1231,7 +1212,7 @@ def main():
                 time.sleep(5)
             pb_config = configparser.ConfigParser()
             pb_config.read('pbgui.ini')
-            if not eval(pb_config.get("backtest_multi", "autostart")):
+            if not pb_config.getboolean("backtest_multi", "autostart"):
                 return
             if item.status() == "not started":
                 print(f'{datetime.datetime.now().isoformat(sep=" ", timespec="seconds")} Backtesting {item.filename} started')
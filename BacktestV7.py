@@ -12,6 +12,8 @@ import time
 import multiprocessing
 import pandas as pd
 from pbgui_func import PBGDIR, pb7dir, pb7venv, validateJSON, config_pretty_str, load_symbols_from_ini, error_popup, get_navi_paths, replace_special_chars
+from pbgui_purefunc import write_json_atomic, save_ini, save_ini_defaults
+from Log import LogRotator
 from PBCoinData import CoinData
 import uuid
 from Base import Base
@@ -165,15 +167,10 @@ class BacktestV7QueueItem():
 class BacktestV7Queue:
     def __init__(self):
         self.items = []
+        save_ini_defaults("backtest_v7", {"autostart": "False", "cpu": "1"})
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("backtest_v7"):
-            pb_config.add_section("backtest_v7")
-            pb_config.set("backtest_v7", "autostart", "False")
-            pb_config.set("backtest_v7", "cpu", "1")
-            with open('pbgui.ini', 'w') as f:
-                pb_config.write(f)
-        self._autostart = eval(pb_config.get("backtest_v7", "autostart"))
+        self._autostart = pb_config.getboolean("backtest_v7", "autostart")
         self._cpu = int(pb_config.get("backtest_v7", "cpu"))
         if self._autostart:
             self.run()
@@ -190,11 +187,7 @@ class BacktestV7Queue:
     @cpu.setter
     def cpu(self, new_cpu):
         self._cpu = new_cpu
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest_v7", "cpu", str(self._cpu))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest_v7", "cpu", str(self._cpu))
 
     @property
     def autostart(self):
@@ -203,11 +196,7 @@ class BacktestV7Queue:
     @autostart.setter
     def autostart(self, new_autostart):
         self._autostart = new_autostart
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("backtest_v7", "autostart", str(self._autostart))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("backtest_v7", "autostart", str(self._autostart))
         if self._autostart:
             self.run()
         else:
@@ -280,9 +269,7 @@ class BacktestV7Queue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/BacktestV7.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
@@ -600,8 +587,7 @@ class BacktestV7Item:
         }
         if not dest.exists():
             dest.mkdir(parents=True)
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(bt_dict, f, indent=4)
+        write_json_atomic(file, bt_dict, indent=4)
 
     def remove(self):
         path = Path(self.path).parent
@@ -1042,7 +1028,7 @@ def main():
                 time.sleep(5)
             pb_config = configparser.ConfigParser()
             pb_config.read('pbgui.ini')
-            if not eval(pb_config.get("backtest_v7", "autostart")):
+            if not pb_config.getboolean("backtest_v7", "autostart"):
                 return
             if item.status() == "not started":
                 print(f'{datetime.datetime.now().isoformat(sep=" ", timespec="seconds")} Backtesting {item.filename} started')
@@ -0,0 +1,171 @@
+"""
+Timing of the loop phases of the daemons (PBRun, PBRemote, PBData, PBStat, PBCoinData).
+
+    metrics = DaemonMetrics("PBRun", dump_every=12)
+    while True:
+        with metrics.phase("scan"):
+            ...
+        metrics.loop()
+
+Every phase keeps its last WINDOW durations. Every dump_every loops the count, mean, percentiles, max
+and a histogram of each phase are written to data/metrics/{daemon}.json.
+
+Creating data/metrics/profile_{daemon}.cmd runs the next loops with cProfile (PROFILE_LOOPS or the
+"loops" of the cmd file, {"loops": 20}). The stats are saved to data/metrics/{daemon}.prof and as
+text to data/metrics/{daemon}_profile.txt, the cmd file is removed when profiling starts.
+"""
+from pathlib import Path
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter, time
+import cProfile
+import pstats
+import json
+import math
+import io
+from pbgui_purefunc import write_json_atomic
+
+# Durations kept per phase
+WINDOW = 1000
+# Upper bounds of the histogram buckets in seconds, slower durations are counted in ">{last}"
+HISTOGRAM_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300]
+# Loops profiled if the cmd file does not set "loops"
+PROFILE_LOOPS = 10
+
+def percentile(durations: list, pct: float):
+    """Nearest rank percentile of sorted durations"""
+    if not durations:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(durations)))
+    return durations[rank - 1]
+
+def histogram(durations):
+    """Counts of durations per bucket of HISTOGRAM_BUCKETS"""
+    counts = {f'<={bound}': 0 for bound in HISTOGRAM_BUCKETS}
+    counts[f'>{HISTOGRAM_BUCKETS[-1]}'] = 0
+    for duration in durations:
+        for bound in HISTOGRAM_BUCKETS:
+            if duration <= bound:
+                counts[f'<={bound}'] += 1
+                break
+        else:
+            counts[f'>{HISTOGRAM_BUCKETS[-1]}'] += 1
+    return counts
+
+class PhaseStats():
+    """Rolling durations of one phase"""
+    def __init__(self, window: int = WINDOW):
+        self.durations = deque(maxlen=window)
+        self.total = 0
+        self.last = 0.0
+
+    def add(self, duration: float):
+        self.durations.append(duration)
+        self.total += 1
+        self.last = duration
+
+    def summary(self):
+        durations = sorted(self.durations)
+        count = len(durations)
+        return {
+            "count": count,
+            "total": self.total,
+            "last": round(self.last, 6),
+            "mean": round(sum(durations) / count, 6) if count else 0.0,
+            "p50": round(percentile(durations, 50), 6),
+            "p90": round(percentile(durations, 90), 6),
+            "p99": round(percentile(durations, 99), 6),
+            "max": round(durations[-1], 6) if count else 0.0,
+            "histogram": histogram(durations),
+        }
+
+class DaemonMetrics():
+    def __init__(self, daemon: str, dump_every: int = 10):
+        self.daemon = daemon
+        self.dump_every = dump_every
+        self.phases = {}
+        self.loops = 0
+        self.started = int(time())
+        self.profiler = None
+        self.profile_loops = 0
+        pbgdir = Path.cwd()
+        self.metrics_path = Path(f'{pbgdir}/data/metrics')
+        self.metrics_file = Path(f'{self.metrics_path}/{daemon}.json')
+        self.profile_cmd = Path(f'{self.metrics_path}/profile_{daemon}.cmd')
+
+    @contextmanager
+    def phase(self, name: str):
+        """Records the duration of the with block as phase name, also if it raises"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - start)
+
+    def add(self, name: str, duration: float):
+        if name not in self.phases:
+            self.phases[name] = PhaseStats()
+        self.phases[name].add(duration)
+
+    def loop(self):
+        """Call at the end of every loop, dumps the metrics and starts or stops profiling"""
+        self.loops += 1
+        if self.profiler is not None:
+            self.profile_loops -= 1
+            if self.profile_loops <= 0:
+                self.stop_profile()
+        elif self.profile_cmd.exists():
+            self.start_profile()
+        if self.loops % self.dump_every == 0:
+            self.dump()
+
+    def summary(self):
+        return {
+            "daemon": self.daemon,
+            "started": self.started,
+            "updated": int(time()),
+            "loops": self.loops,
+            "phases": {name: stats.summary() for name, stats in self.phases.items()},
+        }
+
+    def dump(self):
+        try:
+            self.metrics_path.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.metrics_file, self.summary(), indent=4)
+        except OSError as e:
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: Can not write {self.metrics_file} {e}')
+
+    def start_profile(self):
+        loops = PROFILE_LOOPS
+        try:
+            with open(self.profile_cmd, "r", encoding='utf-8') as f:
+                cfg = json.load(f)
+            loops = int(cfg.get("loops", PROFILE_LOOPS))
+        except (ValueError, TypeError, AttributeError):
+            # Empty or no JSON, use the default
+            pass
+        except FileNotFoundError:
+            return
+        self.profile_cmd.unlink(missing_ok=True)
+        print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Profile: {self.daemon} next {loops} loops')
+        self.profile_loops = loops
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profile(self):
+        self.profiler.disable()
+        self.metrics_path.mkdir(parents=True, exist_ok=True)
+        self.profiler.dump_stats(Path(f'{self.metrics_path}/{self.daemon}.prof'))
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        with open(Path(f'{self.metrics_path}/{self.daemon}_profile.txt'), "w", encoding='utf-8') as f:
+            f.write(text.getvalue())
+        self.profiler = None
+        print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Profile: {self.daemon} saved to {self.metrics_path}/{self.daemon}.prof')
+
+def main():
+    print("Don't Run this Class from CLI")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,11 @@
 import ccxt
-import configparser
 from User import User, Users
 from enum import Enum
 import json
 from pathlib import Path
 from time import sleep
 from datetime import datetime
-from pbgui_purefunc import PBGDIR
+from pbgui_purefunc import PBGDIR, load_symbols_file, save_symbols_file
 
 class Exchanges(Enum):
     BINANCE = 'binance'
@@ -900,25 +899,14 @@ class Exchange:
         self.save_symbols()
 
     def save_symbols(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if not pb_config.has_section("exchanges"):
-            pb_config.add_section("exchanges")
-        pb_config.set("exchanges", f'{self.id}.swap', f'{self.swap}')
-        if self.spot:
-            pb_config.set("exchanges", f'{self.id}.spot', f'{self.spot}')
-        if self.cpt:
-            pb_config.set("exchanges", f'{self.id}.cpt', f'{self.cpt}')
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_symbols_file(self.id, swap=self.swap, spot=self.spot or None, cpt=self.cpt or None)
 
     def load_symbols(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if pb_config.has_option("exchanges", f'{self.id}.spot'):
-            self.spot = eval(pb_config.get("exchanges", f'{self.id}.spot'))
-        if pb_config.has_option("exchanges", f'{self.id}.swap'):
-            self.swap = eval(pb_config.get("exchanges", f'{self.id}.swap'))
+        symbols = load_symbols_file(self.id)
+        if "spot" in symbols:
+            self.spot = list(symbols["spot"])
+        if "swap" in symbols:
+            self.swap = list(symbols["swap"])
         if not self.spot and not self.swap:
             self.fetch_symbols()
 
@@ -4,6 +4,7 @@ from math import floor, ceil
 from dataclasses import dataclass, field, replace
 from enum import Enum
 import math
+from functools import lru_cache
 
 # ----------------------------
 # Enums and Data Classes
@@ -251,13 +252,30 @@ def calc_wallet_exposure_if_filled(balance: float, psize: float, pprice: float,
     (new_psize, new_pprice) = calc_new_psize_pprice(psize_abs, pprice, qty_abs, price, exchange_params.qty_step)
     return calc_wallet_exposure(exchange_params.c_mult, balance, new_psize, new_pprice)
 
+@lru_cache(maxsize=1024)
+def lagrange_weights(xs: tuple) -> tuple:
+    """Barycentric weights w[i] = 1 / prod(xs[i] - xs[j]) for j != i, computed once per set of xs."""
+    weights = []
+    for i in range(len(xs)):
+        w = 1.0
+        for j in range(len(xs)):
+            if i != j:
+                denominator = xs[i] - xs[j]
+                if denominator == 0:
+                    raise ZeroDivisionError("Duplicate x-values found.")
+                w *= denominator
+        weights.append(1.0 / w)
+    return tuple(weights)
+
 def interpolate(x: float, xs: list[float], ys: list[float]) -> float:
     """
     Interpolates a value at x using Lagrange polynomial interpolation
     given arrays of x-coordinates (xs) and corresponding y-coordinates (ys).
 
-    This function computes the Lagrange interpolation polynomial that passes
-    through all the points defined by (xs[i], ys[i]) and returns the value at x.
+    The grid functions always interpolate between two points, which is evaluated
+    in closed form with the same operation order as the Lagrange formula.
+    For more points the barycentric form is used, its weights only depend on xs
+    and are cached by lagrange_weights.
 
     Parameters
     ----------
@@ -278,59 +296,35 @@ def interpolate(x: float, xs: list[float], ys: list[float]) -> float:
     ValueError
         If xs and ys do not have the same length, or if they are empty,
         or if xs contains duplicate values.
-    ZeroDivisionError
-        If any two xs values are identical (which should be caught by the distinctness check).
     """
 
-    if len(xs) != len(ys):
+    n = len(xs)
+    if n != len(ys):
         raise ValueError("xs and ys must have the same length.")
-    if len(xs) == 0:
+    if n == 0:
         raise ValueError("xs and ys cannot be empty.")
-    if len(set(xs)) != len(xs):
+    if n == 1:
+        return 0.0 + ys[0]
+    if n == 2:
+        x0, x1 = xs
+        if x0 == x1:
+            raise ValueError("All xs must be distinct for Lagrange interpolation.")
+        return ys[0] * ((x - x1) / (x0 - x1)) + ys[1] * ((x - x0) / (x1 - x0))
+    if len(set(xs)) != n:
         raise ValueError("All xs must be distinct for Lagrange interpolation.")
 
-    n = len(xs)
-    result = 0.0
+    weights = lagrange_weights(tuple(xs))
+    numerator = 0.0
+    denominator = 0.0
+    for xi, yi, wi in zip(xs, ys, weights):
+        if x == xi:
+            return yi
+        t = wi / (x - xi)
+        numerator += t * yi
+        denominator += t
+    return numerator / denominator
+
 
-    for i in range(n):
-        # Start with the corresponding y value
-        term = ys[i]
-        # Multiply by each fraction (x - xs[j]) / (xs[i] - xs[j]) for j != i
-        for j in range(n):
-            if i != j:
-                denominator = xs[i] - xs[j]
-                if denominator == 0:
-                    raise ZeroDivisionError("Duplicate x-values found.")
-                term *= (x - xs[j]) / denominator
-        result += term
-
-    return result
-
-
-# def interpolate(x: float, xs: list[float], ys: list[float]) -> float:
-#     if len(xs) != len(ys):
-#         raise ValueError("xs and ys must have the same length")
-#     n = len(xs)
-#     result = 0.0
-#     for i in range(n):
-#         term = ys[i]
-#         for j in range(n):
-#             if i != j:
-#                 term *= (x - xs[j]) / (xs[i] - xs[j])
-#         result += term
-#     return round_to_decimal_places(result, 10)
-
-# def interpolate(x, xs, ys):
-#     return np.sum(
-#         np.array(
-#             [
-#                 np.prod(np.array([(x - xs[m]) / (xs[j] - xs[m]) for m in range(len(xs)) if m != j]))
-#                 * ys[j]
-#                 for j in range(len(xs))
-#             ]
-#         )
-#     )
-    
 def calc_pnl_long(entry_price: float, close_price: float, qty: float, c_mult: float) -> float:
     # Matches rust: qty.abs()*c_mult*(close_price - entry_price)
     return round_to_decimal_places(abs(qty) * c_mult * (close_price - entry_price), 10)
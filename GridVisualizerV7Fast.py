@@ -0,0 +1,1054 @@
+"""
+Array based implementation of the GridVisualizerV7 grid calculations.
+
+calc_entries_long/short and calc_closes_long/short have the same signature and
+return the same list of Order as the functions in GridVisualizerV7. The grid loop
+is sequential (every order depends on the position after the previous one), so
+instead of cloning dataclasses on every step the parameters are packed into
+float64 arrays once and the loop runs in plain scalar kernels. When numba is
+installed the kernels are jitted, otherwise the reference implementation from
+GridVisualizerV7 is used.
+"""
+import math
+import numpy as np
+from collections import OrderedDict
+import GridVisualizerV7 as gv
+from GridVisualizerV7 import Order, OrderType
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# ExchangeParams array layout
+EP_MIN_QTY = 0
+EP_MIN_COST = 1
+EP_QTY_STEP = 2
+EP_PRICE_STEP = 3
+EP_C_MULT = 4
+
+# BotParams array layout
+BP_WEL = 0
+BP_ENTRY_INITIAL_QTY_PCT = 1
+BP_ENTRY_INITIAL_EMA_DIST = 2
+BP_ENTRY_GRID_SPACING_PCT = 3
+BP_ENTRY_GRID_SPACING_WEIGHT = 4
+BP_ENTRY_GRID_DOUBLE_DOWN_FACTOR = 5
+BP_ENTRY_TRAILING_THRESHOLD_PCT = 6
+BP_ENTRY_TRAILING_RETRACEMENT_PCT = 7
+BP_ENTRY_TRAILING_GRID_RATIO = 8
+BP_CLOSE_GRID_MIN_MARKUP = 9
+BP_CLOSE_GRID_MARKUP_RANGE = 10
+BP_CLOSE_GRID_QTY_PCT = 11
+BP_CLOSE_TRAILING_THRESHOLD_PCT = 12
+BP_CLOSE_TRAILING_RETRACEMENT_PCT = 13
+BP_CLOSE_TRAILING_QTY_PCT = 14
+BP_CLOSE_TRAILING_GRID_RATIO = 15
+
+# StateParams array layout
+SP_BALANCE = 0
+SP_BID = 1
+SP_ASK = 2
+SP_EMA_LOWER = 3
+SP_EMA_UPPER = 4
+
+# TrailingPriceBundle array layout
+TB_MAX_SINCE_OPEN = 0
+TB_MIN_SINCE_OPEN = 1
+TB_MAX_SINCE_MIN = 2
+TB_MIN_SINCE_MAX = 3
+
+# OrderType values used inside the kernels
+OT_DEFAULT = 0
+OT_ENTRY_INITIAL_NORMAL_LONG = 1
+OT_ENTRY_INITIAL_PARTIAL_LONG = 2
+OT_ENTRY_GRID_NORMAL_LONG = 3
+OT_ENTRY_GRID_CROPPED_LONG = 4
+OT_ENTRY_GRID_INFLATED_LONG = 5
+OT_ENTRY_TRAILING_NORMAL_LONG = 6
+OT_ENTRY_TRAILING_CROPPED_LONG = 7
+OT_ENTRY_INITIAL_NORMAL_SHORT = 8
+OT_ENTRY_INITIAL_PARTIAL_SHORT = 9
+OT_ENTRY_GRID_NORMAL_SHORT = 10
+OT_ENTRY_GRID_CROPPED_SHORT = 11
+OT_ENTRY_GRID_INFLATED_SHORT = 12
+OT_ENTRY_TRAILING_NORMAL_SHORT = 13
+OT_ENTRY_TRAILING_CROPPED_SHORT = 14
+OT_CLOSE_GRID_LONG = 15
+OT_CLOSE_GRID_SHORT = 16
+OT_CLOSE_TRAILING_LONG = 17
+OT_CLOSE_TRAILING_SHORT = 18
+
+MAX_ORDERS = 500
+
+# ----------------------------
+# Packing
+# ----------------------------
+
+def pack_exchange_params(exchange_params):
+    return np.array([
+        exchange_params.min_qty,
+        exchange_params.min_cost,
+        exchange_params.qty_step,
+        exchange_params.price_step,
+        exchange_params.c_mult,
+    ], dtype=np.float64)
+
+def pack_bot_params(bot_params):
+    return np.array([
+        bot_params.wallet_exposure_limit,
+        bot_params.entry_initial_qty_pct,
+        bot_params.entry_initial_ema_dist,
+        bot_params.entry_grid_spacing_pct,
+        bot_params.entry_grid_spacing_weight,
+        bot_params.entry_grid_double_down_factor,
+        bot_params.entry_trailing_threshold_pct,
+        bot_params.entry_trailing_retracement_pct,
+        bot_params.entry_trailing_grid_ratio,
+        bot_params.close_grid_min_markup,
+        bot_params.close_grid_markup_range,
+        bot_params.close_grid_qty_pct,
+        bot_params.close_trailing_threshold_pct,
+        bot_params.close_trailing_retracement_pct,
+        bot_params.close_trailing_qty_pct,
+        bot_params.close_trailing_grid_ratio,
+    ], dtype=np.float64)
+
+def pack_state_params(state_params):
+    return np.array([
+        state_params.balance,
+        state_params.order_book.bid,
+        state_params.order_book.ask,
+        state_params.ema_bands.lower,
+        state_params.ema_bands.upper,
+    ], dtype=np.float64)
+
+def pack_trailing_price_bundle(trailing_price_bundle):
+    return np.array([
+        trailing_price_bundle.max_since_open,
+        trailing_price_bundle.min_since_open,
+        trailing_price_bundle.max_since_min,
+        trailing_price_bundle.min_since_max,
+    ], dtype=np.float64)
+
+def unpack_orders(orders):
+    return [Order(qty=float(o[0]), price=float(o[1]), order_type=OrderType(int(o[2]))) for o in orders]
+
+# ----------------------------
+# Utility Kernels
+# ----------------------------
+
+@njit(cache=True)
+def nb_round_to_decimal_places(value):
+    return round(value, 10)
+
+@njit(cache=True)
+def nb_round_up(n, step):
+    if step == 0.0:
+        return nb_round_to_decimal_places(n)
+    return nb_round_to_decimal_places(math.ceil(n / step) * step)
+
+@njit(cache=True)
+def nb_round_dn(n, step):
+    if step == 0.0:
+        return nb_round_to_decimal_places(n)
+    return nb_round_to_decimal_places(math.floor(n / step) * step)
+
+@njit(cache=True)
+def nb_round(n, step):
+    if step == 0.0:
+        return nb_round_to_decimal_places(n)
+    return nb_round_to_decimal_places(round(n / step) * step)
+
+@njit(cache=True)
+def nb_cost_to_qty(cost, price, c_mult):
+    if price <= 0.0:
+        return 0.0
+    return nb_round_to_decimal_places(cost / (price * c_mult))
+
+@njit(cache=True)
+def nb_qty_to_cost(qty, price, c_mult):
+    return nb_round_to_decimal_places(abs(qty) * price * c_mult)
+
+@njit(cache=True)
+def nb_calc_wallet_exposure(c_mult, balance, position_size, position_price):
+    if balance <= 0.0 or position_size == 0.0:
+        return 0.0
+    cost = nb_qty_to_cost(position_size, position_price, c_mult)
+    return nb_round_to_decimal_places(cost / balance)
+
+@njit(cache=True)
+def nb_calc_new_psize_pprice(psize, pprice, qty, price, qty_step):
+    if qty == 0.0:
+        return psize, pprice
+    if psize == 0.0:
+        return nb_round(qty, qty_step), price
+    new_psize = nb_round(psize + qty, qty_step)
+    if new_psize == 0.0:
+        return 0.0, 0.0
+    pprice = 0.0 if math.isnan(pprice) else pprice
+    new_pprice = (pprice * (psize / new_psize)) + (price * (qty / new_psize))
+    return nb_round_to_decimal_places(new_psize), nb_round_to_decimal_places(new_pprice)
+
+@njit(cache=True)
+def nb_calc_wallet_exposure_if_filled(balance, psize, pprice, qty, price, ep):
+    psize_abs = nb_round(abs(psize), ep[EP_QTY_STEP])
+    qty_abs = nb_round(abs(qty), ep[EP_QTY_STEP])
+    new_psize, new_pprice = nb_calc_new_psize_pprice(psize_abs, pprice, qty_abs, price, ep[EP_QTY_STEP])
+    return nb_calc_wallet_exposure(ep[EP_C_MULT], balance, new_psize, new_pprice)
+
+@njit(cache=True)
+def nb_interpolate(x, x0, x1, y0, y1):
+    # Two point Lagrange interpolation, same operation order as GridVisualizerV7.interpolate
+    if x0 == x1:
+        raise ValueError("All xs must be distinct for Lagrange interpolation.")
+    result = 0.0
+    result += y0 * ((x - x1) / (x0 - x1))
+    result += y1 * ((x - x0) / (x1 - x0))
+    return result
+
+@njit(cache=True)
+def nb_calc_ema_price_bid(price_step, order_book_bid, ema_bands_lower, ema_dist):
+    return min(order_book_bid, nb_round_dn(ema_bands_lower * (1.0 - ema_dist), price_step))
+
+@njit(cache=True)
+def nb_calc_ema_price_ask(price_step, order_book_ask, ema_bands_upper, ema_dist):
+    return max(order_book_ask, nb_round_up(ema_bands_upper * (1.0 + ema_dist), price_step))
+
+# ----------------------------
+# Shared Entry/Close Kernels
+# ----------------------------
+
+@njit(cache=True)
+def nb_calc_min_entry_qty(entry_price, ep):
+    return max(
+        ep[EP_MIN_QTY],
+        nb_round_up(nb_cost_to_qty(ep[EP_MIN_COST], entry_price, ep[EP_C_MULT]), ep[EP_QTY_STEP]),
+    )
+
+@njit(cache=True)
+def nb_calc_initial_entry_qty(ep, bp, balance, entry_price):
+    return max(
+        nb_calc_min_entry_qty(entry_price, ep),
+        nb_round(
+            nb_cost_to_qty(balance * bp[BP_WEL] * bp[BP_ENTRY_INITIAL_QTY_PCT], entry_price, ep[EP_C_MULT]),
+            ep[EP_QTY_STEP],
+        ),
+    )
+
+@njit(cache=True)
+def nb_calc_cropped_reentry_qty(ep, bp, psize, pprice, wallet_exposure, balance, entry_qty, entry_price):
+    position_size_abs = abs(psize)
+    entry_qty_abs = abs(entry_qty)
+    wallet_exposure_if_filled = nb_calc_wallet_exposure_if_filled(
+        balance, position_size_abs, pprice, entry_qty_abs, entry_price, ep)
+    min_entry_qty = nb_calc_min_entry_qty(entry_price, ep)
+    if wallet_exposure_if_filled > bp[BP_WEL] * 1.01:
+        entry_qty_abs_new = nb_interpolate(
+            bp[BP_WEL],
+            wallet_exposure, wallet_exposure_if_filled,
+            position_size_abs, position_size_abs + entry_qty_abs,
+        ) - position_size_abs
+        return wallet_exposure_if_filled, max(nb_round(entry_qty_abs_new, ep[EP_QTY_STEP]), min_entry_qty)
+    return wallet_exposure_if_filled, max(entry_qty_abs, min_entry_qty)
+
+@njit(cache=True)
+def nb_calc_reentry_qty(entry_price, balance, position_size, ep, bp):
+    return max(
+        nb_calc_min_entry_qty(entry_price, ep),
+        nb_round(
+            max(
+                abs(position_size) * bp[BP_ENTRY_GRID_DOUBLE_DOWN_FACTOR],
+                nb_cost_to_qty(balance, entry_price, ep[EP_C_MULT]) * bp[BP_WEL] * bp[BP_ENTRY_INITIAL_QTY_PCT],
+            ),
+            ep[EP_QTY_STEP],
+        ),
+    )
+
+@njit(cache=True)
+def nb_calc_reentry_price_bid(position_price, wallet_exposure, order_book_bid, ep, bp):
+    multiplier = (wallet_exposure / bp[BP_WEL]) * bp[BP_ENTRY_GRID_SPACING_WEIGHT]
+    reentry_price = min(
+        nb_round_dn(position_price * (1.0 - bp[BP_ENTRY_GRID_SPACING_PCT] * (1.0 + multiplier)), ep[EP_PRICE_STEP]),
+        order_book_bid,
+    )
+    if reentry_price <= ep[EP_PRICE_STEP]:
+        return 0.0
+    return reentry_price
+
+@njit(cache=True)
+def nb_calc_reentry_price_ask(position_price, wallet_exposure, order_book_ask, ep, bp):
+    multiplier = (wallet_exposure / bp[BP_WEL]) * bp[BP_ENTRY_GRID_SPACING_WEIGHT]
+    reentry_price = max(
+        nb_round_up(position_price * (1.0 + bp[BP_ENTRY_GRID_SPACING_PCT] * (1.0 + multiplier)), ep[EP_PRICE_STEP]),
+        order_book_ask,
+    )
+    if reentry_price <= ep[EP_PRICE_STEP]:
+        return 0.0
+    return reentry_price
+
+@njit(cache=True)
+def nb_calc_close_qty(ep, bp, psize, pprice, close_qty_pct, balance, close_price):
+    full_psize = nb_cost_to_qty(balance * bp[BP_WEL], pprice, ep[EP_C_MULT])
+    position_size_abs = abs(psize)
+    leftover = max(0.0, position_size_abs - full_psize)
+    min_entry_qty = nb_calc_min_entry_qty(close_price, ep)
+    close_qty = min(
+        nb_round(position_size_abs, ep[EP_QTY_STEP]),
+        max(min_entry_qty, nb_round_up(full_psize * close_qty_pct + leftover, ep[EP_QTY_STEP])),
+    )
+    if close_qty > 0.0 and close_qty < position_size_abs and position_size_abs - close_qty < min_entry_qty:
+        return position_size_abs
+    return close_qty
+
+# ----------------------------
+# Entry Kernels (Long)
+# ----------------------------
+
+@njit(cache=True)
+def nb_calc_grid_entry_long(ep, sp, bp, psize, pprice):
+    if bp[BP_WEL] == 0.0 or sp[SP_BALANCE] <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_price = nb_calc_ema_price_bid(ep[EP_PRICE_STEP], sp[SP_BID], sp[SP_EMA_LOWER], bp[BP_ENTRY_INITIAL_EMA_DIST])
+    if initial_entry_price <= ep[EP_PRICE_STEP]:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_qty = nb_calc_initial_entry_qty(ep, bp, sp[SP_BALANCE], initial_entry_price)
+    if psize == 0.0:
+        return initial_entry_qty, initial_entry_price, OT_ENTRY_INITIAL_NORMAL_LONG
+    elif psize < initial_entry_qty * 0.8:
+        qty = max(nb_calc_min_entry_qty(initial_entry_price, ep), nb_round_dn(initial_entry_qty - psize, ep[EP_QTY_STEP]))
+        return qty, initial_entry_price, OT_ENTRY_INITIAL_PARTIAL_LONG
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], psize, pprice)
+    if wallet_exposure >= bp[BP_WEL] * 0.999:
+        return 0.0, 0.0, OT_DEFAULT
+
+    reentry_price = nb_calc_reentry_price_bid(pprice, wallet_exposure, sp[SP_BID], ep, bp)
+    if reentry_price <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    reentry_qty = max(nb_calc_reentry_qty(reentry_price, sp[SP_BALANCE], psize, ep, bp), initial_entry_qty)
+    wallet_exposure_if_filled, reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize, pprice, wallet_exposure, sp[SP_BALANCE], reentry_qty, reentry_price)
+    if reentry_qty_cropped < reentry_qty:
+        return reentry_qty_cropped, reentry_price, OT_ENTRY_GRID_CROPPED_LONG
+
+    psize_if_filled, pprice_if_filled = nb_calc_new_psize_pprice(psize, pprice, reentry_qty, reentry_price, ep[EP_QTY_STEP])
+    next_reentry_price = nb_calc_reentry_price_bid(pprice_if_filled, wallet_exposure_if_filled, sp[SP_BID], ep, bp)
+    next_reentry_qty = max(nb_calc_reentry_qty(next_reentry_price, sp[SP_BALANCE], psize_if_filled, ep, bp), initial_entry_qty)
+    _, next_reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize_if_filled, pprice_if_filled, wallet_exposure_if_filled, sp[SP_BALANCE], next_reentry_qty, next_reentry_price)
+    effective_double_down_factor = next_reentry_qty_cropped / psize_if_filled if psize_if_filled != 0 else 0.0
+    if effective_double_down_factor < bp[BP_ENTRY_GRID_DOUBLE_DOWN_FACTOR] * 0.25:
+        new_entry_qty = nb_interpolate(
+            bp[BP_WEL], wallet_exposure, wallet_exposure_if_filled, psize, psize + reentry_qty) - psize
+        return nb_round(new_entry_qty, ep[EP_QTY_STEP]), reentry_price, OT_ENTRY_GRID_INFLATED_LONG
+    return reentry_qty, reentry_price, OT_ENTRY_GRID_NORMAL_LONG
+
+@njit(cache=True)
+def nb_calc_trailing_entry_long(ep, sp, bp, psize, pprice, tb):
+    initial_entry_price = nb_calc_ema_price_bid(ep[EP_PRICE_STEP], sp[SP_BID], sp[SP_EMA_LOWER], bp[BP_ENTRY_INITIAL_EMA_DIST])
+    if initial_entry_price <= ep[EP_PRICE_STEP]:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_qty = nb_calc_initial_entry_qty(ep, bp, sp[SP_BALANCE], initial_entry_price)
+    if psize == 0.0:
+        return initial_entry_qty, initial_entry_price, OT_ENTRY_INITIAL_NORMAL_LONG
+    elif psize < initial_entry_qty * 0.8:
+        qty = max(nb_calc_min_entry_qty(initial_entry_price, ep), nb_round_dn(initial_entry_qty - psize, ep[EP_QTY_STEP]))
+        return qty, initial_entry_price, OT_ENTRY_INITIAL_PARTIAL_LONG
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], psize, pprice)
+    if wallet_exposure > bp[BP_WEL] * 0.999:
+        return 0.0, 0.0, OT_DEFAULT
+
+    entry_triggered = False
+    reentry_price = 0.0
+    if bp[BP_ENTRY_TRAILING_THRESHOLD_PCT] <= 0.0:
+        if (bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT] > 0.0 and
+            tb[TB_MAX_SINCE_MIN] > tb[TB_MIN_SINCE_OPEN] * (1.0 + bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT])):
+            entry_triggered = True
+            reentry_price = sp[SP_BID]
+    else:
+        if bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT] <= 0.0:
+            entry_triggered = True
+            reentry_price = min(sp[SP_BID], nb_round_dn(pprice * (1.0 - bp[BP_ENTRY_TRAILING_THRESHOLD_PCT]), ep[EP_PRICE_STEP]))
+        else:
+            if (tb[TB_MIN_SINCE_OPEN] < pprice * (1.0 - bp[BP_ENTRY_TRAILING_THRESHOLD_PCT]) and
+                tb[TB_MAX_SINCE_MIN] > tb[TB_MIN_SINCE_OPEN] * (1.0 + bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT])):
+                entry_triggered = True
+                reentry_price = min(
+                    sp[SP_BID],
+                    nb_round_dn(
+                        pprice * (1.0 - bp[BP_ENTRY_TRAILING_THRESHOLD_PCT] + bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT]),
+                        ep[EP_PRICE_STEP],
+                    ),
+                )
+    if not entry_triggered:
+        return 0.0, 0.0, OT_ENTRY_TRAILING_NORMAL_LONG
+
+    reentry_qty = max(nb_calc_reentry_qty(reentry_price, sp[SP_BALANCE], psize, ep, bp), initial_entry_qty)
+    _, reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize, pprice, wallet_exposure, sp[SP_BALANCE], reentry_qty, reentry_price)
+    if reentry_qty_cropped < reentry_qty:
+        return reentry_qty_cropped, reentry_price, OT_ENTRY_TRAILING_CROPPED_LONG
+    return reentry_qty, reentry_price, OT_ENTRY_TRAILING_NORMAL_LONG
+
+@njit(cache=True)
+def nb_calc_next_entry_long(ep, sp, bp, psize, pprice, tb):
+    if bp[BP_WEL] == 0.0 or sp[SP_BALANCE] <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    ratio = bp[BP_ENTRY_TRAILING_GRID_RATIO]
+    if ratio >= 1.0 or ratio <= -1.0:
+        return nb_calc_trailing_entry_long(ep, sp, bp, psize, pprice, tb)
+    elif ratio == 0.0:
+        return nb_calc_grid_entry_long(ep, sp, bp, psize, pprice)
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], psize, pprice)
+    wallet_exposure_ratio = wallet_exposure / bp[BP_WEL]
+    if ratio > 0.0:
+        # trailing first
+        if wallet_exposure_ratio < ratio:
+            if wallet_exposure == 0.0:
+                return nb_calc_trailing_entry_long(ep, sp, bp, psize, pprice, tb)
+            bp_modified = bp.copy()
+            bp_modified[BP_WEL] = bp[BP_WEL] * ratio * 1.01
+            return nb_calc_trailing_entry_long(ep, sp, bp_modified, psize, pprice, tb)
+        return nb_calc_grid_entry_long(ep, sp, bp, psize, pprice)
+    # grid first
+    if wallet_exposure_ratio < 1.0 + ratio:
+        if wallet_exposure == 0.0:
+            return nb_calc_grid_entry_long(ep, sp, bp, psize, pprice)
+        bp_modified = bp.copy()
+        bp_modified[BP_WEL] = bp[BP_WEL] * (1.0 + ratio) * 1.01
+        return nb_calc_grid_entry_long(ep, sp, bp_modified, psize, pprice)
+    return nb_calc_trailing_entry_long(ep, sp, bp, psize, pprice, tb)
+
+@njit(cache=True)
+def nb_calc_entries_long(ep, sp, bp, psize, pprice, tb):
+    entries = np.zeros((MAX_ORDERS, 3))
+    n = 0
+    sp_mod = sp.copy()
+    for _ in range(MAX_ORDERS):
+        qty, price, order_type = nb_calc_next_entry_long(ep, sp_mod, bp, psize, pprice, tb)
+        if qty == 0.0:
+            break
+        if n > 0:
+            if order_type == OT_ENTRY_TRAILING_NORMAL_LONG or order_type == OT_ENTRY_TRAILING_CROPPED_LONG:
+                break
+            if entries[n - 1, 1] == price:
+                break
+        psize, pprice = nb_calc_new_psize_pprice(psize, pprice, qty, price, ep[EP_QTY_STEP])
+        sp_mod[SP_BID] = min(sp_mod[SP_BID], price)
+        entries[n, 0] = qty
+        entries[n, 1] = price
+        entries[n, 2] = order_type
+        n += 1
+    return entries[:n]
+
+# ----------------------------
+# Entry Kernels (Short)
+# ----------------------------
+
+@njit(cache=True)
+def nb_calc_grid_entry_short(ep, sp, bp, psize, pprice):
+    if bp[BP_WEL] == 0.0 or sp[SP_BALANCE] <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_price = nb_calc_ema_price_ask(ep[EP_PRICE_STEP], sp[SP_ASK], sp[SP_EMA_UPPER], bp[BP_ENTRY_INITIAL_EMA_DIST])
+    if initial_entry_price <= ep[EP_PRICE_STEP]:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_qty = nb_calc_initial_entry_qty(ep, bp, sp[SP_BALANCE], initial_entry_price)
+    position_size_abs = abs(psize)
+    if position_size_abs == 0.0:
+        return -initial_entry_qty, initial_entry_price, OT_ENTRY_INITIAL_NORMAL_SHORT
+    elif position_size_abs < initial_entry_qty * 0.8:
+        qty = max(nb_calc_min_entry_qty(initial_entry_price, ep), nb_round_dn(initial_entry_qty - position_size_abs, ep[EP_QTY_STEP]))
+        return -qty, initial_entry_price, OT_ENTRY_INITIAL_PARTIAL_SHORT
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], position_size_abs, pprice)
+    if wallet_exposure >= bp[BP_WEL] * 0.999:
+        return 0.0, 0.0, OT_DEFAULT
+
+    reentry_price = nb_calc_reentry_price_ask(pprice, wallet_exposure, sp[SP_ASK], ep, bp)
+    if reentry_price <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    reentry_qty = max(nb_calc_reentry_qty(reentry_price, sp[SP_BALANCE], position_size_abs, ep, bp), initial_entry_qty)
+    wallet_exposure_if_filled, reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize, pprice, wallet_exposure, sp[SP_BALANCE], reentry_qty, reentry_price)
+    if reentry_qty_cropped < reentry_qty:
+        return -reentry_qty_cropped, reentry_price, OT_ENTRY_GRID_CROPPED_SHORT
+
+    psize_if_filled, pprice_if_filled = nb_calc_new_psize_pprice(position_size_abs, pprice, reentry_qty, reentry_price, ep[EP_QTY_STEP])
+    next_reentry_price = nb_calc_reentry_price_ask(pprice_if_filled, wallet_exposure_if_filled, sp[SP_ASK], ep, bp)
+    next_reentry_qty = max(nb_calc_reentry_qty(next_reentry_price, sp[SP_BALANCE], psize_if_filled, ep, bp), initial_entry_qty)
+    _, next_reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize_if_filled, pprice_if_filled, wallet_exposure_if_filled, sp[SP_BALANCE], next_reentry_qty, next_reentry_price)
+    effective_double_down_factor = next_reentry_qty_cropped / psize_if_filled if psize_if_filled != 0 else 0.0
+    if effective_double_down_factor < bp[BP_ENTRY_GRID_DOUBLE_DOWN_FACTOR] * 0.25:
+        new_entry_qty = nb_interpolate(
+            bp[BP_WEL], wallet_exposure, wallet_exposure_if_filled,
+            position_size_abs, position_size_abs + reentry_qty) - position_size_abs
+        return -nb_round(new_entry_qty, ep[EP_QTY_STEP]), reentry_price, OT_ENTRY_GRID_INFLATED_SHORT
+    return -reentry_qty, reentry_price, OT_ENTRY_GRID_NORMAL_SHORT
+
+@njit(cache=True)
+def nb_calc_trailing_entry_short(ep, sp, bp, psize, pprice, tb):
+    initial_entry_price = nb_calc_ema_price_ask(ep[EP_PRICE_STEP], sp[SP_ASK], sp[SP_EMA_UPPER], bp[BP_ENTRY_INITIAL_EMA_DIST])
+    if initial_entry_price <= ep[EP_PRICE_STEP]:
+        return 0.0, 0.0, OT_DEFAULT
+    initial_entry_qty = nb_calc_initial_entry_qty(ep, bp, sp[SP_BALANCE], initial_entry_price)
+    position_size_abs = abs(psize)
+    if position_size_abs == 0.0:
+        return -initial_entry_qty, initial_entry_price, OT_ENTRY_INITIAL_NORMAL_SHORT
+    elif position_size_abs < initial_entry_qty * 0.8:
+        qty = max(nb_calc_min_entry_qty(initial_entry_price, ep), nb_round_dn(initial_entry_qty - position_size_abs, ep[EP_QTY_STEP]))
+        return -qty, initial_entry_price, OT_ENTRY_INITIAL_PARTIAL_SHORT
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], position_size_abs, pprice)
+    if wallet_exposure > bp[BP_WEL] * 0.999:
+        return 0.0, 0.0, OT_DEFAULT
+
+    entry_triggered = False
+    reentry_price = 0.0
+    if bp[BP_ENTRY_TRAILING_THRESHOLD_PCT] <= 0.0:
+        if (bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT] > 0.0 and
+            tb[TB_MIN_SINCE_MAX] < tb[TB_MAX_SINCE_OPEN] * (1.0 - bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT])):
+            entry_triggered = True
+            reentry_price = sp[SP_ASK]
+    else:
+        if bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT] <= 0.0:
+            entry_triggered = True
+            reentry_price = max(sp[SP_ASK], nb_round_up(pprice * (1.0 + bp[BP_ENTRY_TRAILING_THRESHOLD_PCT]), ep[EP_PRICE_STEP]))
+        else:
+            if (tb[TB_MAX_SINCE_OPEN] > pprice * (1.0 + bp[BP_ENTRY_TRAILING_THRESHOLD_PCT]) and
+                tb[TB_MIN_SINCE_MAX] < tb[TB_MAX_SINCE_OPEN] * (1.0 - bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT])):
+                entry_triggered = True
+                reentry_price = max(
+                    sp[SP_ASK],
+                    nb_round_up(
+                        pprice * (1.0 + bp[BP_ENTRY_TRAILING_THRESHOLD_PCT] - bp[BP_ENTRY_TRAILING_RETRACEMENT_PCT]),
+                        ep[EP_PRICE_STEP],
+                    ),
+                )
+    if not entry_triggered:
+        return 0.0, 0.0, OT_ENTRY_TRAILING_NORMAL_SHORT
+
+    reentry_qty = max(nb_calc_reentry_qty(reentry_price, sp[SP_BALANCE], position_size_abs, ep, bp), initial_entry_qty)
+    _, reentry_qty_cropped = nb_calc_cropped_reentry_qty(
+        ep, bp, psize, pprice, wallet_exposure, sp[SP_BALANCE], reentry_qty, reentry_price)
+    if reentry_qty_cropped < reentry_qty:
+        return -reentry_qty_cropped, reentry_price, OT_ENTRY_TRAILING_CROPPED_SHORT
+    return -reentry_qty, reentry_price, OT_ENTRY_TRAILING_NORMAL_SHORT
+
+@njit(cache=True)
+def nb_calc_next_entry_short(ep, sp, bp, psize, pprice, tb):
+    if bp[BP_WEL] == 0.0 or sp[SP_BALANCE] <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    ratio = bp[BP_ENTRY_TRAILING_GRID_RATIO]
+    if ratio >= 1.0 or ratio <= -1.0:
+        return nb_calc_trailing_entry_short(ep, sp, bp, psize, pprice, tb)
+    elif ratio == 0.0:
+        return nb_calc_grid_entry_short(ep, sp, bp, psize, pprice)
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], abs(psize), pprice)
+    wallet_exposure_ratio = wallet_exposure / bp[BP_WEL]
+    if ratio > 0.0:
+        # trailing first
+        if wallet_exposure_ratio < ratio:
+            if wallet_exposure == 0.0:
+                return nb_calc_trailing_entry_short(ep, sp, bp, psize, pprice, tb)
+            bp_modified = bp.copy()
+            bp_modified[BP_WEL] = bp[BP_WEL] * ratio * 1.01
+            return nb_calc_trailing_entry_short(ep, sp, bp_modified, psize, pprice, tb)
+        return nb_calc_grid_entry_short(ep, sp, bp, psize, pprice)
+    # grid first
+    if wallet_exposure_ratio < 1.0 + ratio:
+        if wallet_exposure == 0.0:
+            return nb_calc_grid_entry_short(ep, sp, bp, psize, pprice)
+        bp_modified = bp.copy()
+        bp_modified[BP_WEL] = bp[BP_WEL] * (1.0 + ratio) * 1.01
+        return nb_calc_grid_entry_short(ep, sp, bp_modified, psize, pprice)
+    return nb_calc_trailing_entry_short(ep, sp, bp, psize, pprice, tb)
+
+@njit(cache=True)
+def nb_calc_entries_short(ep, sp, bp, psize, pprice, tb):
+    entries = np.zeros((MAX_ORDERS, 3))
+    n = 0
+    sp_mod = sp.copy()
+    for _ in range(MAX_ORDERS):
+        qty, price, order_type = nb_calc_next_entry_short(ep, sp_mod, bp, psize, pprice, tb)
+        if qty == 0.0:
+            break
+        if n > 0:
+            if order_type == OT_ENTRY_TRAILING_NORMAL_SHORT or order_type == OT_ENTRY_TRAILING_CROPPED_SHORT:
+                break
+            if entries[n - 1, 1] == price:
+                break
+        psize, pprice = nb_calc_new_psize_pprice(psize, pprice, qty, price, ep[EP_QTY_STEP])
+        sp_mod[SP_ASK] = max(sp_mod[SP_ASK], price)
+        entries[n, 0] = qty
+        entries[n, 1] = price
+        entries[n, 2] = order_type
+        n += 1
+    return entries[:n]
+
+# ----------------------------
+# Close Kernels (Long)
+# ----------------------------
+
+@njit(cache=True)
+def nb_calc_grid_close_long(ep, sp, bp, psize, pprice):
+    if psize <= 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    if bp[BP_CLOSE_GRID_MARKUP_RANGE] <= 0.0 or bp[BP_CLOSE_GRID_QTY_PCT] < 0.0 or bp[BP_CLOSE_GRID_QTY_PCT] >= 1.0:
+        price = max(sp[SP_ASK], nb_round_up(pprice * (1.0 + bp[BP_CLOSE_GRID_MIN_MARKUP]), ep[EP_PRICE_STEP]))
+        return -nb_round(psize, ep[EP_QTY_STEP]), price, OT_CLOSE_GRID_LONG
+    close_prices_start = nb_round_up(pprice * (1.0 + bp[BP_CLOSE_GRID_MIN_MARKUP]), ep[EP_PRICE_STEP])
+    close_prices_end = nb_round_up(
+        pprice * (1.0 + bp[BP_CLOSE_GRID_MIN_MARKUP] + bp[BP_CLOSE_GRID_MARKUP_RANGE]), ep[EP_PRICE_STEP])
+    if close_prices_start == close_prices_end:
+        return -nb_round(psize, ep[EP_QTY_STEP]), max(sp[SP_ASK], close_prices_start), OT_CLOSE_GRID_LONG
+    n_steps = math.ceil((close_prices_end - close_prices_start) / ep[EP_PRICE_STEP])
+    close_grid_qty_pct_modified = max(bp[BP_CLOSE_GRID_QTY_PCT], 1.0 / n_steps)
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], psize, pprice)
+    wallet_exposure_ratio = min(1.0, wallet_exposure / bp[BP_WEL])
+    close_price = max(
+        nb_round_up(
+            pprice * (1.0 + bp[BP_CLOSE_GRID_MIN_MARKUP] + bp[BP_CLOSE_GRID_MARKUP_RANGE] * (1.0 - wallet_exposure_ratio)),
+            ep[EP_PRICE_STEP],
+        ),
+        sp[SP_ASK],
+    )
+    close_qty = -nb_calc_close_qty(ep, bp, psize, pprice, close_grid_qty_pct_modified, sp[SP_BALANCE], close_price)
+    return close_qty, close_price, OT_CLOSE_GRID_LONG
+
+@njit(cache=True)
+def nb_calc_trailing_close_long(ep, sp, bp, psize, pprice, tb):
+    if psize == 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    if bp[BP_CLOSE_TRAILING_THRESHOLD_PCT] <= 0.0:
+        if (bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT] > 0.0 and
+            tb[TB_MIN_SINCE_MAX] < tb[TB_MAX_SINCE_OPEN] * (1.0 - bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT])):
+            qty = -nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], sp[SP_ASK])
+            return qty, sp[SP_ASK], OT_CLOSE_TRAILING_LONG
+        return 0.0, 0.0, OT_CLOSE_TRAILING_LONG
+    if bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT] <= 0.0:
+        close_price = max(sp[SP_ASK], nb_round_up(pprice * (1.0 + bp[BP_CLOSE_TRAILING_THRESHOLD_PCT]), ep[EP_PRICE_STEP]))
+        qty = -nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], close_price)
+        return qty, close_price, OT_CLOSE_TRAILING_LONG
+    if (tb[TB_MAX_SINCE_OPEN] > pprice * (1.0 + bp[BP_CLOSE_TRAILING_THRESHOLD_PCT]) and
+        tb[TB_MIN_SINCE_MAX] < tb[TB_MAX_SINCE_OPEN] * (1.0 - bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT])):
+        close_price = max(
+            sp[SP_ASK],
+            nb_round_up(
+                pprice * (1.0 + bp[BP_CLOSE_TRAILING_THRESHOLD_PCT] - bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT]),
+                ep[EP_PRICE_STEP],
+            ),
+        )
+        qty = -nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], close_price)
+        return qty, close_price, OT_CLOSE_TRAILING_LONG
+    return 0.0, 0.0, OT_CLOSE_TRAILING_LONG
+
+@njit(cache=True)
+def nb_calc_next_close_long(ep, sp, bp, psize, pprice, tb):
+    if psize == 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    ratio = bp[BP_CLOSE_TRAILING_GRID_RATIO]
+    if ratio >= 1.0 or ratio <= -1.0:
+        return nb_calc_trailing_close_long(ep, sp, bp, psize, pprice, tb)
+    if ratio == 0.0:
+        return nb_calc_grid_close_long(ep, sp, bp, psize, pprice)
+    wallet_exposure_ratio = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], psize, pprice) / bp[BP_WEL]
+    if ratio > 0.0:
+        if wallet_exposure_ratio < ratio:
+            return nb_calc_trailing_close_long(ep, sp, bp, psize, pprice, tb)
+        trailing_allocation = nb_cost_to_qty(sp[SP_BALANCE] * bp[BP_WEL] * ratio, pprice, ep[EP_C_MULT])
+        min_entry_qty = nb_calc_min_entry_qty(pprice, ep)
+        if trailing_allocation < min_entry_qty:
+            trailing_allocation = 0.0
+        grid_allocation = nb_round(psize - trailing_allocation, ep[EP_QTY_STEP])
+        return nb_calc_grid_close_long(ep, sp, bp, min(psize, max(grid_allocation, min_entry_qty)), pprice)
+    if wallet_exposure_ratio < 1.0 + ratio:
+        return nb_calc_grid_close_long(ep, sp, bp, psize, pprice)
+    grid_allocation = nb_cost_to_qty(sp[SP_BALANCE] * bp[BP_WEL] * (1.0 + ratio), pprice, ep[EP_C_MULT])
+    min_entry_qty = nb_calc_min_entry_qty(pprice, ep)
+    if grid_allocation < min_entry_qty:
+        grid_allocation = 0.0
+    trailing_allocation = nb_round(psize - grid_allocation, ep[EP_QTY_STEP])
+    return nb_calc_trailing_close_long(ep, sp, bp, min(psize, max(trailing_allocation, min_entry_qty)), pprice, tb)
+
+@njit(cache=True)
+def nb_calc_closes_long(ep, sp, bp, psize, pprice, tb):
+    closes = np.zeros((MAX_ORDERS, 3))
+    n = 0
+    sp_mod = sp.copy()
+    for _ in range(MAX_ORDERS):
+        qty, price, order_type = nb_calc_next_close_long(ep, sp_mod, bp, psize, pprice, tb)
+        if qty == 0.0:
+            break
+        psize = nb_round(psize + qty, ep[EP_QTY_STEP])
+        sp_mod[SP_ASK] = max(sp_mod[SP_ASK], price)
+        if n > 0:
+            if order_type == OT_CLOSE_TRAILING_LONG:
+                closes[n, 0] = qty
+                closes[n, 1] = price
+                closes[n, 2] = order_type
+                n += 1
+                break
+            if closes[n - 1, 1] == price:
+                closes[n - 1, 0] = nb_round(closes[n - 1, 0] + qty, ep[EP_QTY_STEP])
+                closes[n - 1, 2] = order_type
+                continue
+        closes[n, 0] = qty
+        closes[n, 1] = price
+        closes[n, 2] = order_type
+        n += 1
+    return closes[:n]
+
+# ----------------------------
+# Close Kernels (Short)
+# ----------------------------
+
+@njit(cache=True)
+def nb_calc_grid_close_short(ep, sp, bp, psize, pprice):
+    position_size_abs = abs(psize)
+    if position_size_abs == 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    if bp[BP_CLOSE_GRID_MARKUP_RANGE] <= 0.0 or bp[BP_CLOSE_GRID_QTY_PCT] < 0.0 or bp[BP_CLOSE_GRID_QTY_PCT] >= 1.0:
+        price = min(sp[SP_BID], nb_round_dn(pprice * (1.0 - bp[BP_CLOSE_GRID_MIN_MARKUP]), ep[EP_PRICE_STEP]))
+        return nb_round(position_size_abs, ep[EP_QTY_STEP]), price, OT_CLOSE_GRID_SHORT
+    close_prices_start = nb_round_dn(pprice * (1.0 - bp[BP_CLOSE_GRID_MIN_MARKUP]), ep[EP_PRICE_STEP])
+    close_prices_end = nb_round_dn(
+        pprice * (1.0 - bp[BP_CLOSE_GRID_MIN_MARKUP] - bp[BP_CLOSE_GRID_MARKUP_RANGE]), ep[EP_PRICE_STEP])
+    if close_prices_start == close_prices_end:
+        return nb_round(position_size_abs, ep[EP_QTY_STEP]), min(sp[SP_BID], close_prices_start), OT_CLOSE_GRID_SHORT
+    n_steps = math.ceil((close_prices_start - close_prices_end) / ep[EP_PRICE_STEP])
+    close_grid_qty_pct_modified = max(bp[BP_CLOSE_GRID_QTY_PCT], 1.0 / n_steps)
+    wallet_exposure = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], position_size_abs, pprice)
+    wallet_exposure_ratio = min(1.0, wallet_exposure / bp[BP_WEL])
+    close_price = min(
+        nb_round_dn(
+            pprice * (1.0 - bp[BP_CLOSE_GRID_MIN_MARKUP] - bp[BP_CLOSE_GRID_MARKUP_RANGE] * (1.0 - wallet_exposure_ratio)),
+            ep[EP_PRICE_STEP],
+        ),
+        sp[SP_BID],
+    )
+    close_qty = nb_calc_close_qty(ep, bp, psize, pprice, close_grid_qty_pct_modified, sp[SP_BALANCE], close_price)
+    return close_qty, close_price, OT_CLOSE_GRID_SHORT
+
+@njit(cache=True)
+def nb_calc_trailing_close_short(ep, sp, bp, psize, pprice, tb):
+    if abs(psize) == 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    if bp[BP_CLOSE_TRAILING_THRESHOLD_PCT] <= 0.0:
+        if (bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT] > 0.0 and
+            tb[TB_MAX_SINCE_MIN] > tb[TB_MIN_SINCE_OPEN] * (1.0 + bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT])):
+            qty = nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], sp[SP_BID])
+            return qty, sp[SP_BID], OT_CLOSE_TRAILING_SHORT
+        return 0.0, 0.0, OT_CLOSE_TRAILING_SHORT
+    if bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT] <= 0.0:
+        close_price = min(sp[SP_BID], nb_round_dn(pprice * (1.0 - bp[BP_CLOSE_TRAILING_THRESHOLD_PCT]), ep[EP_PRICE_STEP]))
+        qty = nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], close_price)
+        return qty, close_price, OT_CLOSE_TRAILING_SHORT
+    if (tb[TB_MIN_SINCE_OPEN] < pprice * (1.0 - bp[BP_CLOSE_TRAILING_THRESHOLD_PCT]) and
+        tb[TB_MAX_SINCE_MIN] > tb[TB_MIN_SINCE_OPEN] * (1.0 + bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT])):
+        close_price = min(
+            sp[SP_BID],
+            nb_round_dn(
+                pprice * (1.0 - bp[BP_CLOSE_TRAILING_THRESHOLD_PCT] + bp[BP_CLOSE_TRAILING_RETRACEMENT_PCT]),
+                ep[EP_PRICE_STEP],
+            ),
+        )
+        qty = nb_calc_close_qty(ep, bp, psize, pprice, bp[BP_CLOSE_TRAILING_QTY_PCT], sp[SP_BALANCE], close_price)
+        return qty, close_price, OT_CLOSE_TRAILING_SHORT
+    return 0.0, 0.0, OT_CLOSE_TRAILING_SHORT
+
+@njit(cache=True)
+def nb_calc_next_close_short(ep, sp, bp, psize, pprice, tb):
+    position_size_abs = abs(psize)
+    if position_size_abs == 0.0:
+        return 0.0, 0.0, OT_DEFAULT
+    ratio = bp[BP_CLOSE_TRAILING_GRID_RATIO]
+    if ratio >= 1.0 or ratio <= -1.0:
+        return nb_calc_trailing_close_short(ep, sp, bp, psize, pprice, tb)
+    if ratio == 0.0:
+        return nb_calc_grid_close_short(ep, sp, bp, psize, pprice)
+    wallet_exposure_ratio = nb_calc_wallet_exposure(ep[EP_C_MULT], sp[SP_BALANCE], position_size_abs, pprice) / bp[BP_WEL]
+    if ratio > 0.0:
+        if wallet_exposure_ratio < ratio:
+            return nb_calc_trailing_close_short(ep, sp, bp, psize, pprice, tb)
+        trailing_allocation = nb_cost_to_qty(sp[SP_BALANCE] * bp[BP_WEL] * ratio, pprice, ep[EP_C_MULT])
+        min_entry_qty = nb_calc_min_entry_qty(pprice, ep)
+        if trailing_allocation < min_entry_qty:
+            trailing_allocation = 0.0
+        grid_allocation = nb_round(position_size_abs - trailing_allocation, ep[EP_QTY_STEP])
+        return nb_calc_grid_close_short(ep, sp, bp, -min(position_size_abs, max(grid_allocation, min_entry_qty)), pprice)
+    if wallet_exposure_ratio < 1.0 + ratio:
+        return nb_calc_grid_close_short(ep, sp, bp, psize, pprice)
+    grid_allocation = nb_cost_to_qty(sp[SP_BALANCE] * bp[BP_WEL] * (1.0 + ratio), pprice, ep[EP_C_MULT])
+    min_entry_qty = nb_calc_min_entry_qty(pprice, ep)
+    if grid_allocation < min_entry_qty:
+        grid_allocation = 0.0
+    trailing_allocation = nb_round(position_size_abs - grid_allocation, ep[EP_QTY_STEP])
+    return nb_calc_trailing_close_short(ep, sp, bp, -min(position_size_abs, max(trailing_allocation, min_entry_qty)), pprice, tb)
+
+@njit(cache=True)
+def nb_calc_closes_short(ep, sp, bp, psize, pprice, tb):
+    closes = np.zeros((MAX_ORDERS, 3))
+    n = 0
+    sp_mod = sp.copy()
+    for _ in range(MAX_ORDERS):
+        qty, price, order_type = nb_calc_next_close_short(ep, sp_mod, bp, psize, pprice, tb)
+        if qty == 0.0:
+            break
+        psize = nb_round(psize + qty, ep[EP_QTY_STEP])
+        sp_mod[SP_BID] = min(sp_mod[SP_BID], price)
+        if n > 0:
+            if order_type == OT_CLOSE_TRAILING_SHORT:
+                closes[n, 0] = qty
+                closes[n, 1] = price
+                closes[n, 2] = order_type
+                n += 1
+                break
+            if closes[n - 1, 1] == price:
+                closes[n - 1, 0] = nb_round(closes[n - 1, 0] + qty, ep[EP_QTY_STEP])
+                closes[n - 1, 2] = order_type
+                continue
+        closes[n, 0] = qty
+        closes[n, 1] = price
+        closes[n, 2] = order_type
+        n += 1
+    return closes[:n]
+
+# ----------------------------
+# Public API (same as GridVisualizerV7)
+# ----------------------------
+
+def calc_entries_long(exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    if not NUMBA_AVAILABLE:
+        return gv.calc_entries_long(exchange_params, state_params, bot_params, position, trailing_price_bundle)
+    return unpack_orders(nb_calc_entries_long(
+        pack_exchange_params(exchange_params),
+        pack_state_params(state_params),
+        pack_bot_params(bot_params),
+        float(position.size),
+        float(position.price),
+        pack_trailing_price_bundle(trailing_price_bundle),
+    ))
+
+def calc_entries_short(exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    if not NUMBA_AVAILABLE:
+        return gv.calc_entries_short(exchange_params, state_params, bot_params, position, trailing_price_bundle)
+    return unpack_orders(nb_calc_entries_short(
+        pack_exchange_params(exchange_params),
+        pack_state_params(state_params),
+        pack_bot_params(bot_params),
+        float(position.size),
+        float(position.price),
+        pack_trailing_price_bundle(trailing_price_bundle),
+    ))
+
+def calc_closes_long(exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    if not NUMBA_AVAILABLE:
+        return gv.calc_closes_long(exchange_params, state_params, bot_params, position, trailing_price_bundle)
+    return unpack_orders(nb_calc_closes_long(
+        pack_exchange_params(exchange_params),
+        pack_state_params(state_params),
+        pack_bot_params(bot_params),
+        float(position.size),
+        float(position.price),
+        pack_trailing_price_bundle(trailing_price_bundle),
+    ))
+
+def calc_closes_short(exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    if not NUMBA_AVAILABLE:
+        return gv.calc_closes_short(exchange_params, state_params, bot_params, position, trailing_price_bundle)
+    return unpack_orders(nb_calc_closes_short(
+        pack_exchange_params(exchange_params),
+        pack_state_params(state_params),
+        pack_bot_params(bot_params),
+        float(position.size),
+        float(position.price),
+        pack_trailing_price_bundle(trailing_price_bundle),
+    ))
+
+# ----------------------------
+# Memoized Calculation
+# ----------------------------
+
+# BotParams fields that influence entries or closes
+ENTRY_FIELDS = (
+    "wallet_exposure_limit",
+    "entry_initial_qty_pct",
+    "entry_initial_ema_dist",
+    "entry_grid_spacing_pct",
+    "entry_grid_spacing_weight",
+    "entry_grid_double_down_factor",
+    "entry_trailing_threshold_pct",
+    "entry_trailing_retracement_pct",
+    "entry_trailing_grid_ratio",
+)
+CLOSE_FIELDS = (
+    "wallet_exposure_limit",
+    "close_grid_min_markup",
+    "close_grid_markup_range",
+    "close_grid_qty_pct",
+    "close_trailing_threshold_pct",
+    "close_trailing_retracement_pct",
+    "close_trailing_qty_pct",
+    "close_trailing_grid_ratio",
+)
+
+GRID_CACHE_SIZE = 128
+grid_cache = OrderedDict()
+grid_cache_stats = {"hits": 0, "misses": 0}
+
+def grid_cache_key(calc, exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    fields = ENTRY_FIELDS if calc in (calc_entries_long, calc_entries_short) else CLOSE_FIELDS
+    return (
+        calc.__name__,
+        exchange_params.min_qty,
+        exchange_params.min_cost,
+        exchange_params.qty_step,
+        exchange_params.price_step,
+        exchange_params.c_mult,
+        state_params.balance,
+        state_params.order_book.bid,
+        state_params.order_book.ask,
+        state_params.ema_bands.lower,
+        state_params.ema_bands.upper,
+        position.size,
+        position.price,
+        trailing_price_bundle.max_since_open,
+        trailing_price_bundle.min_since_open,
+        trailing_price_bundle.max_since_min,
+        trailing_price_bundle.min_since_max,
+    ) + tuple(getattr(bot_params, f) for f in fields)
+
+def calc_cached(calc, exchange_params, state_params, bot_params, position, trailing_price_bundle):
+    """
+    Runs one of calc_entries_long/short or calc_closes_long/short through a LRU cache.
+
+    The key contains only the BotParams fields the calculation depends on, so changing
+    a close parameter does not recompute the entries. Returns new Order objects on
+    every call, callers may modify them.
+    """
+    key = grid_cache_key(calc, exchange_params, state_params, bot_params, position, trailing_price_bundle)
+    if key in grid_cache:
+        grid_cache.move_to_end(key)
+        grid_cache_stats["hits"] += 1
+        orders = grid_cache[key]
+    else:
+        grid_cache_stats["misses"] += 1
+        orders = tuple((o.qty, o.price, o.order_type) for o in calc(exchange_params, state_params, bot_params, position, trailing_price_bundle))
+        grid_cache[key] = orders
+        while len(grid_cache) > GRID_CACHE_SIZE:
+            grid_cache.popitem(last=False)
+    return [Order(qty=qty, price=price, order_type=order_type) for (qty, price, order_type) in orders]
+
+def clear_grid_cache():
+    grid_cache.clear()
+    grid_cache_stats["hits"] = 0
+    grid_cache_stats["misses"] = 0
+
+# ----------------------------
+# Parameter Sweep
+# ----------------------------
+
+SWEEP_PARAMS = [
+    "wallet_exposure_limit",
+    "entry_initial_qty_pct",
+    "entry_initial_ema_dist",
+    "entry_grid_spacing_pct",
+    "entry_grid_spacing_weight",
+    "entry_grid_double_down_factor",
+    "entry_trailing_threshold_pct",
+    "entry_trailing_retracement_pct",
+    "entry_trailing_grid_ratio",
+    "close_grid_min_markup",
+    "close_grid_markup_range",
+    "close_grid_qty_pct",
+    "close_trailing_threshold_pct",
+    "close_trailing_retracement_pct",
+    "close_trailing_qty_pct",
+    "close_trailing_grid_ratio",
+]
+
+SWEEP_METRICS = [
+    "total_entry_qty",
+    "max_wallet_exposure",
+    "last_entry_distance",
+    "entry_count",
+    "close_count",
+]
+
+def sweep_range(value: float, rel_span: float = 0.5, abs_span: float = 0.01):
+    """
+    Default (min, max) of a sweep axis: value -/+ rel_span of value.
+    Negative values get ordered bounds, 0 sweeps from 0 to abs_span.
+    """
+    if value == 0.0:
+        return 0.0, abs_span
+    low = value * (1.0 - rel_span)
+    high = value * (1.0 + rel_span)
+    return min(low, high), max(low, high)
+
+def calc_grid_metrics(exchange_params, state_params, entries: list, closes: list, position=None) -> dict:
+    """
+    Summarizes an entry and close grid.
+
+    total_entry_qty: sum of all entry qtys
+    max_wallet_exposure: wallet exposure after all entries are filled, starting from position
+    last_entry_distance: distance of the last entry from the first one (0.05 = 5%)
+    """
+    if position is not None and position.size != 0.0:
+        psize = abs(position.size)
+        pprice = position.price
+    else:
+        psize = 0.0
+        pprice = 0.0
+    for entry in entries:
+        (psize, pprice) = gv.calc_new_psize_pprice(psize, pprice, abs(entry.qty), entry.price, exchange_params.qty_step)
+    return {
+        "total_entry_qty": sum(abs(o.qty) for o in entries),
+        "max_wallet_exposure": gv.calc_wallet_exposure(exchange_params.c_mult, state_params.balance, psize, pprice),
+        "last_entry_distance": abs(entries[-1].price / entries[0].price - 1.0) if entries and entries[0].price > 0.0 else 0.0,
+        "entry_count": len(entries),
+        "close_count": len(closes),
+    }
+
+def calc_sweep(
+    exchange_params,
+    state_params,
+    bot_params,
+    entry_position,
+    close_position,
+    trailing_price_bundle,
+    side,
+    param_x: str,
+    values_x: list,
+    param_y: str,
+    values_y: list,
+) -> dict:
+    """
+    Evaluates the entry and close grid for every combination of values_x and values_y
+    of the two BotParams fields param_x and param_y.
+
+    Returns a dict with one 2-D numpy array per metric in SWEEP_METRICS,
+    indexed [y, x] so it can be passed to a heatmap directly.
+    """
+    if param_x not in SWEEP_PARAMS or param_y not in SWEEP_PARAMS:
+        raise ValueError(f"Sweep parameters must be one of {SWEEP_PARAMS}")
+    if side == gv.Side.Long:
+        calc_entries, calc_closes = calc_entries_long, calc_closes_long
+    else:
+        calc_entries, calc_closes = calc_entries_short, calc_closes_short
+    result = {metric: np.zeros((len(values_y), len(values_x))) for metric in SWEEP_METRICS}
+    for iy, value_y in enumerate(values_y):
+        for ix, value_x in enumerate(values_x):
+            bot_params_sweep = bot_params.clone()
+            setattr(bot_params_sweep, param_x, float(value_x))
+            setattr(bot_params_sweep, param_y, float(value_y))
+            entries = calc_entries(exchange_params, state_params, bot_params_sweep, entry_position, trailing_price_bundle)
+            closes = calc_closes(exchange_params, state_params, bot_params_sweep, close_position, trailing_price_bundle)
+            metrics = calc_grid_metrics(exchange_params, state_params, entries, closes, entry_position)
+            for metric in SWEEP_METRICS:
+                result[metric][iy, ix] = metrics[metric]
+    return result
@@ -8,6 +8,7 @@ from streamlit_autorefresh import st_autorefresh
 from Config import Config
 import shutil
 import json
+from pbgui_purefunc import write_json_atomic
 import glob
 import pandas as pd
 from datetime import datetime
@@ -947,8 +948,7 @@ class Instance(Base):
         else:
             status["spot_balance"] = self.fetch_spot_balance()
         status["orders"] = self.fetch_open_orders()
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(status, f, indent=4)
+        write_json_atomic(file, status, indent=4)
 
     def save(self):
         if self.user and self.symbol and self.market_type:
@@ -0,0 +1,59 @@
+"""
+Runs a command in the background for the GUI and reports its progress.
+
+    python JobRunner.py <progress.json> <stdout.log> <stderr.log> <cwd> <command...>
+
+The progress file is written atomically, so the GUI can poll it without blocking:
+    pid: pid of JobRunner
+    state: running or finished
+    started / updated: timestamps
+    lines: number of output lines written so far
+    returncode: exit code of the command when finished
+"""
+import sys
+import subprocess
+from pathlib import Path
+from time import sleep, time
+from pbgui_purefunc import write_json_atomic
+import os
+
+def count_lines(file: Path, offset: int):
+    """Returns the newlines in file after offset and the new offset"""
+    try:
+        with open(file, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return 0, offset
+    return data.count(b"\n"), offset + len(data)
+
+def run_job(progress_file: Path, log: Path, err: Path, cwd: str, cmd: list, interval: float = 1.0):
+    """Runs cmd and updates progress_file every interval seconds, returns the exit code"""
+    progress = {"pid": os.getpid(), "state": "running", "started": time(), "updated": time(), "lines": 0, "returncode": None}
+    write_json_atomic(progress_file, progress)
+    with open(log, "w") as f_log, open(err, "w") as f_err:
+        job = subprocess.Popen(cmd, stdout=f_log, stderr=f_err, cwd=cwd, text=True)
+    offset = 0
+    while job.poll() is None:
+        sleep(interval)
+        lines, offset = count_lines(log, offset)
+        progress["lines"] += lines
+        progress["updated"] = time()
+        write_json_atomic(progress_file, progress)
+    lines, offset = count_lines(log, offset)
+    progress["lines"] += lines
+    progress["updated"] = time()
+    progress["state"] = "finished"
+    progress["returncode"] = job.returncode
+    write_json_atomic(progress_file, progress)
+    return job.returncode
+
+def main():
+    if len(sys.argv) < 6:
+        print(__doc__)
+        exit(1)
+    progress_file, log, err, cwd = sys.argv[1:5]
+    exit(run_job(Path(progress_file), Path(log), Path(err), cwd, sys.argv[5:]))
+
+if __name__ == '__main__':
+    main()
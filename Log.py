@@ -1,6 +1,173 @@
 import os
+import sys
+import gzip
+import shutil
+import threading
 import logging
-from logging.handlers import RotatingFileHandler
+from time import time
+from io import TextIOWrapper
+from pathlib import Path
+from logging.handlers import BaseRotatingHandler, RotatingFileHandler, TimedRotatingFileHandler
+from pbgui_purefunc import load_ini
+
+# Default number of compressed generations (file.1.gz is the newest)
+BACKUP_COUNT = 3
+
+
+def compress_file(source: str, destination: str):
+    """
+    Compresses source with gzip into destination and removes source.
+    Writes a .tmp file first, so destination is never a partial archive.
+    """
+    tmp = f'{destination}.tmp'
+    with open(source, "rb") as f_in, gzip.open(tmp, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.replace(tmp, destination)
+    os.remove(source)
+
+
+class Compressor:
+    """
+    Rotator for logging handlers and LogRotator. Renames the log and compresses it in a background
+    thread, so writers only wait for the rename and not for gzip.
+    """
+
+    def __init__(self):
+        self._thread = None
+
+    def wait(self):
+        """Waits until the last compression is done"""
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def namer(self, name: str) -> str:
+        """
+        Namer for logging handlers. The handler names the backups before it shifts them, waiting
+        here makes sure the newest backup is compressed before it is moved.
+        """
+        self.wait()
+        return f'{name}.gz'
+
+    def __call__(self, source: str, dest: str):
+        """Renames source to dest without .gz and compresses it to dest"""
+        self.wait()
+        plain = dest[:-3] if dest.endswith(".gz") else dest
+        os.replace(source, plain)
+        if plain != dest:
+            self.compress(plain, dest)
+
+    def compress(self, source: str, dest: str):
+        self._thread = threading.Thread(target=compress_file, args=(source, dest), name=f'compress {Path(dest).name}')
+        self._thread.start()
+
+
+def redirect_output(logfile: Path):
+    """Redirects stdout and stderr of a daemon to logfile"""
+    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+
+
+class LogRotator:
+    """
+    Rotates a log file by size or age into backup_count generations (file.1.gz is the newest).
+
+    The log is renamed, a writer that still has it open keeps writing into the renamed file until it
+    reopens the log (use the reopen callback of rotate). Logs of child processes that can not be
+    reopened (passivbot.log) use copy_truncate: the log is copied and truncated in place.
+
+    max_age and backup_count default to the [logging] max_age (hours, 0 = off) and backup_count
+    settings of pbgui.ini.
+    """
+
+    def __init__(
+        self,
+        logfile: Path,
+        max_bytes: int = 10_485_760,  # 10 MB
+        max_age: float = None,
+        backup_count: int = None,
+        compress: bool = True,
+        copy_truncate: bool = False
+    ):
+        self.logfile = Path(logfile)
+        self.max_bytes = max_bytes
+        if max_age is None:
+            max_age = float(load_ini("logging", "max_age") or 0) * 3600
+        self.max_age = max_age
+        if backup_count is None:
+            backup_count = int(load_ini("logging", "backup_count") or BACKUP_COUNT)
+        self.backup_count = max(1, backup_count)
+        self.compress = compress
+        self.copy_truncate = copy_truncate
+        self.compressor = Compressor()
+        self.rotated_ts = self.last_rotation()
+
+    def backup_name(self, generation: int) -> Path:
+        suffix = ".gz" if self.compress else ""
+        return Path(f'{self.logfile}.{generation}{suffix}')
+
+    def last_rotation(self) -> float:
+        """Time of the last rotation from the newest generation, so a restart does not reset the age"""
+        try:
+            return self.backup_name(1).stat().st_mtime
+        except FileNotFoundError:
+            return time()
+
+    def should_rotate(self) -> bool:
+        try:
+            size = self.logfile.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        return bool(self.max_age) and time() - self.rotated_ts >= self.max_age
+
+    def shift(self):
+        """Moves every generation one up, the oldest is removed"""
+        self.compressor.wait()
+        self.backup_name(self.backup_count).unlink(missing_ok=True)
+        for generation in range(self.backup_count - 1, 0, -1):
+            backup = self.backup_name(generation)
+            if backup.exists():
+                backup.replace(self.backup_name(generation + 1))
+
+    def rotate(self, reopen=None):
+        """
+        Rotates the log now.
+        :param reopen: Called after the rename, before the old log is compressed, to reopen the log.
+        """
+        self.shift()
+        dest = str(self.backup_name(1))
+        plain = dest[:-3] if self.compress else dest
+        if self.copy_truncate:
+            self.copy_and_truncate(plain)
+        else:
+            os.replace(self.logfile, plain)
+        if reopen:
+            reopen()
+        if self.compress:
+            self.compressor.compress(plain, dest)
+        self.rotated_ts = time()
+
+    def copy_and_truncate(self, dest: str):
+        """Copies the log to dest and truncates it, catches up with lines written during the copy"""
+        with open(self.logfile, "r+b") as log, open(dest, "wb") as backup:
+            shutil.copyfileobj(log, backup)
+            while True:
+                chunk = log.read()
+                if not chunk:
+                    break
+                backup.write(chunk)
+            log.truncate(0)
+
+    def rotate_if_needed(self, reopen=None) -> bool:
+        """Rotates the log if it is too big or too old, returns True if rotated"""
+        if self.should_rotate():
+            self.rotate(reopen)
+            return True
+        return False
 
 
 class LogHandler:
@@ -9,7 +176,8 @@ class LogHandler:
     
     Features:
       - Configurable base directory for logs.
-      - Automatic rotation by file size using RotatingFileHandler.
+      - Automatic rotation by file size (RotatingFileHandler) or time (TimedRotatingFileHandler).
+      - Optional gzip compression of the backups in a background thread.
       - Easy methods to clear the log file or rotate logs on demand.
       - Ability to set the logging level dynamically.
       - Convenience methods for adding log lines at various severity levels.
@@ -23,7 +191,10 @@ class LogHandler:
         backup_filename: str = "debug.log.old",   # For demonstration if you want manual rename.
         base_dir: str = ".",
         max_bytes: int = 1_000_000,  # 1 MB
-        backup_count: int = 1
+        backup_count: int = 1,
+        when: str = None,
+        interval: int = 1,
+        compress: bool = False
     ):
         """
         :param logger_name: Name of the logger.
@@ -32,6 +203,9 @@ class LogHandler:
         :param base_dir: Base directory where log files should be stored.
         :param max_bytes: Max file size (in bytes) before rotating.
         :param backup_count: Number of backup files to keep.
+        :param when: Rotate by time instead of size, e.g. "midnight" or "H" (see TimedRotatingFileHandler).
+        :param interval: Number of when units between rotations.
+        :param compress: Compress the backups with gzip (debug.log.1.gz).
         """
         self.logger_name: str = logger_name
         self.log_filename: str = log_filename
@@ -39,6 +213,9 @@ class LogHandler:
         self.base_dir: str = base_dir
         self.max_bytes: int = max_bytes
         self.backup_count: int = backup_count
+        self.when: str = when
+        self.interval: int = interval
+        self.compress: bool = compress
         self.level = logging.DEBUG
         
         # Internal references
@@ -59,13 +236,26 @@ class LogHandler:
 
         # Prevent attaching multiple handlers if re-initialized
         if not self._logger.handlers:
-            rotating_handler = RotatingFileHandler(
-                filename=self._log_path,
-                mode="a+",
-                encoding="utf-8",
-                maxBytes=self.max_bytes,
-                backupCount=self.backup_count,
-            )
+            if self.when:
+                rotating_handler = TimedRotatingFileHandler(
+                    filename=self._log_path,
+                    encoding="utf-8",
+                    when=self.when,
+                    interval=self.interval,
+                    backupCount=self.backup_count,
+                )
+            else:
+                rotating_handler = RotatingFileHandler(
+                    filename=self._log_path,
+                    mode="a+",
+                    encoding="utf-8",
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backup_count,
+                )
+            if self.compress:
+                compressor = Compressor()
+                rotating_handler.namer = compressor.namer
+                rotating_handler.rotator = compressor
 
             formatter = logging.Formatter(
                 fmt="%(asctime)s [%(levelname)-8s] %(message)s",
@@ -121,7 +311,7 @@ class LogHandler:
         Manually force the rotation of logs, if you ever need that.
         """
         for handler in self._logger.handlers:
-            if isinstance(handler, RotatingFileHandler):
+            if isinstance(handler, BaseRotatingHandler):
                 handler.doRollover()
     
     def rotate_if_needed(self):
@@ -2,6 +2,8 @@ import streamlit as st
 from pbgui_purefunc import load_ini, save_ini
 from datetime import datetime
 import pandas as pd
+import plotly.graph_objects as go
+from ServerMetrics import ServerMetrics, METRICS
 
 class Monitor():
     def __init__(self):
@@ -44,6 +46,23 @@ class Monitor():
                 cpu_color = "yellow"
             st.markdown(f"##### CPU utilization: :{cpu_color}[{server.cpu}] %  |  System boot: :blue[{boot}]")
 
+    def view_server_metrics(self):
+        server = self.server
+        with st.expander("Server history", expanded=False):
+            resolution = st.radio("Resolution", ["1m", "1h"], horizontal=True, key=f"monitor_metrics_resolution_{server.name}")
+            history = ServerMetrics().fetch(server.name, resolution)
+            if not history:
+                st.info("No history for this server yet")
+                return
+            df = pd.DataFrame(history)
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+            fig = go.Figure()
+            for metric in METRICS:
+                fig.add_trace(go.Scatter(x=df["timestamp"], y=df[metric], name=f"{metric} %", line=dict(width=1)))
+            fig.add_trace(go.Scatter(x=df["timestamp"], y=df["mem_max"], name="mem max %", line=dict(width=1, dash="dot")))
+            fig.update_layout(yaxis=dict(title="Usage %", range=[0, 100]), height=350, margin=dict(t=20, b=20))
+            st.plotly_chart(fig, key=f"monitor_metrics_{server.name}")
+
     def view_server_instances(self):
         v7_selected = None
         if f"pbremote_v7_select" in st.session_state:
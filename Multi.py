@@ -13,25 +13,69 @@ import glob
 from shutil import rmtree
 import traceback
 import shutil
+import copy
+from pbgui_purefunc import copy_if_changed, file_version
+
+# Parsed multi.hjson by path: (file_version, multi_config)
+multi_config_cache = {}
+
+def load_multi_config(file: Path):
+    """Returns a copy of the parsed multi.hjson, only parsed again when the file changed"""
+    version = file_version(os.stat(file))
+    cached = multi_config_cache.get(str(file))
+    if not version or not cached or cached[0] != version:
+        with open(file, "r", encoding='utf-8') as f:
+            multi_config = hjson.loads(f.read())
+        cached = (version, multi_config)
+        if version:
+            multi_config_cache[str(file)] = cached
+    return copy.deepcopy(cached[1])
+
+# Parsed symbol configs of multi instances by path: (file_version, Config)
+symbol_config_cache = {}
+
+def load_symbol_config(file: Path):
+    """Returns the parsed {symbol}.json of a multi instance, only parsed again when the file changed. Do not modify it."""
+    version = file_version(os.stat(file))
+    cached = symbol_config_cache.get(str(file))
+    if not version or not cached or cached[0] != version:
+        config = Config(file)
+        config.load_config()
+        cached = (version, config)
+        if version:
+            symbol_config_cache[str(file)] = cached
+    return cached[1]
 
 class MultiInstance():
-    def __init__(self):
+    def __init__(self, defaults: bool = True):
+        """defaults: initialize with the default user, MultiInstances skips this and initializes in load()"""
         self.instance_path = None
-        self._users = Users()
-        users = self._users.list()
-        if users:
-            self._user = self._users.list()[0]
-        else:
-            self._user = ""
+        # Users, default user and default config are loaded on first access
+        self._users = None
+        self._user = None
         self._multi_config = {}
-        self.initialize()
+        if defaults:
+            self.initialize()
+
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = Users()
+        return self._users
 
     # user
     @property
-    def user(self): return self._user
+    def user(self):
+        if self._user is None:
+            users = self.users.list()
+            if users:
+                self._user = users[0]
+            else:
+                self._user = ""
+        return self._user
     @user.setter
     def user(self, new_user):
-        if new_user != self._user:
+        if new_user != self.user:
             self._user = new_user
             # Reset GUI
             if "edit_multi_user" in st.session_state and "edit_multi_loss_allowance_pct" in st.session_state:
@@ -73,7 +117,7 @@ class MultiInstance():
             self.initialize()
             # Load Multi config if available
             pbgdir = Path.cwd()
-            self.load(Path(f'{pbgdir}/data/multi/{self._user}'))
+            self.load(Path(f'{pbgdir}/data/multi/{self.user}'))
     # enabled_on
     @property
     def enabled_on(self): return self._enabled_on
@@ -270,6 +314,26 @@ class MultiInstance():
     @filter_by_min_effective_cost.setter
     def filter_by_min_effective_cost(self, new_filter_by_min_effective_cost):
         self._filter_by_min_effective_cost = new_filter_by_min_effective_cost
+    # default_config
+    @property
+    def default_config(self):
+        """default.json of the instance or the passivbot example config, loaded on first access"""
+        if self._default_config is None:
+            default_config = Path(f'{self.instance_path}/default.json')
+            if default_config.exists():
+                self._default_config = Config(default_config)
+            else:
+                default_config =  Path(f'{pbdir()}/configs/live/recursive_grid_mode.example.json')
+                if default_config.exists():
+                    self._default_config = Config(default_config)
+                else:
+                    self._default_config = Config()
+            self._default_config.load_config()
+        return self._default_config
+    @default_config.setter
+    def default_config(self, new_default_config):
+        self._default_config = new_default_config
+
     # default_config_path
     @property
     def default_config_path(self): return self._default_config_path
@@ -327,18 +391,8 @@ class MultiInstance():
         self._short_enabled = False
         self._symbols = []
         self._ignored_symbols = []
-        self._default_config = ""
+        self._default_config = None
         self._default_config_path = f'{self.instance_path}/default.json'
-        default_config = Path(f'{self.instance_path}/default.json')
-        if default_config.exists():
-            self.default_config = Config(default_config)
-        else:
-            default_config =  Path(f'{pbdir()}/configs/live/recursive_grid_mode.example.json')
-            if default_config.exists():
-                self.default_config = Config(default_config)
-            else:
-                self.default_config = Config()
-        self.default_config.load_config()
         self._universal_live_config = ""
         self._n_longs = 0
         self._n_shorts = 0
@@ -423,9 +477,9 @@ class MultiInstance():
         if "ignored_symbols" in self._multi_config:
             self._ignored_symbols = self._multi_config["ignored_symbols"]
         # # Load available symbols
-        # self._available_symbols = load_symbols_from_ini(exchange=self._users.find_exchange(self.user), market_type='swap')
+        # self._available_symbols = load_symbols_from_ini(exchange=self.users.find_exchange(self.user), market_type='swap')
         # # Load cpt allowed symbols
-        # self._cpt_allowed_symbols = load_symbols_from_ini(exchange=self._users.find_exchange(self.user), market_type='cpt')
+        # self._cpt_allowed_symbols = load_symbols_from_ini(exchange=self.users.find_exchange(self.user), market_type='cpt')
         # Load instances from user
         for instance in st.session_state.pbgui_instances:
             if instance.user == self.user and instance.market_type == "futures" :
@@ -468,8 +522,10 @@ class MultiInstance():
             if instance.user == self.user and instance.market_type == "futures":
                 user_symbols.append(instance.symbol)
                 if instance.multi:
-                    instance.enabled_on = self.enabled_on
-                    instance.save()
+                    # save() writes the config and bumps the version, only needed when enabled_on changed
+                    if instance.enabled_on != self.enabled_on:
+                        instance.enabled_on = self.enabled_on
+                        instance.save()
                     if instance._config.long_enabled:
                         lm = f'-lm n'
                         lw = f'-lw {instance._config.long_we}'
@@ -501,7 +557,7 @@ class MultiInstance():
                     elif instance.short_mode == "tp_only":
                         sm = f'-sm t'
                     symbols[instance.symbol] = f'{lm} {lw} {sm} {sw}'    
-                    shutil.copy(f'{instance.instance_path}/config.json', f'{self.instance_path}/{instance.symbol}.json')
+                    copy_if_changed(f'{instance.instance_path}/config.json', f'{self.instance_path}/{instance.symbol}.json')
                 else:
                     Path(f'{self.instance_path}/{instance.symbol}.json').unlink(missing_ok=True)
         for symbol in self._symbols:
@@ -509,8 +565,7 @@ class MultiInstance():
             if symbol not in user_symbols:
                 config_file = Path(f'{self.instance_path}/{symbol}.json')
                 if config_file.exists():
-                    multi_config = Config(config_file)
-                    multi_config.load_config()
+                    multi_config = load_symbol_config(config_file)
                 else:
                     multi_config = self.default_config
                     default_config = True
@@ -558,9 +613,7 @@ class MultiInstance():
         file = Path(f'{path}/multi.hjson')
         if file.exists():
             try:
-                with open(file, "r", encoding='utf-8') as f:
-                    multi_config = f.read()
-                self._multi_config = hjson.loads(multi_config)
+                self._multi_config = load_multi_config(file)
                 self.initialize()
                 return True
             except Exception as e:
@@ -570,7 +623,7 @@ class MultiInstance():
 
     def save(self):
         pbgdir = Path.cwd()
-        multi_path = Path(f'{pbgdir}/data/multi/{self._user}')
+        multi_path = Path(f'{pbgdir}/data/multi/{self.user}')
         if not multi_path.exists():
             multi_path.mkdir(parents=True)
         multi_config = Path(f'{str(multi_path)}/multi.hjson')
@@ -630,8 +683,8 @@ class MultiInstance():
     def edit(self):
         # Init coindata
         coindata = st.session_state.pbcoindata
-        if coindata.exchange != self._users.find_exchange(self.user):
-            coindata.exchange = self._users.find_exchange(self.user)
+        if coindata.exchange != self.users.find_exchange(self.user):
+            coindata.exchange = self.users.find_exchange(self.user)
         if coindata.market_cap != self.market_cap:
             coindata.market_cap = self.market_cap
         if coindata.vol_mcap != self.vol_mcap:
@@ -644,8 +697,8 @@ class MultiInstance():
         if "edit_multi_user" in st.session_state:
             if st.session_state.edit_multi_user != self.user:
                 self.user = st.session_state.edit_multi_user
-                coindata.exchange = self._users.find_exchange(self.user)
-        if self._users.find_exchange(self.user) in ["kucoin","bingx"]:
+                coindata.exchange = self.users.find_exchange(self.user)
+        if self.users.find_exchange(self.user) in ["kucoin","bingx"]:
             st.write("Exchnage not supported by passivbot_multi")
             return
         if "edit_multi_enabled_on" in st.session_state:
@@ -1006,11 +1059,11 @@ class MultiInstance():
         # Display Editor
         col1, col2, col3, col4 = st.columns([1,1,1,1])
         with col1:
-            if self.user in self._users.list():
-                index = self._users.list().index(self.user)
+            if self.user in self.users.list():
+                index = self.users.list().index(self.user)
             else:
                 index = 0
-            st.selectbox('User',self._users.list(), index = index, key="edit_multi_user")
+            st.selectbox('User',self.users.list(), index = index, key="edit_multi_user")
         with col2:
             enabled_on = ["disabled",self.remote.name] + sorted(self.remote.list())
             enabled_on_index = enabled_on.index(self.enabled_on)
@@ -1247,7 +1300,7 @@ class MultiInstances:
         p = str(Path(f'{self.instances_path}/*'))
         instances = glob.glob(p)
         for instance in instances:
-            inst = MultiInstance()
+            inst = MultiInstance(defaults=False)
             if inst.load(instance):
                 self.instances.append(inst)
         self.instances = sorted(self.instances, key=lambda d: d.user) 
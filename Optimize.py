@@ -5,6 +5,8 @@ from OptimizeConfig import OptimizeConfigs, OptimizeConfig
 from pathlib import Path, PurePath
 from shutil import rmtree
 from pbgui_func import pbdir, pbvenv, PBGDIR, get_navi_paths
+from pbgui_purefunc import write_json_atomic, edit_ini, save_ini_defaults
+from Log import LogRotator
 import json
 import glob
 import datetime
@@ -429,32 +431,20 @@ class OptimizeItem(Base):
             "finish": self.finish,
             "position": pos,
         }
-        with open(self.file, "w", encoding='utf-8') as f:
-            json.dump(opt_dict, f, indent=4)
+        write_json_atomic(self.file, opt_dict, indent=4)
 
 class OptimizeQueue:
     def __init__(self):
         self.items = []
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if not pb_config.has_section("optimize"):
-            pb_config.add_section("optimize")
-        if not pb_config.has_option("optimize", "cpu"):
-            pb_config.set("optimize", "cpu", str(multiprocessing.cpu_count()-2))
-        if not pb_config.has_option("optimize", "mode"):
-            pb_config.set("optimize", "mode", "linear")
-        if not pb_config.has_option("optimize", "backtest_best"):
-            pb_config.set("optimize", "backtest_best", "1")
-        if not pb_config.has_option("optimize", "backtest_sharp"):
-            pb_config.set("optimize", "backtest_sharp", "0")
-        if not pb_config.has_option("optimize", "backtest_adg"):
-            pb_config.set("optimize", "backtest_adg", "0")
-        if not pb_config.has_option("optimize", "backtest_drawdown"):
-            pb_config.set("optimize", "backtest_drawdown", "0")
-        if not pb_config.has_option("optimize", "backtest_stuck"):
-            pb_config.set("optimize", "backtest_stuck", "0")
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini_defaults("optimize", {
+            "cpu": str(multiprocessing.cpu_count()-2),
+            "mode": "linear",
+            "backtest_best": "1",
+            "backtest_sharp": "0",
+            "backtest_adg": "0",
+            "backtest_drawdown": "0",
+            "backtest_stuck": "0",
+        })
         self.load_options()
         self.pbgdir = Path.cwd()
         self.dest = Path(f'{self.pbgdir}/data/opt_queue')
@@ -527,17 +517,14 @@ class OptimizeQueue:
         self._backtest_stuck = int(pb_config.get("optimize", "backtest_stuck"))
 
     def save_options(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("optimize", "cpu", str(self._cpu))
-        pb_config.set("optimize", "mode", str(self._mode))
-        pb_config.set("optimize", "backtest_best", str(self._backtest_best))
-        pb_config.set("optimize", "backtest_sharp", str(self._backtest_sharp))
-        pb_config.set("optimize", "backtest_adg", str(self._backtest_adg))
-        pb_config.set("optimize", "backtest_drawdown", str(self._backtest_drawdown))
-        pb_config.set("optimize", "backtest_stuck", str(self._backtest_stuck))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        with edit_ini() as pb_config:
+            pb_config.set("optimize", "cpu", str(self._cpu))
+            pb_config.set("optimize", "mode", str(self._mode))
+            pb_config.set("optimize", "backtest_best", str(self._backtest_best))
+            pb_config.set("optimize", "backtest_sharp", str(self._backtest_sharp))
+            pb_config.set("optimize", "backtest_adg", str(self._backtest_adg))
+            pb_config.set("optimize", "backtest_drawdown", str(self._backtest_drawdown))
+            pb_config.set("optimize", "backtest_stuck", str(self._backtest_stuck))
 
     def is_running(self):
         if self.pid():
@@ -564,9 +551,7 @@ class OptimizeQueue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/Optimizer.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
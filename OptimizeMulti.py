@@ -12,6 +12,8 @@ import configparser
 import time
 import multiprocessing
 from pbgui_func import pbdir, pbvenv, PBGDIR, load_symbols_from_ini, error_popup, info_popup, get_navi_paths, replace_special_chars
+from pbgui_purefunc import write_json_atomic, save_ini, save_ini_defaults
+from Log import LogRotator
 import uuid
 from pathlib import Path, PurePath
 from User import Users
@@ -134,14 +136,10 @@ class OptimizeMultiQueueItem():
 class OptimizeMultiQueue:
     def __init__(self):
         self.items = []
+        save_ini_defaults("optimize_multi", {"autostart": "False"})
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("optimize_multi"):
-            pb_config.add_section("optimize_multi")
-            pb_config.set("optimize_multi", "autostart", "False")
-            with open('pbgui.ini', 'w') as f:
-                pb_config.write(f)
-        self._autostart = eval(pb_config.get("optimize_multi", "autostart"))
+        self._autostart = pb_config.getboolean("optimize_multi", "autostart")
         if self._autostart:
             self.run()
 
@@ -152,11 +150,7 @@ class OptimizeMultiQueue:
     @autostart.setter
     def autostart(self, new_autostart):
         self._autostart = new_autostart
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("optimize_multi", "autostart", str(self._autostart))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("optimize_multi", "autostart", str(self._autostart))
         if self._autostart:
             self.run()
         else:
@@ -228,9 +222,7 @@ class OptimizeMultiQueue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/OptimizeMulti.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
@@ -833,8 +825,7 @@ class OptimizeMultiItem:
             "exchange": self.exchange,
         }
         dest.mkdir(parents=True, exist_ok=True)
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(bt_dict, f, indent=4)
+        write_json_atomic(file, bt_dict, indent=4)
 
     def remove(self):
         self.hjson.unlink(missing_ok=True)
@@ -896,7 +887,7 @@ def main():
                 time.sleep(5)
             pb_config = configparser.ConfigParser()
             pb_config.read('pbgui.ini')
-            if not eval(pb_config.get("optimize_multi", "autostart")):
+            if not pb_config.getboolean("optimize_multi", "autostart"):
                 return
             if item.status() == "not started":
                 print(f'{datetime.datetime.now().isoformat(sep=" ", timespec="seconds")} Optimizing {item.filename} started')
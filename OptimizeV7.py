@@ -12,6 +12,8 @@ import multiprocessing
 from Exchange import Exchange
 from PBCoinData import CoinData
 from pbgui_func import pb7dir, pb7venv, PBGDIR, load_symbols_from_ini, error_popup, info_popup, get_navi_paths, replace_special_chars
+from pbgui_purefunc import write_json_atomic, save_ini, save_ini_defaults
+from Log import LogRotator
 import uuid
 from pathlib import Path, PurePath
 from User import Users
@@ -22,6 +24,7 @@ from Config import ConfigV7, Bounds
 import logging
 import os
 import fnmatch
+import hashlib
 
 class OptimizeV7QueueItem:
     def __init__(self):
@@ -172,14 +175,10 @@ class OptimizeV7QueueItem:
 class OptimizeV7Queue:
     def __init__(self):
         self.items = []
+        save_ini_defaults("optimize_v7", {"autostart": "False"})
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("optimize_v7"):
-            pb_config.add_section("optimize_v7")
-            pb_config.set("optimize_v7", "autostart", "False")
-            with open('pbgui.ini', 'w') as f:
-                pb_config.write(f)
-        self._autostart = eval(pb_config.get("optimize_v7", "autostart"))
+        self._autostart = pb_config.getboolean("optimize_v7", "autostart")
         if self._autostart:
             self.run()
 
@@ -190,11 +189,7 @@ class OptimizeV7Queue:
     @autostart.setter
     def autostart(self, new_autostart):
         self._autostart = new_autostart
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("optimize_v7", "autostart", str(self._autostart))
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini("optimize_v7", "autostart", str(self._autostart))
         if self._autostart:
             self.run()
         else:
@@ -268,9 +263,7 @@ class OptimizeV7Queue:
             if not dest.exists():
                 dest.mkdir(parents=True)
             logfile = Path(f'{dest}/OptimizeV7.log')
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
+            LogRotator(logfile, max_bytes=1048576).rotate_if_needed()
             log = open(logfile,"a")
             if platform.system() == "Windows":
                 creationflags = subprocess.DETACHED_PROCESS
@@ -358,6 +351,124 @@ class OptimizeV7Queue:
                     if ed["edited_rows"][row]["log"]:
                         self.items[row].view_log()
 
+class OptimizeV7AnalysisJob:
+    """
+    Runs extract_best_config.py in the background with JobRunner.py.
+    Jobs are keyed by path, mtime and size of the result file, so a repeated request finds the running
+    or finished job without reading the result file.
+    """
+    def __init__(self, result_file):
+        self.result_file = Path(result_file)
+        self.path = Path(f'{PBGDIR}/data/opt_v7_analysis')
+        self.job_id = self.result_key()
+        self.log = Path(f'{self.path}/{self.job_id}.log')
+        self.err = Path(f'{self.path}/{self.job_id}.err')
+        self.progress_file = Path(f'{self.path}/{self.job_id}.json')
+
+    # Seconds JobRunner has to write its progress after submit
+    STARTUP_TIMEOUT = 30
+
+    def result_key(self):
+        stat = self.result_file.stat()
+        key = f'{self.result_file.resolve()}:{stat.st_mtime_ns}:{stat.st_size}'
+        return hashlib.sha256(key.encode()).hexdigest()[0:16]
+
+    def output(self):
+        if self.log.exists():
+            with open(self.log, "r", encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        return ""
+
+    def error_output(self):
+        if self.err.exists():
+            with open(self.err, "r", encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        return ""
+
+    def progress(self):
+        """Returns the progress written by JobRunner or None if the job was not started"""
+        try:
+            with open(self.progress_file, "r", encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def progress_text(self):
+        progress = self.progress()
+        if not progress:
+            return ""
+        elapsed = int(progress["updated"] - progress["started"])
+        return f'{elapsed}s, {progress["lines"]} lines of output'
+
+    def status(self):
+        progress = self.progress()
+        if not progress:
+            return "not started"
+        if progress["state"] == "running":
+            if self.is_running(progress["pid"]):
+                return "running"
+            # Written by submit, JobRunner did not write its own progress yet
+            if progress["pid"] is None and time.time() - progress["started"] < self.STARTUP_TIMEOUT:
+                return "running"
+            # JobRunner was killed before the extraction finished
+            return "error"
+        # extract_best_config.py reports some errors on stdout with exit code 0
+        if progress["returncode"] != 0 or "error" in self.output():
+            return "error"
+        return "complete"
+
+    def is_running(self, pid: int):
+        try:
+            if pid and psutil.pid_exists(pid) and any(sub.endswith("JobRunner.py") for sub in psutil.Process(pid).cmdline()):
+                return True
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            pass
+        return False
+
+    def submit(self):
+        """Starts the extraction unless the same result is running or done, a failed job is started again. Returns True if started"""
+        if self.status() in ["running", "complete"]:
+            return False
+        if not self.path.exists():
+            self.path.mkdir(parents=True)
+        # create a copy of result_file
+        result_file_copy = Path(f'{self.result_file}.bak')
+        shutil.copy(self.result_file, result_file_copy)
+        # run extract_best_config.py on result_file_copy
+        extract = [pb7venv(), '-u', str(PurePath(f'{pb7dir()}/src/tools/extract_best_config.py')), str(result_file_copy)]
+        cmd = [sys.executable, '-u', str(PurePath(f'{PBGDIR}/JobRunner.py')), str(self.progress_file), str(self.log), str(self.err), pb7dir()] + extract
+        # Mark the job as running before JobRunner starts, so a second request does not start it again.
+        # From then on only JobRunner writes the progress.
+        write_json_atomic(self.progress_file, {"pid": None, "state": "running", "started": time.time(), "updated": time.time(), "lines": 0, "returncode": None})
+        try:
+            if platform.system() == "Windows":
+                creationflags = subprocess.DETACHED_PROCESS
+                creationflags |= subprocess.CREATE_NO_WINDOW
+                subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=PBGDIR, creationflags=creationflags)
+            else:
+                subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=PBGDIR, start_new_session=True)
+        except OSError as e:
+            write_json_atomic(self.progress_file, {"pid": None, "state": "finished", "started": time.time(), "updated": time.time(), "lines": 0, "returncode": -1})
+            with open(self.err, "w", encoding='utf-8') as f:
+                f.write(f'Can not start JobRunner: {e}')
+        return True
+
+@st.dialog("Analysis failed")
+def analysis_error_popup(job: OptimizeV7AnalysisJob):
+    """Shows the log of a failed analysis, the analysis is only started again with Retry"""
+    st.error(f'Analysis {job.job_id} failed', icon="⚠️")
+    st.code(f'{job.output()}\n{job.error_output()}'.strip() or "No output", language=None)
+    col1, col2 = st.columns([1,1])
+    with col1:
+        if st.button(":orange[Retry]"):
+            job.submit()
+            st.rerun()
+    with col2:
+        if st.button(":green[OK]"):
+            st.rerun()
+
 class OptimizeV7Results:
     def __init__(self):
         self.results_path = Path(f'{pb7dir()}/optimize_results')
@@ -509,22 +620,17 @@ class OptimizeV7Results:
                         st.switch_page(get_navi_paths()["V7_BACKTEST"])
 
     def generate_analysis(self, result_file):
-        # create a copy of result_file
-        result_file = Path(result_file)
-        result_file_copy = Path(f'{result_file}.bak')
-        shutil.copy(result_file, result_file_copy)
-        # run extract_best_config.py on result_file_copy
-        cmd = [pb7venv(), '-u', PurePath(f'{pb7dir()}/src/tools/extract_best_config.py'), str(result_file_copy)]
-        with st.spinner('Generating Result...'):
-            if platform.system() == "Windows":
-                creationflags = subprocess.CREATE_NO_WINDOW
-                result = subprocess.run(cmd, capture_output=True, cwd=pb7dir(), text=True, creationflags=creationflags)
-            else:
-                result = subprocess.run(cmd, capture_output=True, cwd=pb7dir(), text=True, start_new_session=True)
-        if "error" in result.stdout:
-            error_popup(result.stdout)
+        job = OptimizeV7AnalysisJob(result_file)
+        status = job.status()
+        if status == "complete":
+            info_popup(f"Analysis Generated {job.output()}")
+        elif status == "error":
+            analysis_error_popup(job)
+        elif status == "running":
+            info_popup(f"Analysis {job.job_id} is still running ({job.progress_text()})")
         else:
-            info_popup(f"Analysis Generated {result.stdout}")
+            job.submit()
+            info_popup(f"Analysis {job.job_id} started in background")
 
     def remove_selected_results(self):
         ed_key = st.session_state.ed_key
@@ -1317,8 +1423,7 @@ class OptimizeV7Item:
             "exchange": self.config.backtest.exchanges
         }
         dest.mkdir(parents=True, exist_ok=True)
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(opt_dict, f, indent=4)
+        write_json_atomic(file, opt_dict, indent=4)
 
     def remove(self):
         Path(self.config.config_file).unlink(missing_ok=True)
@@ -1382,7 +1487,7 @@ def main():
                 time.sleep(5)
             pb_config = configparser.ConfigParser()
             pb_config.read('pbgui.ini')
-            if not eval(pb_config.get("optimize_v7", "autostart")):
+            if not pb_config.getboolean("optimize_v7", "autostart"):
                 return
             if item.status() == "not started":
                 print(f'{datetime.datetime.now().isoformat(sep=" ", timespec="seconds")} Optimizing {item.filename} started')
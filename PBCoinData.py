@@ -11,8 +11,10 @@ import platform
 import sys
 import os
 import traceback
-from io import TextIOWrapper
 from Exchange import Exchange, Exchanges
+from pbgui_purefunc import load_symbols_file, load_symbols_from_ini, edit_ini
+from DaemonMetrics import DaemonMetrics
+from Log import LogRotator, redirect_output
 
 SYMBOLMAP = {
     #Binance
@@ -335,16 +337,13 @@ class CoinData:
                 self._metadata_interval = int(pb_config.get("coinmarketcap", "metadata_interval"))
     
     def save_config(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if not pb_config.has_section("coinmarketcap"):
-            pb_config.add_section("coinmarketcap")
-        pb_config.set("coinmarketcap", "api_key", self.api_key)
-        pb_config.set("coinmarketcap", "fetch_limit", str(self.fetch_limit))
-        pb_config.set("coinmarketcap", "fetch_interval", str(self.fetch_interval))
-        pb_config.set("coinmarketcap", "metadata_interval", str(self.metadata_interval))
-        with open('pbgui.ini', 'w') as pbgui_configfile:
-            pb_config.write(pbgui_configfile)
+        with edit_ini() as pb_config:
+            if not pb_config.has_section("coinmarketcap"):
+                pb_config.add_section("coinmarketcap")
+            pb_config.set("coinmarketcap", "api_key", self.api_key)
+            pb_config.set("coinmarketcap", "fetch_limit", str(self.fetch_limit))
+            pb_config.set("coinmarketcap", "fetch_interval", str(self.fetch_interval))
+            pb_config.set("coinmarketcap", "metadata_interval", str(self.metadata_interval))
 
     def fetch_api_status(self):
         url = 'https://pro-api.coinmarketcap.com/v1/key/info'
@@ -532,25 +531,21 @@ class CoinData:
             self._symbols_all = []
 
     def load_symbols(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
         exchange = "kucoinfutures" if self.exchange == "kucoin" else self.exchange
-        if pb_config.has_option("exchanges", f'{exchange}.swap'):
-            self._symbols = eval(pb_config.get("exchanges", f'{exchange}.swap'))
+        symbols = load_symbols_file(exchange)
+        if "swap" in symbols:
+            self._symbols = list(symbols["swap"])
         if self.exchange in ["binance", "bybit"]:
-            if pb_config.has_option("exchanges", f'{exchange}.cpt'):
-                self._symbols_cpt = eval(pb_config.get("exchanges", f'{exchange}.cpt'))
+            if "cpt" in symbols:
+                self._symbols_cpt = list(symbols["cpt"])
                 return
         self._symbols_cpt = self._symbols
     
     def load_symbols_all(self):
         self._symbols_all = []
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
         for exchange in self.exchanges:
-            if pb_config.has_option("exchanges", f'{exchange}.swap'):
-                # add symbol from symbols to symbols_all if not already in symbols_all
-                self._symbols_all += eval(pb_config.get("exchanges", f'{exchange}.swap'))
+            # add symbol from symbols to symbols_all if not already in symbols_all
+            self._symbols_all += load_symbols_from_ini(exchange, "swap")
         self._symbols_all = sorted(list(set(self._symbols_all)))
 
     def list_symbols(self):
@@ -671,8 +666,8 @@ def main():
     if not dest.exists():
         dest.mkdir(parents=True)
     logfile = Path(f'{str(dest)}/PBCoinData.log')
-    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    redirect_output(logfile)
+    rotator = LogRotator(logfile, max_bytes=10485760)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Start: PBCoinData')
     pbcoindata = CoinData()
     if pbcoindata.is_running():
@@ -681,28 +676,29 @@ def main():
         print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: PBCoinData already started')
         exit(1)
     pbcoindata.save_pid()
+    metrics = DaemonMetrics("PBCoinData", dump_every=1)
     while True:
         try:
-            if logfile.exists():
-                if logfile.stat().st_size >= 10485760:
-                    logfile.replace(f'{str(logfile)}.old')
-                    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-                    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-            pbcoindata.update_symbols()
+            rotator.rotate_if_needed(lambda: redirect_output(logfile))
+            with metrics.phase("scan"):
+                pbcoindata.update_symbols()
             if not pbcoindata.is_data_fresh():
-                pbcoindata.load_data()
+                with metrics.phase("fetch"):
+                    pbcoindata.load_data()
                 if pbcoindata.is_data_fresh():
                     pbcoindata.fetch_api_status()
                     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Fetched CoinMarketCap data. Credits left this month: {pbcoindata.credits_left}')
                 else:
                     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: Can not fetch CoinMarketCap data')
             if not pbcoindata.is_metadata_fresh():
-                pbcoindata.load_metadata()
+                with metrics.phase("fetch_metadata"):
+                    pbcoindata.load_metadata()
                 if pbcoindata.is_metadata_fresh():
                     pbcoindata.fetch_api_status()
                     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Fetched CoinMarketCap metadata. Credits left this month: {pbcoindata.credits_left}')
                 else:
                     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: Can not fetch CoinMarketCap metadata')
+            metrics.loop()
             sleep(60)
             pbcoindata.load_config()
         except Exception as e:
@@ -4,14 +4,15 @@ import sys
 import os
 from pathlib import Path, PurePath
 from time import sleep
-from io import TextIOWrapper
 from datetime import datetime
 import platform
 import traceback
 from pbgui_func import PBGDIR
+from pbgui_purefunc import load_ini_list, save_ini_list
 from Database import Database
 from User import Users
-import configparser
+from DaemonMetrics import DaemonMetrics
+from Log import LogRotator, redirect_output
 
 class PBData():
     def __init__(self):
@@ -82,24 +83,14 @@ class PBData():
             f.write(str(self.my_pid))
     
     def load_fetch_users(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if pb_config.has_option("pbdata", "fetch_users"):
-            users = eval(pb_config.get("pbdata", "fetch_users"))
-            for user in users.copy():
-                if user not in self.users.list():
-                    users.remove(user)
-            return users
-        return []
+        users = load_ini_list("pbdata", "fetch_users")
+        for user in users.copy():
+            if user not in self.users.list():
+                users.remove(user)
+        return users
     
     def save_fetch_users(self):
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        if not pb_config.has_section("pbdata"):
-            pb_config.add_section("pbdata")
-        pb_config.set("pbdata", "fetch_users", f'{self.fetch_users}')
-        with open('pbgui.ini', 'w') as f:
-            pb_config.write(f)
+        save_ini_list("pbdata", "fetch_users", self.fetch_users)
 
     def update_db(self):
         self.load_fetch_users()
@@ -122,8 +113,8 @@ def main():
     if not dest.exists():
         dest.mkdir(parents=True)
     logfile = Path(f'{str(dest)}/PBData.log')
-    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    redirect_output(logfile)
+    rotator = LogRotator(logfile, max_bytes=10485760)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Start: PBData')
     pbdata = PBData()
     if pbdata.is_running():
@@ -132,14 +123,13 @@ def main():
         print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: PBData already started')
         exit(1)
     pbdata.save_pid()
+    metrics = DaemonMetrics("PBData", dump_every=60)
     while True:
         try:
-            if logfile.exists():
-                if logfile.stat().st_size >= 10485760:
-                    logfile.replace(f'{str(logfile)}.old')
-                    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-                    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-            pbdata.update_db()
+            rotator.rotate_if_needed(lambda: redirect_output(logfile))
+            with metrics.phase("fetch"):
+                pbdata.update_db()
+            metrics.loop()
             sleep(1)
         except Exception as e:
             print(f'Something went wrong, but continue {e}')
@@ -14,7 +14,7 @@ from pathlib import Path, PurePath
 from time import sleep
 import glob
 import json
-from io import TextIOWrapper
+from pbgui_purefunc import write_json_atomic, file_md5, file_version, copy_if_changed, save_ini
 from datetime import datetime
 import platform
 from PBRun import PBRun
@@ -23,6 +23,129 @@ import shutil
 import hashlib
 import traceback
 import gzip
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from RemoteTransport import RcloneTransport, LocalTransport
+from ServerMetrics import ServerMetrics, server_sample
+from DaemonMetrics import DaemonMetrics
+from Log import LogRotator, redirect_output
+
+# Number of rclone processes PBRemote runs at the same time
+SYNC_WORKERS = 4
+
+# Files included in the sync of each path, same as the rclone --include filters
+SYNC_PATTERNS = {
+    "run_v7": ["*.json"],
+    "multi": ["multi.hjson", "*.json"],
+    "instances": ["instance.cfg", "config.json"],
+}
+# Status file and manifest of every configuration path, synced up to cmd_{name} after the configuration
+STATUS_FILES = {
+    "run_v7": ["status_v7.json", "manifest_run_v7.json"],
+    "multi": ["status.json", "manifest_multi.json"],
+    "instances": ["status_single.json", "manifest_instances.json"],
+}
+# Configuration path of the status spaths of sync('up', ...)
+STATUS_SPATHS = {"status_v7": "run_v7", "status": "multi", "status_single": "instances"}
+# Files written at runtime on every server, they do not need a sync down
+MANIFEST_EXCLUDE = ["monitor.json", "ignored_coins.json"]
+
+def is_synced_file(file: Path, patterns: list):
+    return any(fnmatch(file.name, pattern) for pattern in patterns)
+
+def calculate_manifest(path: Path, patterns: list):
+    """Returns the content md5 of every synced file below path and a hash over all of them"""
+    files = {}
+    if path.exists():
+        for file in sorted(path.rglob('*')):
+            if file.is_file() and file.name not in MANIFEST_EXCLUDE and is_synced_file(file, patterns):
+                md5 = file_md5(file)
+                if md5 is not None:
+                    files[file.relative_to(path).as_posix()] = md5
+    manifest_hash = hashlib.md5(json.dumps(files, sort_keys=True).encode()).hexdigest()
+    return {"hash": manifest_hash, "files": files}
+
+def snapshot_tree(source: Path, destination: Path, patterns: list):
+    """
+    Mirrors the synced files of source to destination and returns the manifest of destination.
+    PBRun keeps writing to source during an upload, so the upload and its manifest are both taken
+    from the snapshot and describe exactly the same files.
+    """
+    copied = set()
+    if source.exists():
+        for file in sorted(source.rglob('*')):
+            if not is_synced_file(file, patterns) or not file.is_file():
+                continue
+            relative = file.relative_to(source)
+            target = Path(f'{destination}/{relative}')
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                copy_if_changed(file, target)
+            except FileNotFoundError:
+                # removed while taking the snapshot
+                continue
+            copied.add(relative.as_posix())
+    if destination.exists():
+        for file in sorted(destination.rglob('*'), reverse=True):
+            if file.is_file() and file.relative_to(destination).as_posix() not in copied:
+                file.unlink()
+            elif file.is_dir() and not any(file.iterdir()):
+                file.rmdir()
+    return calculate_manifest(destination, patterns)
+
+# Schema version of the alive files. Version 1 files have no "v" and are always full snapshots
+ALIVE_SCHEMA = 2
+# Every n-th alive file is a full snapshot, the others are deltas against it.
+# PBRemote keeps the last 9 alive files, so the newest full snapshot is always available
+ALIVE_FULL_EVERY = 9
+# Full snapshots are alive_{ts}.cmd.gz like before, deltas are alive_{ts}.delta.gz.
+# pbgui versions without deltas only read and sync alive_*.cmd*, they never see a delta file.
+ALIVE_PATTERNS = ["alive_*.cmd*", "alive_*.delta*"]
+# Published by every server in its cmd directory. Deltas are only sent when all other servers
+# announce alive_schema 2, older versions would only see the full snapshots and take the server as offline.
+CAPABILITIES_FILE = "capabilities.json"
+
+def alive_timestamp(file: str):
+    """Timestamp from the name of an alive file"""
+    return int(PurePath(file).name.split('_')[1].split('.')[0])
+
+def alive_delta(full: dict, cfg: dict):
+    """
+    Returns the keys of cfg that differ from the full snapshot and the keys cfg does not have anymore ("del").
+    monitor is compared per instance, changed instances are sent whole.
+    """
+    delta = {"v": ALIVE_SCHEMA, "type": "delta", "base": full["timestamp"], "name": cfg["name"], "timestamp": cfg["timestamp"]}
+    for key, value in cfg.items():
+        if key in delta or key == "type":
+            continue
+        if key == "monitor" and isinstance(value, list) and isinstance(full.get(key), list):
+            changed = {}
+            for index, instance in enumerate(value):
+                if index >= len(full[key]) or full[key][index] != instance:
+                    changed[str(index)] = instance
+            if len(value) != len(full[key]) or changed:
+                delta[key] = {"n": len(value), "d": changed}
+        elif full.get(key) != value:
+            delta[key] = value
+    removed = [key for key in full if key not in cfg and key not in delta]
+    if removed:
+        delta["del"] = removed
+    return delta
+
+def apply_alive_delta(full: dict, delta: dict):
+    """Rebuilds the complete alive data from the full snapshot and a delta"""
+    cfg = dict(full)
+    for key, value in delta.items():
+        if key == "del":
+            continue
+        if key == "monitor" and isinstance(value, dict):
+            base = full.get(key, [])
+            cfg[key] = [value["d"].get(str(index), base[index] if index < len(base) else None) for index in range(value["n"])]
+        else:
+            cfg[key] = value
+    for key in delta.get("del", []):
+        cfg.pop(key, None)
+    return cfg
 
 class RemoteServer():
     def __init__(self, path: str):
@@ -46,6 +169,7 @@ class RemoteServer():
         self._pbdir = None
         self._pb7dir = None
         self._bucket = None
+        self.transport = RcloneTransport()
         # self._instances = []
         self._mem = []
         self._swap = []
@@ -61,6 +185,11 @@ class RemoteServer():
         self._pb6_commit = None
         self._pb7_version = "N/A"
         self._pb7_commit = None
+        self._manifest_applied = {}
+        # paths whose last sync down failed, they are synced again on the next run
+        self._sync_failed = set()
+        self._alive_file = None
+        self._alive_full = None
         self.pbname = None
         self.instances_status = InstancesStatus(f'{self.path}/status.json')
         self.instances_status.load()
@@ -183,20 +312,21 @@ class RemoteServer():
         """
         Load the server's configuration.
         """
-        p = str(Path(f'{self._path}/alive_*.cmd*'))
-        alive_remote = glob.glob(p)
-        alive_remote.sort()
+        alive_remote = [file for pattern in ALIVE_PATTERNS for file in glob.glob(str(Path(f'{self._path}/{pattern}')))]
+        alive_remote.sort(key=alive_timestamp)
         self._name = PurePath(self._path).name[4:]
         if alive_remote:
             while len(alive_remote) > 0:
                 remote = Path(alive_remote.pop())
+                if str(remote) == self._alive_file:
+                    # Newest alive file is already loaded
+                    return
                 try:
-                    if str(remote).endswith('.gz'):
-                        with gzip.open(remote, "rt", encoding='utf-8') as f:
-                            cfg = json.load(f)
-                    else:
-                        with open(remote, "r", encoding='utf-8') as f:
-                            cfg = json.load(f)
+                    cfg = self.load_alive_file(remote)
+                    if cfg.get("type") == "delta":
+                        cfg = apply_alive_delta(self.load_alive_full(cfg["base"]), cfg)
+                    elif cfg.get("type") == "full":
+                        self._alive_full = cfg
                     if "name" in cfg and "timestamp" in cfg:
                         self._ts = cfg["timestamp"]
                     if "startts" in cfg:
@@ -231,24 +361,73 @@ class RemoteServer():
                         self._pb7_version = cfg["pb7v"]
                     if "pb7c" in cfg:
                         self._pb7_commit = cfg["pb7c"]
+                    self._alive_file = str(remote)
                     return
                 except Exception as e:
                     print(f'{str(remote)} is corrupted {e}')
 
+    def load_alive_file(self, alive_file: Path):
+        if str(alive_file).endswith('.gz'):
+            with gzip.open(alive_file, "rt", encoding='utf-8') as f:
+                return json.load(f)
+        with open(alive_file, "r", encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_alive_full(self, timestamp: int):
+        """Returns the full snapshot a delta alive file is based on"""
+        if self._alive_full and self._alive_full["timestamp"] == timestamp:
+            return self._alive_full
+        cfg = self.load_alive_file(Path(f'{self._path}/alive_{timestamp}.cmd.gz'))
+        if cfg.get("type") != "full":
+            raise ValueError(f'alive_{timestamp} is not a full snapshot')
+        self._alive_full = cfg
+        return cfg
+
+    @property
+    def alive_schema(self):
+        """Newest alive schema the server reads, servers without capabilities file are older pbgui versions"""
+        capabilities_file = Path(f'{self._path}/{CAPABILITIES_FILE}')
+        if capabilities_file.exists():
+            try:
+                with open(capabilities_file, "r", encoding='utf-8') as f:
+                    return json.load(f).get("alive_schema", 1)
+            except Exception as e:
+                print(f'{str(capabilities_file)} is corrupted {e}')
+        return 1
+
+    def load_manifest_hash(self, spath: str):
+        """Returns the manifest hash the server published for spath or None for servers without manifest"""
+        manifest_file = Path(f'{self._path}/manifest_{spath}.json')
+        if manifest_file.exists():
+            try:
+                with open(manifest_file, "r", encoding='utf-8') as f:
+                    return json.load(f)["hash"]
+            except Exception as e:
+                print(f'{str(manifest_file)} is corrupted {e}')
+        return None
+
+    def is_manifest_applied(self, spath: str, manifest_hash: str):
+        """True if the configurations described by manifest_hash are already synced down"""
+        if manifest_hash and self._manifest_applied.get(spath) == manifest_hash:
+            return True
+        return False
+
     def sync_v7_down(self):
         """Sync the v7 configurations from the remote storage to the local machine."""
-        if self.instances_status_v7.has_new_status():
+        if self.instances_status_v7.has_new_status() or 'run_v7' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status_v7.json from: {self.name}')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync v7 from: {self.name}')
-            pbgdir = Path.cwd()
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{*.json}}', f'{self.bucket}/run_v7_{self.name}', PurePath(f'{pbgdir}/data/remote/run_v7_{self.name}')]
-            logfile = Path(f'{pbgdir}/data/logs/sync.log')
-            log = open(logfile,"ab")
-            if platform.system() == "Windows":
-                creationflags = subprocess.CREATE_NO_WINDOW
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
+            manifest_hash = self.load_manifest_hash('run_v7')
+            if self.is_manifest_applied('run_v7', manifest_hash):
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Skip sync v7 from: {self.name} (unchanged)')
             else:
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync v7 from: {self.name}')
+                pbgdir = Path.cwd()
+                if not self.transport.sync(f'{self.bucket}/run_v7_{self.name}', PurePath(f'{pbgdir}/data/remote/run_v7_{self.name}'), include=f'{{*.json}}'):
+                    print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync v7 from: {self.name} failed, retry on next run')
+                    self._sync_failed.add('run_v7')
+                    return
+                self._manifest_applied['run_v7'] = manifest_hash
+            self._sync_failed.discard('run_v7')
             PBRun().update_status(self.instances_status_v7.status_file, self.name)
             status_ts = self.instances_status_v7.status_ts
             self.instances_status_v7.update_status()
@@ -256,18 +435,20 @@ class RemoteServer():
 
     def sync_multi_down(self):
         """Sync the multi configurations from the remote storage to the local machine."""
-        if self.instances_status.has_new_status():
+        if self.instances_status.has_new_status() or 'multi' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status.json from: {self.name}')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync multi from: {self.name}')
-            pbgdir = Path.cwd()
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{multi.hjson,*.json}}', f'{self.bucket}/multi_{self.name}', PurePath(f'{pbgdir}/data/remote/multi_{self.name}')]
-            logfile = Path(f'{pbgdir}/data/logs/sync.log')
-            log = open(logfile,"ab")
-            if platform.system() == "Windows":
-                creationflags = subprocess.CREATE_NO_WINDOW
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
+            manifest_hash = self.load_manifest_hash('multi')
+            if self.is_manifest_applied('multi', manifest_hash):
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Skip sync multi from: {self.name} (unchanged)')
             else:
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync multi from: {self.name}')
+                pbgdir = Path.cwd()
+                if not self.transport.sync(f'{self.bucket}/multi_{self.name}', PurePath(f'{pbgdir}/data/remote/multi_{self.name}'), include=f'{{multi.hjson,*.json}}'):
+                    print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync multi from: {self.name} failed, retry on next run')
+                    self._sync_failed.add('multi')
+                    return
+                self._manifest_applied['multi'] = manifest_hash
+            self._sync_failed.discard('multi')
             PBRun().update_status(self.instances_status.status_file, self.name)
             status_ts = self.instances_status.status_ts
             self.instances_status.update_status()
@@ -275,18 +456,20 @@ class RemoteServer():
 
     def sync_single_down(self):
         """Sync the single configurations from the local machine to the remote storage."""
-        if self.instances_status_single.has_new_status():
+        if self.instances_status_single.has_new_status() or 'instances' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status_single.json from: {self.name}')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync single from: {self.name}')
-            pbgdir = Path.cwd()
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{instance.cfg,config.json}}', f'{self.bucket}/instances_{self.name}', PurePath(f'{pbgdir}/data/remote/instances_{self.name}')]
-            logfile = Path(f'{pbgdir}/data/logs/sync.log')
-            log = open(logfile,"ab")
-            if platform.system() == "Windows":
-                creationflags = subprocess.CREATE_NO_WINDOW
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
+            manifest_hash = self.load_manifest_hash('instances')
+            if self.is_manifest_applied('instances', manifest_hash):
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Skip sync single from: {self.name} (unchanged)')
             else:
-                subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync single from: {self.name}')
+                pbgdir = Path.cwd()
+                if not self.transport.sync(f'{self.bucket}/instances_{self.name}', PurePath(f'{pbgdir}/data/remote/instances_{self.name}'), include=f'{{instance.cfg,config.json}}'):
+                    print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync single from: {self.name} failed, retry on next run')
+                    self._sync_failed.add('instances')
+                    return
+                self._manifest_applied['instances'] = manifest_hash
+            self._sync_failed.discard('instances')
             PBRun().update_status(self.instances_status_single.status_file, self.name)
             status_ts = self.instances_status_single.status_ts
             self.instances_status_single.update_status()
@@ -328,11 +511,7 @@ class RemoteServer():
 
     def calculate_md5(self, file: Path):
         """Checks if the two API files have the same hash using md5 protocol."""
-        if file.exists():
-            with open(file, 'rb') as file_obj:
-                file_contents = file_obj.read()
-            return hashlib.md5(file_contents).hexdigest()
-        return None
+        return file_md5(file)
 
     def delete_server(self):
         """
@@ -340,14 +519,7 @@ class RemoteServer():
         """
         pbgdir = Path.cwd()
         # rclone delete pbgui:pbgui --include *manibot51*/**
-        cmd = ['rclone', 'delete', '-v', f'{self.bucket}', '--include', f'*{self.name}*/**']
-        logfile = Path(f'{pbgdir}/data/logs/sync.log')
-        log = open(logfile,"ab")
-        if platform.system() == "Windows":
-            creationflags = subprocess.CREATE_NO_WINDOW
-            subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
-        else:
-            subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+        self.transport.delete(f'{self.bucket}', include=f'*{self.name}*/**')
         # delete local files
         shutil.rmtree(f'{pbgdir}/data/remote/cmd_{self.name}', ignore_errors=True)
         shutil.rmtree(f'{pbgdir}/data/remote/instances_{self.name}', ignore_errors=True)
@@ -364,16 +536,33 @@ class PBRemote():
         and checks for rclone installation and configuration.
         """
         self.error = None          
-        self.remote_servers = []
+        # Remote servers by name and the file_version of their cmd directory at the last load
+        self.servers = {}
+        self.servers_version = {}
+        # Last api-keys md5 each server acknowledged in its alive
+        self.api_acked = {}
         self.local_run = PBRun()
         self.index = 0
         self.startts = None
         self.alivets = 0
+        self.alive_count = 0
+        self.alive_full = None
         self.systemts = 0
         self.rtd = 0
         pbgdir = Path.cwd()
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
+        # Init sync workers
+        if pb_config.has_option("pbremote", "sync_workers"):
+            self.sync_workers = int(pb_config.get("pbremote", "sync_workers"))
+        else:
+            self.sync_workers = SYNC_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.sync_workers)
+        # Init server metrics history
+        self.metrics = ServerMetrics()
+        self.metrics_ts = {}
+        # paths whose last sync up failed, they are synced again on the next run
+        self._sync_failed = set()
         # Init pbname
         if pb_config.has_option("main", "pbname"):
             self.name = pb_config.get("main", "pbname")
@@ -409,6 +598,7 @@ class PBRemote():
         self.remote_path = f'{pbgdir}/data/remote'
         if not Path(self.cmd_path).exists():
             Path(self.cmd_path).mkdir(parents=True)  
+        write_json_atomic(Path(f'{self.cmd_path}/{CAPABILITIES_FILE}'), {"alive_schema": ALIVE_SCHEMA})
         self.piddir = Path(f'{pbgdir}/data/pid')
         if not self.piddir.exists():
             self.piddir.mkdir(parents=True)
@@ -422,8 +612,9 @@ class PBRemote():
         self.bucket_secret_access_key = None
         self.bucket_provider = "Synology"
         self.bucket_region = None
+        self.transport = self.load_transport()
         self.rclone_installed = self.is_rclone_installed()
-        if not self.rclone_installed:
+        if not self.rclone_installed and self.transport.name == "rclone":
             if __name__ == '__main__':
                 sys.stdout = sys.__stdout__
                 sys.stderr = sys.__stderr__
@@ -432,7 +623,10 @@ class PBRemote():
             else:
                 self.error = "rclone not installed"
                 return
-        self.fetch_buckets()
+        if self.transport.name == "rclone":
+            self.fetch_buckets()
+        else:
+            self.buckets = [pb_config.get("pbremote", "bucket", fallback="local:")]
         if not self.buckets:
             if __name__ == '__main__':
                 sys.stdout = sys.__stdout__
@@ -495,9 +689,9 @@ class PBRemote():
     @property
     def unsynced_api(self):
         unsynced = 0
+        api_md5 = self.api_md5
         for server in self.remote_servers:
-            server.load()
-            if not server.is_api_md5_same(self.api_md5):
+            if not self.is_api_acked(server, api_md5):
                 unsynced += 1
         return unsynced
 
@@ -505,6 +699,10 @@ class PBRemote():
     @property
     def api_md5(self): return self.calculate_api_md5()
 
+    @property
+    def remote_servers(self):
+        return list(self.servers.values())
+
     def __iter__(self):
         return iter(self.remote_servers)
 
@@ -515,21 +713,21 @@ class PBRemote():
         return next(self)
 
     def list(self):
-        return list(map(lambda c: c.name, self.remote_servers))
+        return list(self.servers)
 
     def find_server(self, name: str):
         """Find the server by name"""
-        for server in self.remote_servers:
-            if server.name == name:
-                return server
+        return self.servers.get(name)
 
     def add(self, remote_servers: RemoteServer):
         if remote_servers:
-            self.remote_servers.append(remote_servers)
+            self.servers[remote_servers.name] = remote_servers
 
     def remove(self, remote_servers: RemoteServer):
         if remote_servers:
-            self.remote_servers.remove(remote_servers)
+            self.servers.pop(remote_servers.name, None)
+            self.servers_version.pop(remote_servers.name, None)
+            self.api_acked.pop(remote_servers.name, None)
 
     def is_sync_running(self):
         if self.sync_pid():
@@ -557,16 +755,15 @@ class PBRemote():
         
         Files it sends from local to remote : 
             For cmd files:
-                - alive_*.cmd
+                - alive_*.cmd / alive_*.delta
                 - api-keys.json
+                - capabilities.json
             For instances: 
                 - instance.cfg
                 - config.json
-            For status: 
-                - status.json
-                - alive_*.cmd
-            For status_single: 
-                - status_single.json
+            For status (see STATUS_FILES):
+                - status.json / status_single.json / status_v7.json
+                - manifest_multi.json / manifest_instances.json / manifest_run_v7.json
                 - alive_*.cmd
             For multi :
                 - multi.hjson
@@ -574,38 +771,122 @@ class PBRemote():
             
         Args:
             direction (str): Either "up" (sync from local to remote) or "down" (sync from remote to local).
-            spath (str): The specific path to synchronize (e.g., "cmd", "instances", "status").
+            spath (str): The specific path to synchronize (e.g., "cmd", "instances", "status_v7").
+
+        Configurations (instances, multi, run_v7) are uploaded from the snapshot in data/upload/{spath}
+        that save_manifest() took, not from the live directory.
+
+        Returns:
+            bool: True if the sync succeeded.
         """
         pbgdir = Path.cwd()
         if direction == 'up' and spath == 'cmd':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{alive_*.cmd*,api-keys.json}}', PurePath(f'{pbgdir}/data/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}']
+            return self.transport.sync(PurePath(f'{pbgdir}/data/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}', include=f'{{alive_*.cmd*,alive_*.delta*,api-keys.json,capabilities.json}}')
         elif direction == 'up' and spath == 'instances':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{instance.cfg,config.json}}', PurePath(f'{pbgdir}/data/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}']
-        elif direction == 'up' and spath == 'status':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{alive_*.cmd*,status.json}}', PurePath(f'{pbgdir}/data/cmd'), f'{self.bucket_dir}/cmd_{self.name}']
-        elif direction == 'up' and spath == 'status_single':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{alive_*.cmd*,status_single.json}}', PurePath(f'{pbgdir}/data/cmd'), f'{self.bucket_dir}/cmd_{self.name}']
-        elif direction == 'up' and spath == 'status_v7':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{alive_*.cmd*,status_v7.json}}', PurePath(f'{pbgdir}/data/cmd'), f'{self.bucket_dir}/cmd_{self.name}']
+            return self.transport.sync(PurePath(f'{pbgdir}/data/upload/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}', include=f'{{instance.cfg,config.json}}')
+        elif direction == 'up' and spath in STATUS_SPATHS:
+            return self.sync_status_up([STATUS_SPATHS[spath]])
         elif direction == 'up' and spath == 'run_v7':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{*.json}}', PurePath(f'{pbgdir}/data/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}']
+            return self.transport.sync(PurePath(f'{pbgdir}/data/upload/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}', include=f'{{*.json}}')
         elif direction == 'up' and spath == 'multi':
-            cmd = ['rclone', 'sync', '-v', '--include', f'{{multi.hjson,*.json}}', PurePath(f'{pbgdir}/data/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}']
+            return self.transport.sync(PurePath(f'{pbgdir}/data/upload/{spath}'), f'{self.bucket_dir}/{spath}_{self.name}', include=f'{{multi.hjson,*.json}}')
         elif direction == 'down' and spath == 'master':
-            cmd = ['rclone', 'sync', '-v', '--exclude', f'{{cmd_{self.name}/*,instances_**,multi_**,run_v7_**}}', f'{self.bucket_dir}', PurePath(f'{pbgdir}/data/remote')]
+            return self.transport.sync(f'{self.bucket_dir}', PurePath(f'{pbgdir}/data/remote'), exclude=f'{{cmd_{self.name}/*,instances_**,multi_**,run_v7_**}}')
         elif direction == 'down' and spath == 'slave':
-            cmd = ['rclone', 'sync', '-v', '--exclude', f'{{cmd_{self.name}/*,cmd_**/alive_*.cmd*,instances_**,multi_**,run_v7_**}}', f'{self.bucket_dir}', PurePath(f'{pbgdir}/data/remote')]
-        logfile = Path(f'{pbgdir}/data/logs/sync.log')
-        if logfile.exists():
-            if logfile.stat().st_size >= 10485760:
-                logfile.replace(f'{pbgdir}/data/logs/sync.log.old')
-                logfile = Path(f'{pbgdir}/data/logs/sync.log')
-        log = open(logfile,"ab")
-        if platform.system() == "Windows":
-            creationflags = subprocess.CREATE_NO_WINDOW
-            subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
+            return self.transport.sync(f'{self.bucket_dir}', PurePath(f'{pbgdir}/data/remote'), exclude=f'{{cmd_{self.name}/*,cmd_**/alive_*.cmd*,cmd_**/alive_*.delta*,instances_**,multi_**,run_v7_**}}')
+        return False
+
+    def run_parallel(self, tasks: list):
+        """
+        Runs independent sync tasks on the worker pool and waits until all are done.
+        Each task is a function that runs its own syncs in order, so the order within a single path is kept.
+        Returns the results of the tasks in order, None for a task that raised.
+        """
+        futures = [self.executor.submit(task) for task in tasks]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f'Something went wrong, but continue {e}')
+                traceback.print_exception(e)
+                results.append(None)
+        return results
+
+    def sync_up(self):
+        """
+        Sync v7, multi and single configurations up in parallel, then the status files of the synced
+        configurations in one sync, the status syncs all write to cmd_{name}
+        """
+        spaths = [spath for spath in self.run_parallel([self.sync_v7_up, self.sync_multi_up, self.sync_single_up]) if spath]
+        if not spaths:
+            return
+        print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync {", ".join(STATUS_FILES[spath][0] for spath in spaths)} up: {self.name}')
+        if self.sync_status_up(spaths):
+            self._sync_failed.difference_update(spaths)
         else:
-            subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync status up: {self.name} failed, retry on next run')
+            self._sync_failed.update(spaths)
+
+    def sync_status_up(self, spaths: list):
+        """Syncs the status files and manifests of the configuration paths spaths and the alive files to cmd_{name}"""
+        pbgdir = Path.cwd()
+        files = ",".join(file for spath in spaths for file in STATUS_FILES[spath])
+        return self.transport.sync(PurePath(f'{pbgdir}/data/cmd'), f'{self.bucket_dir}/cmd_{self.name}', include=f'{{alive_*.cmd*,{files}}}')
+
+    def sync_servers_down(self):
+        """
+        Sync configurations from all remote servers down in parallel. The api keys of all servers are
+        written to the same api-keys.json, they are synced one server after the other.
+        """
+        def sync_server(server: RemoteServer):
+            self.refresh_server(server)
+            server.sync_v7_down()
+            server.sync_multi_down()
+            server.sync_single_down()
+        self.run_parallel([lambda server=server: sync_server(server) for server in self.remote_servers])
+        for server in self.remote_servers:
+            try:
+                server.sync_api()
+            except Exception as e:
+                print(f'Something went wrong, but continue {e}')
+                traceback.print_exception(e)
+        for server in self.remote_servers:
+            self.record_metrics(server.name, server.ts, server.cpu, server.mem, server.swap, server.disk)
+
+    def record_metrics(self, name: str, ts: int, cpu, mem, swap, disk):
+        """Adds the system usage of a new alive to the server metrics history"""
+        if not ts or self.metrics_ts.get(name) == ts or not all([mem, swap, disk]):
+            return
+        self.metrics_ts[name] = ts
+        self.metrics.add(name, ts, server_sample(cpu, mem, swap, disk))
+
+    def save_manifest(self, spath: str):
+        """
+        Takes the snapshot of data/{spath} that is uploaded and writes its manifest to data/cmd/manifest_{spath}.json,
+        the manifest is synced up together with the status file
+        """
+        pbgdir = Path.cwd()
+        manifest = snapshot_tree(Path(f'{pbgdir}/data/{spath}'), Path(f'{pbgdir}/data/upload/{spath}'), SYNC_PATTERNS[spath])
+        write_json_atomic(Path(f'{self.cmd_path}/manifest_{spath}.json'), manifest)
+        return manifest
+
+    def cycle(self, metrics: DaemonMetrics):
+        """One run of the main loop: sync up, alive, sync status down, scan the remote servers and sync them down"""
+        with metrics.phase("sync_up"):
+            self.sync_up()
+        with metrics.phase("api_sync"):
+            self.check_if_api_synced()
+        with metrics.phase("alive"):
+            self.alive()
+        # self.sync('down', 'cmd')
+        with metrics.phase("sync_status"):
+            self.sync_status_down()
+        with metrics.phase("scan"):
+            self.update_remote_servers()
+        with metrics.phase("sync_down"):
+            self.sync_servers_down()
+        metrics.loop()
 
     def sync_status_down(self):
         if self.role == "master":
@@ -614,37 +895,46 @@ class PBRemote():
             self.sync('down', 'slave')
 
     def sync_v7_up(self):
-        if self.local_run.instances_status_v7.has_new_status():
+        if self.local_run.instances_status_v7.has_new_status() or 'run_v7' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status_v7.json from: {self.name}')
             status_ts = self.local_run.instances_status_v7.status_ts
             self.local_run.instances_status_v7.update_status()
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Update status_v7 ts: {self.name} old: {status_ts} new: {self.local_run.instances_status_v7.status_ts}')
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync v7 up: {self.name}')
-            self.sync('up', 'run_v7')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync status_v7.json up: {self.name}')
-            self.sync('up', 'status_v7')
+            self.save_manifest('run_v7')
+            if self.sync('up', 'run_v7'):
+                # The status is synced up by sync_up together with the other status files
+                return 'run_v7'
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync v7 up: {self.name} failed, retry on next run')
+            self._sync_failed.add('run_v7')
 
     def sync_multi_up(self):
-        if self.local_run.instances_status.has_new_status():
+        if self.local_run.instances_status.has_new_status() or 'multi' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status.json from: {self.name}')
             status_ts = self.local_run.instances_status.status_ts
             self.local_run.instances_status.update_status()
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Update status ts: {self.name} old: {status_ts} new: {self.local_run.instances_status.status_ts}')
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync multi up: {self.name}')
-            self.sync('up', 'multi')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync status.json up: {self.name}')
-            self.sync('up', 'status')
+            self.save_manifest('multi')
+            if self.sync('up', 'multi'):
+                # The status is synced up by sync_up together with the other status files
+                return 'multi'
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync multi up: {self.name} failed, retry on next run')
+            self._sync_failed.add('multi')
     
     def sync_single_up(self):
-        if self.local_run.instances_status_single.has_new_status():
+        if self.local_run.instances_status_single.has_new_status() or 'instances' in self._sync_failed:
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} New status_single.json from: {self.name}')
             status_ts = self.local_run.instances_status_single.status_ts
             self.local_run.instances_status_single.update_status()
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Update status_single ts: {self.name} old: {status_ts} new: {self.local_run.instances_status_single.status_ts}')
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync single up: {self.name}')
-            self.sync('up', 'instances')
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync status_single.json up: {self.name}')
-            self.sync('up', 'status_single')
+            self.save_manifest('instances')
+            if self.sync('up', 'instances'):
+                # The status is synced up by sync_up together with the other status files
+                return 'instances'
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync single up: {self.name} failed, retry on next run')
+            self._sync_failed.add('instances')
 
     def sync_api_up(self):
         """Takes the api-keys.json from passivbot folder to sync it to other remotes by putting it in data/cmd/api-keys.json."""
@@ -658,11 +948,28 @@ class PBRemote():
             print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Sync api-keys.json to all remote servers')
             shutil.copy(source, api_file)
     
+    def is_api_acked(self, server: RemoteServer, api_md5: str):
+        """
+        True if the server reported api_md5 in its newest alive, the acknowledged md5 is remembered per server.
+        refresh_server() only loads a server with a new alive, an alive with another md5 clears the acknowledgement.
+        """
+        self.refresh_server(server)
+        acked = self.api_acked.get(server.name)
+        if acked is not None and acked != server.api_md5:
+            # The server reports other api-keys now (restored backup, manual edit)
+            del self.api_acked[server.name]
+        elif acked == api_md5:
+            return True
+        if server.is_api_md5_same(api_md5):
+            self.api_acked[server.name] = api_md5
+            return True
+        return False
+
     def check_if_api_synced(self):
         """Verify that the API keys are the same in PBGUI and PB folders and deletes PBGUI folder's file if api are synced."""
+        api_md5 = self.api_md5
         for server in self.remote_servers:
-            server.load()
-            if not server.is_api_md5_same(self.api_md5):
+            if not self.is_api_acked(server, api_md5):
                 return False
         pbgdir = Path.cwd()
         api_file = Path(f'{pbgdir}/data/cmd/api-keys.json')
@@ -699,6 +1006,8 @@ class PBRemote():
     def alive(self):
         """
         Saves system informations like the name, memory, swaps, disk space and cpu usage to an alive file that is then synchronised with rclone from local to the remote storage.
+        Every ALIVE_FULL_EVERY alive file is a full snapshot, the others only contain the changes against the last full snapshot.
+        As long as one of the remote servers does not read deltas (older pbgui), every alive file is a full snapshot.
         If there are more than 9 alive files, it will delete the oldest one.
         """
         timestamp = round(datetime.now().timestamp())
@@ -737,78 +1046,95 @@ class PBRemote():
             "pb7v": self.local_run.pb7_version,
             "pb7c": self.local_run.pb7_commit,
             })
+        # Normalize to JSON types (psutil returns namedtuples) so the delta compares like the receiver
+        cfg = json.loads(json.dumps(cfg))
+        self.record_metrics(self.name, timestamp, cfg["cpu"], cfg["mem"], cfg["swap"], cfg["disk"])
+        if self.alive_full is None or self.alive_count % ALIVE_FULL_EVERY == 0 or not self.remotes_read_alive_delta():
+            cfg["v"] = ALIVE_SCHEMA
+            cfg["type"] = "full"
+            self.alive_full = cfg
+            self.alive_count = 0
+            data = cfg
+            cfile = Path(f'{self.cmd_path}/alive_{timestamp}.cmd.gz')
+        else:
+            data = alive_delta(self.alive_full, cfg)
+            cfile = Path(f'{self.cmd_path}/alive_{timestamp}.delta.gz')
+        self.alive_count += 1
         # Save the JSON data as a gzip file
-        cfile = Path(f'{self.cmd_path}/alive_{timestamp}.cmd.gz')
         with gzip.open(cfile, "wt", encoding='utf-8') as f:
-            json.dump(cfg, f)
+            json.dump(data, f, separators=(',', ':'))
         # with open(cfile, "w", encoding='utf-8') as f:
         #     json.dump(cfg, f)
         self.sync('up', 'cmd')
-        p = str(Path(f'{self.cmd_path}/alive_*.cmd*'))
-        found_local = glob.glob(p)
-        found_local.sort()
+        found_local = [file for pattern in ALIVE_PATTERNS for file in glob.glob(str(Path(f'{self.cmd_path}/{pattern}')))]
+        found_local.sort(key=alive_timestamp)
         while len(found_local) > 9:
             local = Path(found_local.pop(0))
             local.unlink(missing_ok=True)
 
+    def remotes_read_alive_delta(self):
+        """True if all remote servers announced that they read delta alive files"""
+        return all(server.alive_schema >= ALIVE_SCHEMA for server in self.remote_servers)
+
     def calculate_api_md5(self):
         """Makes a md5 hash from the api-keys.json in passivbot folder."""
         if self.pb7dir:
             file = Path(f'{self.pb7dir}/api-keys.json')
         elif self.pbdir:
             file = Path(f'{self.pbdir}/api-keys.json')
-        if file.exists():
-            with open(file, 'rb') as file_obj:
-                file_contents = file_obj.read()
-            return hashlib.md5(file_contents).hexdigest()
-        return None
+        return file_md5(file)
 
     def load_remote(self):
         """
         Loads every cmd files and create a new RemoteServer instance for each new possible instances, and tries to start instances with load_instances(). 
         It then adds the RemoteServer to remote_servers if the RemoteServer exists.
         """
-        pbgdir = Path.cwd()
-        self.remote_servers = []
-        p = str(Path(f'{pbgdir}/data/remote/cmd_*'))
-        found_remote = glob.glob(p)
-        for remote in found_remote:
-            rserver = RemoteServer(remote)
-            rserver.pbdir = self.pbdir
-            rserver.pb7dir = self.pb7dir
-            rserver.bucket = self.bucket_dir
-            rserver.pbname = self.name
-            rserver.load()
-            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Add Server: {rserver.name}')
-            self.add(rserver)
+        self.servers = {}
+        self.servers_version = {}
+        self.api_acked = {}
+        self.update_remote_servers()
+
+    def new_remote_server(self, remote: str):
+        rserver = RemoteServer(remote)
+        rserver.pbdir = self.pbdir
+        rserver.pb7dir = self.pb7dir
+        rserver.bucket = self.bucket_dir
+        rserver.transport = self.transport
+        rserver.pbname = self.name
+        return rserver
 
     def update_remote_servers(self):
         """
-        Loads every cmd files and create a new RemoteServer instance for each new possible instances, and tries to start instances with load_instances(). 
-        It then adds the RemoteServer to remote_servers if the RemoteServer exists.
+        Adds a RemoteServer for every new cmd_* directory and removes servers whose directory is gone.
+        Known servers are only reloaded when their cmd directory changed (a new alive file was synced down).
         """
         pbgdir = Path.cwd()
         p = str(Path(f'{pbgdir}/data/remote/cmd_*'))
-        found_remote = glob.glob(p)
-        for remote in found_remote:
-            rserver = RemoteServer(remote)
-            rserver.pbdir = self.pbdir
-            rserver.pb7dir = self.pb7dir
-            rserver.bucket = self.bucket_dir
-            rserver.pbname = self.name
-            rserver.load()
-            add = True
-            for server in self.remote_servers:
-                if rserver.name == server.name:
-                    add = False
-            if add:
-                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Add New Server: {rserver.name}')
-                self.add(rserver)
+        found_remote = {PurePath(remote).name[4:]: remote for remote in glob.glob(p)}
+        for name, remote in found_remote.items():
+            server = self.servers.get(name)
+            if server is None:
+                server = self.new_remote_server(remote)
+                self.refresh_server(server)
+                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Add Server: {server.name}')
+                self.add(server)
+            else:
+                self.refresh_server(server)
         # Remove servers that are not in the remote anymore
-        for server in self.remote_servers:
-            if not Path(f'{pbgdir}/data/remote/cmd_{server.name}').exists():
-                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Remove Server: {server.name}')
-                self.remove(server)
+        for name in [name for name in self.servers if name not in found_remote]:
+            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Remove Server: {name}')
+            self.remove(self.servers[name])
+
+    def refresh_server(self, server: RemoteServer):
+        """Loads the server if its cmd directory changed since the last load, otherwise only a stat"""
+        try:
+            version = file_version(os.stat(server.path))
+        except FileNotFoundError:
+            # Removed by the next update_remote_servers
+            return
+        if version is None or self.servers_version.get(server.name) != version:
+            server.load()
+        self.servers_version[server.name] = version
 
     def run(self):
         """Starts PBRemote in unbuffered mode, and send an error message if it does not open every 10 secondes."""
@@ -871,15 +1197,30 @@ class PBRemote():
             else:
                 self.bucket = None
 
-    def save_config(self):
-        """Save the bucket name used in the remote storage in pbgui.ini."""
+    def load_transport(self):
+        """
+        Load the transport used for the remote storage from pbgui.ini.
+        Default is rclone. With transport = local, a local directory is used as bucket (for testing without rclone):
+
+        [pbremote]
+        transport = local
+        local_path = /tmp/pbgui_bucket
+        local_latency = 0.2
+        local_consistency_delay = 2
+        """
         pb_config = configparser.ConfigParser()
         pb_config.read('pbgui.ini')
-        if not pb_config.has_section("pbremote"):
-            pb_config.add_section("pbremote")
-        pb_config.set("pbremote", "bucket", self.bucket)
-        with open('pbgui.ini', 'w') as configfile:
-            pb_config.write(configfile)
+        if pb_config.get("pbremote", "transport", fallback="rclone") == "local":
+            pbgdir = Path.cwd()
+            root = pb_config.get("pbremote", "local_path", fallback=f'{pbgdir}/data/local_bucket')
+            latency = pb_config.getfloat("pbremote", "local_latency", fallback=0.0)
+            consistency_delay = pb_config.getfloat("pbremote", "local_consistency_delay", fallback=0.0)
+            return LocalTransport(root, latency, consistency_delay)
+        return RcloneTransport()
+
+    def save_config(self):
+        """Save the bucket name used in the remote storage in pbgui.ini."""
+        save_ini("pbremote", "bucket", self.bucket)
 
     def is_rclone_installed(self):
         """Checks the installation by running 'rclone version' as a process."""
@@ -987,7 +1328,7 @@ def main():
 
     ### Usage : 
     - Run PBRemote and save its process ID to pbremote.pid.
-    - Logs in pbgui/data/logs/PBRemote.log and creates a .old file if the file is >10MB.
+    - Logs in pbgui/data/logs/PBRemote.log and rotates it into compressed generations if the file is >10MB.
     - 
     """
     pbgdir = Path.cwd()
@@ -995,8 +1336,8 @@ def main():
     if not dest.exists():
         dest.mkdir(parents=True)
     logfile = Path(f'{str(dest)}/PBRemote.log')
-    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    redirect_output(logfile)
+    rotator = LogRotator(logfile, max_bytes=10485760)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Init: PBRemote')
     remote = PBRemote()
     if remote.is_running():
@@ -1012,27 +1353,11 @@ def main():
         exit(1)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Start: PBRemote {remote.bucket}')
     remote.startts = round(datetime.now().timestamp())
+    metrics = DaemonMetrics("PBRemote", dump_every=6)
     while True:
         try:
-            if logfile.exists():
-                if logfile.stat().st_size >= 10485760:
-                    logfile.replace(f'{str(logfile)}.old')
-                    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-                    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-            remote.sync_v7_up()
-            remote.sync_multi_up()
-            remote.sync_single_up()
-            remote.check_if_api_synced()
-            remote.alive()
-            # remote.sync('down', 'cmd')
-            remote.sync_status_down()
-            remote.update_remote_servers()
-            for server in remote.remote_servers:
-                server.load()
-                server.sync_v7_down()
-                server.sync_multi_down()
-                server.sync_single_down()
-                server.sync_api()
+            rotator.rotate_if_needed(lambda: redirect_output(logfile))
+            remote.cycle(metrics)
         except Exception as e:
             print(f'Something went wrong, but continue {e}')
             traceback.print_exc()
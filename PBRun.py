@@ -14,16 +14,19 @@ from pathlib import Path, PurePath
 from time import sleep, mktime
 import glob
 import json
+from pbgui_purefunc import write_json_atomic, save_ini
 import hjson
-from io import TextIOWrapper
 from datetime import datetime, date, timedelta
 import platform
-from shutil import copy, copytree, rmtree
+from shutil import copytree, rmtree
 import os
 import traceback
 import uuid
+import copy as copy_module
 from Status import InstanceStatus, InstancesStatus
 from PBCoinData import CoinData
+from DaemonMetrics import DaemonMetrics
+from Log import LogRotator, redirect_output
 import re
 
 class Monitor():
@@ -64,6 +67,9 @@ class Monitor():
                 self.log_lp = 0
                 seek = True
             current_position = logfile.stat().st_size
+            if current_position < self.log_lp:
+                # Log was rotated, read the new log from the start
+                self.log_lp = 0
             with open(logfile, "r") as f:
                 f.seek(self.log_lp)
                 new_content = f.read().splitlines()
@@ -197,8 +203,7 @@ class Monitor():
             "ct": self.pnl_counter_today,
             "cy": self.pnl_counter_yesterday
             })
-        with open(monitor_file, "w", encoding='utf-8') as f:
-            json.dump(monitor, f)
+        write_json_atomic(monitor_file, monitor)
 
 class DynamicIgnore():
     def __init__(self):
@@ -243,6 +248,7 @@ class DynamicIgnore():
 class RunSingle():
     def __init__(self):
         self.monitor = Monitor()
+        self.log_rotator = None
         self.user = None
         self.path = None
         self._single_config = {}
@@ -307,13 +313,10 @@ class RunSingle():
             sleep(1)
 
     def clean_log(self):
-        logfile = Path(f'{self.path}/passivbot.log')
-        if logfile.exists():
-            if logfile.stat().st_size >= 10485760:
-                logfile_old = Path(f'{str(logfile)}.old')
-                copy(logfile,logfile_old)
-                with open(logfile,'r+') as file:
-                    file.truncate()
+        # passivbot keeps passivbot.log open, so it is copied and truncated instead of renamed
+        if not self.log_rotator:
+            self.log_rotator = LogRotator(Path(f'{self.path}/passivbot.log'), max_bytes=10485760, copy_truncate=True)
+        self.log_rotator.rotate_if_needed()
 
     def create_parameters(self):
         """Create the list of parameters used when running passivbot single instance.
@@ -421,6 +424,7 @@ class RunSingle():
 class RunMulti():
     def __init__(self):
         self.monitor = Monitor()
+        self.log_rotator = None
         self.user = None
         self.path = None
         self._multi_config = {}
@@ -485,13 +489,10 @@ class RunMulti():
             sleep(1)
 
     def clean_log(self):
-        logfile = Path(f'{self.path}/passivbot.log')
-        if logfile.exists():
-            if logfile.stat().st_size >= 10485760:
-                logfile_old = Path(f'{str(logfile)}.old')
-                copy(logfile,logfile_old)
-                with open(logfile,'r+') as file:
-                    file.truncate()
+        # passivbot keeps passivbot.log open, so it is copied and truncated instead of renamed
+        if not self.log_rotator:
+            self.log_rotator = LogRotator(Path(f'{self.path}/passivbot.log'), max_bytes=10485760, copy_truncate=True)
+        self.log_rotator.rotate_if_needed()
 
     def create_multi_hjson(self):
         # Write running Version to file
@@ -569,9 +570,91 @@ class RunMulti():
                 print(f'Something went wrong, but continue {e}')
                 traceback.print_exc()
 
+# coin_flags options with a value, in the order they are written back
+COIN_FLAGS = ["-lm", "-lw", "-sm", "-sw", "-lev", "-lc"]
+
+def parse_coin_flags(flags: str):
+    """
+    Parses coin_flags like "-lm n -lw 0.5 -lc path" into {"-lm": "n", "-lw": "0.5", "-lc": "path"}.
+    A value runs until the next option, so paths with spaces are kept.
+    """
+    parsed = {}
+    option = None
+    for token in flags.split():
+        if re.fullmatch(r'-[a-zA-Z_]+', token):
+            option = token
+            parsed[option] = []
+        elif option is not None:
+            parsed[option].append(token)
+    return {option: " ".join(value) for option, value in parsed.items()}
+
+def format_coin_flags(flags: dict):
+    """Writes parsed coin_flags back as string, known options first in the order of COIN_FLAGS"""
+    options = [o for o in COIN_FLAGS if o in flags] + [o for o in flags if o not in COIN_FLAGS]
+    return " ".join(f'{option} {flags[option]}'.strip() for option in options)
+
+def fix_coin_flags(coin_flags: dict, path: str):
+    """
+    Points the -lc option of every coin to {path}/{coin}.json.
+    Returns the new coin_flags and the diff {coin: (old, new)}, the diff is empty if nothing changed.
+    """
+    new_coin_flags = {}
+    diff = {}
+    for coin, flags in coin_flags.items():
+        parsed = parse_coin_flags(flags)
+        if "-lc" in parsed:
+            parsed["-lc"] = f'{path}/{coin}.json'
+            new_flags = format_coin_flags(parsed)
+            if parse_coin_flags(new_flags) != parse_coin_flags(flags):
+                diff[coin] = (flags, new_flags)
+                flags = new_flags
+        new_coin_flags[coin] = flags
+    return new_coin_flags, diff
+
+# Config sections a running passivbot v7 does not read
+V7_RELOAD_SAFE = ["pbgui", "backtest", "optimize"]
+# pbgui settings that change what passivbot reads (ignored_coins from list to ignored_coins.json)
+V7_RESTART_REQUIRED = ["pbgui.dynamic_ignore"]
+
+def config_diff(old, new, prefix: str = ""):
+    """Returns the dotted keys of all values that differ between two configs"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = []
+        for key in sorted(old.keys() | new.keys()):
+            changed += config_diff(old.get(key), new.get(key), f'{prefix}{key}.')
+        return changed
+    if old != new:
+        return [prefix[:-1]]
+    return []
+
+def normalize_v7_config(config: dict, path: str):
+    """Applies the changes RunV7.load makes to config.json, so a running and a new config can be compared"""
+    config = copy_module.deepcopy(config)
+    live = config.setdefault("live", {})
+    if "coin_flags" in live:
+        live["coin_flags"] = fix_coin_flags(live["coin_flags"], path)[0]
+    if config.get("pbgui", {}).get("dynamic_ignore"):
+        live["ignored_coins"] = str(PurePath(f'{path}/ignored_coins.json'))
+    return config
+
+def v7_restart_required(old: dict, new: dict, path: str):
+    """
+    Classifies the change from the running config old to the new config of the instance in path.
+    Returns the changed keys and True if passivbot has to be restarted.
+    passivbot does not read pbgui, backtest and optimize. With dynamic_ignore the ignored coins are
+    in ignored_coins.json, which passivbot reads again while running. Everything else, coin_flags
+    included, is only read at start.
+    """
+    changed = config_diff(normalize_v7_config(old, path), normalize_v7_config(new, path))
+    for key in changed:
+        if key in V7_RESTART_REQUIRED or key.split('.')[0] not in V7_RELOAD_SAFE:
+            return changed, True
+    return changed, False
+
 class RunV7():
     def __init__(self):
         self.monitor = Monitor()
+        self.log_rotator = None
         self.user = None
         self.path = None
         self._v7_config = {}
@@ -581,6 +664,8 @@ class RunV7():
         self.pbvenv = None
         self.pbgdir = None
         self.dynamic_ignore = None
+        # coin_flags changed by the last load(), {coin: (old, new)}
+        self.coin_flags_diff = {}
 
     def watch(self):
         if not self.is_running():
@@ -638,13 +723,10 @@ class RunV7():
             sleep(1)
 
     def clean_log(self):
-        logfile = Path(f'{self.path}/passivbot.log')
-        if logfile.exists():
-            if logfile.stat().st_size >= 10485760:
-                logfile_old = Path(f'{str(logfile)}.old')
-                copy(logfile,logfile_old)
-                with open(logfile,'r+') as file:
-                    file.truncate()
+        # passivbot keeps passivbot.log open, so it is copied and truncated instead of renamed
+        if not self.log_rotator:
+            self.log_rotator = LogRotator(Path(f'{self.path}/passivbot.log'), max_bytes=10485760, copy_truncate=True)
+        self.log_rotator.rotate_if_needed()
 
     def create_v7_running_version(self):
         # Write running Version to file
@@ -666,39 +748,14 @@ class RunV7():
                 self.version = self._v7_config["pbgui"]["version"]
                 self.monitor.version = self.version
                 if self.name == self._v7_config["pbgui"]["enabled_on"]:
+                    changed = False
                     # Fix path in coin_flags
                     if "coin_flags" in self._v7_config["live"]:
-                        coin_flags = self._v7_config["live"]["coin_flags"]
-                        for coin in coin_flags.copy():
-                            flags = coin_flags[coin]
-                            if "-lc" in flags:
-                                lc = f'-lc {self.path}/{coin}.json'
-                                lm = ""
-                                lw = ""
-                                sm = ""
-                                sw = ""
-                                lev = ""
-                                flags = coin_flags[coin]
-                                # if -lm in flags then get mode_long
-                                if "-lm" in flags:
-                                    lm = f'-lm {flags.split("-lm")[1].split()[0]} '
-                                # if -lw in flags then get we_long
-                                if "-lw" in flags:
-                                    lw = f'-lw {flags.split("-lw")[1].split()[0]} '
-                                # if -sm in flags then get mode_short
-                                if "-sm" in flags:
-                                    sm = f'-sm {flags.split("-sm")[1].split()[0]} '
-                                # if -sw in flags then get we_short
-                                if "-sw" in flags:
-                                    sw = f'-sw {flags.split("-sw")[1].split()[0]} '
-                                # if -lev in flags then get leverage
-                                if "-lev" in flags:
-                                    lev = f'-lev {flags.split("-lev")[1].split()[0]} '
-                                new_flags = f"{lm}{lw}{sm}{sw}{lev}{lc}"
-                                coin_flags[coin] = new_flags
-                        self._v7_config["live"]["coin_flags"] = coin_flags
-                        with open(file, "w", encoding='utf-8') as f:
-                            json.dump(self._v7_config, f, indent=4)
+                        coin_flags, self.coin_flags_diff = fix_coin_flags(self._v7_config["live"]["coin_flags"], self.path)
+                        if self.coin_flags_diff:
+                            print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} coin_flags changed: {self.user} {self.coin_flags_diff}')
+                            self._v7_config["live"]["coin_flags"] = coin_flags
+                            changed = True
                     if "dynamic_ignore" in self._v7_config["pbgui"]:
                         if self._v7_config["pbgui"]["dynamic_ignore"]:
                             self.dynamic_ignore = DynamicIgnore()
@@ -715,9 +772,10 @@ class RunV7():
                                         self.dynamic_ignore.ignored_coins_long = self._v7_config["live"]["ignored_coins"]["long"]
                                     if "short" in self._v7_config["live"]["ignored_coins"]:
                                         self.dynamic_ignore.ignored_coins_short = self._v7_config["live"]["ignored_coins"]["short"]
-                            self._v7_config["live"]["ignored_coins"] = str(PurePath(f'{self.path}/ignored_coins.json'))
-                            with open(file, "w", encoding='utf-8') as f:
-                                json.dump(self._v7_config, f, indent=4)
+                            ignored_coins = str(PurePath(f'{self.path}/ignored_coins.json'))
+                            if self._v7_config["live"].get("ignored_coins") != ignored_coins:
+                                self._v7_config["live"]["ignored_coins"] = ignored_coins
+                                changed = True
                             # Find Exchange from User
                             api_path = f'{self.pbdir}/api-keys.json'
                             if Path(api_path).exists():
@@ -726,6 +784,9 @@ class RunV7():
                                 if self.user in api_keys:
                                     self.dynamic_ignore.coindata.exchange = api_keys[self.user]["exchange"]
                                     self.dynamic_ignore.watch()
+                    # Only write when something changed, a new config.json restarts the bot
+                    if changed:
+                        write_json_atomic(file, self._v7_config, indent=4)
                     return True
                 else:                        
                     self.name = self._v7_config["pbgui"]["enabled_on"]
@@ -980,6 +1041,8 @@ class PBRun():
             for v7 in self.run_v7:
                 if v7.path == run_v7.path:
                     v7.version = run_v7.version
+                    # Keep watching ignored coins with the settings of the new config
+                    v7.dynamic_ignore = run_v7.dynamic_ignore
                     return
             self.run_v7.append(run_v7)
     
@@ -1082,18 +1145,18 @@ class PBRun():
                     if instance.version > status.version:
                         # Install new v7 version
                         print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Install: New V7 Version {instance.name} Old: {status.version} New: {instance.version}')
-                        # Remove old *.json configs
                         dest = f'{self.v7_path}/{instance.name}'
+                        src = f'{self.pbgdir}/data/remote/run_v7_{rserver}/{instance.name}'
+                        reload = not self.is_v7_restart_required(src, dest)
+                        # Remove old *.json configs
                         p = str(Path(f'{dest}/*'))
                         items = glob.glob(p)
                         for item in items:
                             if item.endswith('.json'):
                                 Path(item).unlink(missing_ok=True)
-                        src = f'{self.pbgdir}/data/remote/run_v7_{rserver}/{instance.name}'
-                        dest = f'{self.v7_path}/{instance.name}'
                         if Path(src).exists():
                             copytree(src, dest, dirs_exist_ok=True)
-                            self.watch_v7([f'{self.v7_path}/{instance.name}'])
+                            self.watch_v7([f'{self.v7_path}/{instance.name}'], reload)
                 else:
                     # Install new v7 instance
                     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Install: New V7 Instance {instance.name} from {rserver} Version: {instance.version}')
@@ -1301,35 +1364,38 @@ class PBRun():
     def update_activate_v7(self):
         self.activate_v7_ts = int(datetime.now().timestamp())
         self.instances_status_v7.activate_ts = self.activate_v7_ts
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("main", "activate_v7_ts", str(self.activate_v7_ts))
-        with open('pbgui.ini', 'w') as pbgui_configfile:
-            pb_config.write(pbgui_configfile)
+        save_ini("main", "activate_v7_ts", str(self.activate_v7_ts))
 
     def update_activate(self):
         self.activate_ts = int(datetime.now().timestamp())
         self.instances_status.activate_ts = self.activate_ts
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("main", "activate_ts", str(self.activate_ts))
-        with open('pbgui.ini', 'w') as pbgui_configfile:
-            pb_config.write(pbgui_configfile)
+        save_ini("main", "activate_ts", str(self.activate_ts))
 
     def update_activate_single(self):
         self.activate_single_ts = int(datetime.now().timestamp())
         self.instances_status_single.activate_ts = self.activate_single_ts
-        pb_config = configparser.ConfigParser()
-        pb_config.read('pbgui.ini')
-        pb_config.set("main", "activate_single_ts", str(self.activate_single_ts))
-        with open('pbgui.ini', 'w') as pbgui_configfile:
-            pb_config.write(pbgui_configfile)
+        save_ini("main", "activate_single_ts", str(self.activate_single_ts))
+
+    def is_v7_restart_required(self, src: str, dest: str):
+        """True if the new v7 config in src needs a restart of the passivbot running the config in dest."""
+        try:
+            with open(Path(f'{src}/config.json'), "r", encoding='utf-8') as f:
+                new = json.load(f)
+            with open(Path(f'{dest}/config.json'), "r", encoding='utf-8') as f:
+                old = json.load(f)
+        except (OSError, ValueError):
+            return True
+        changed, restart = v7_restart_required(old, new, dest)
+        print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} {"Restart" if restart else "Reload"}: {dest.split("/")[-1]} changed: {changed}')
+        return restart
 
-    def watch_v7(self, v7_instances : list = None):
+    def watch_v7(self, v7_instances : list = None, reload : bool = False):
         """Create or delete v7 instances and activate them or not depending on their status.
 
         Args:
             v7_instances (list, optional): List of v7-instance paths. Defaults to None.
+            reload (bool, optional): The new configs only changed settings passivbot does not read
+                or reads from ignored_coins.json, a running passivbot is not restarted. Defaults to False.
         """
         if not v7_instances:
             p = str(Path(f'{self.v7_path}/*'))
@@ -1352,9 +1418,15 @@ class PBRun():
                     if run_v7.is_running():
                         running_version = self.find_running_version(v7_instance)
                         if running_version < run_v7.version:
-                            run_v7.stop()
-                            run_v7.create_v7_running_version()
-                            run_v7.start()
+                            if reload:
+                                print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Reload: passivbot v7 {v7_instance}/config.json without restart')
+                                run_v7.create_v7_running_version()
+                                if run_v7.dynamic_ignore is not None:
+                                    run_v7.dynamic_ignore.save()
+                            else:
+                                run_v7.stop()
+                                run_v7.create_v7_running_version()
+                                run_v7.start()
                     else:
                         run_v7.create_v7_running_version()
                         run_v7.start()
@@ -1529,7 +1601,7 @@ def main():
 
     ### Usage : 
     - Run PBRun and save its process ID to pbrun.pid.
-    - Logs in pbgui/data/logs/PBRun.log and creates a .old if the file is too heavy.
+    - Logs in pbgui/data/logs/PBRun.log and rotates it into compressed generations if the file is too heavy.
     - Create and monitor single, multi and instances of passivbot. (Instances will be deleted in future versions)
     """
     pbgdir = Path.cwd()
@@ -1537,8 +1609,8 @@ def main():
     if not dest.exists():
         dest.mkdir(parents=True)
     logfile = Path(f'{str(dest)}/PBRun.log')
-    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    redirect_output(logfile)
+    rotator = LogRotator(logfile, max_bytes=1048576)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Start: PBRun')
     run = PBRun()
     if run.is_running():
@@ -1550,34 +1622,35 @@ def main():
     run.watch_v7()
     run.watch_multi()
     run.watch_single()
+    metrics = DaemonMetrics("PBRun", dump_every=12)
     count = 0
     while True:
         try:
-            if logfile.exists():
-                if logfile.stat().st_size >= 1048576:
-                    logfile.replace(f'{str(logfile)}.old')
-                    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-                    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-            run.has_activate()
-            run.has_update_status()
-            for run_v7 in run.run_v7:
-                run_v7.watch()
-                run_v7.watch_dynamic()
-                run_v7.monitor.watch_log()
-            for run_multi in run.run_multi:
-                run_multi.watch()
-                run_multi.watch_dynamic()
-                run_multi.monitor.watch_log()
-            for run_single in run.run_single:
-                run_single.watch()
-                run_single.monitor.watch_log()
-            if count%2 == 0:
+            rotator.rotate_if_needed(lambda: redirect_output(logfile))
+            with metrics.phase("scan"):
+                run.has_activate()
+                run.has_update_status()
+            with metrics.phase("watch"):
                 for run_v7 in run.run_v7:
-                    run_v7.clean_log()
+                    run_v7.watch()
+                    run_v7.watch_dynamic()
+                    run_v7.monitor.watch_log()
                 for run_multi in run.run_multi:
-                    run_multi.clean_log()
+                    run_multi.watch()
+                    run_multi.watch_dynamic()
+                    run_multi.monitor.watch_log()
                 for run_single in run.run_single:
-                    run_single.clean_log()
+                    run_single.watch()
+                    run_single.monitor.watch_log()
+            if count%2 == 0:
+                with metrics.phase("clean_log"):
+                    for run_v7 in run.run_v7:
+                        run_v7.clean_log()
+                    for run_multi in run.run_multi:
+                        run_multi.clean_log()
+                    for run_single in run.run_single:
+                        run_single.clean_log()
+            metrics.loop()
             sleep(5)
             count += 1
         except Exception as e:
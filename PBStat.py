@@ -4,9 +4,10 @@ import sys
 import os
 from pathlib import Path, PurePath
 from time import sleep
-from io import TextIOWrapper
 from datetime import datetime
 from Instance import Instances
+from DaemonMetrics import DaemonMetrics
+from Log import LogRotator, redirect_output
 import platform
 import traceback
 import logging
@@ -93,8 +94,8 @@ def main():
     if not dest.exists():
         dest.mkdir(parents=True)
     logfile = Path(f'{str(dest)}/PBStat.log')
-    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
+    redirect_output(logfile)
+    rotator = LogRotator(logfile, max_bytes=10485760)
     print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Start: PBStat')
     stat = PBStat()
     if stat.is_running():
@@ -103,23 +104,23 @@ def main():
         print(f'{datetime.now().isoformat(sep=" ", timespec="seconds")} Error: PBStat already started')
         exit(1)
     stat.save_pid()
+    metrics = DaemonMetrics("PBStat", dump_every=1)
     trade_count = 0
     while True:
         try:
-            if logfile.exists():
-                if logfile.stat().st_size >= 10485760:
-                    logfile.replace(f'{str(logfile)}.old')
-                    sys.stdout = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-                    sys.stderr = TextIOWrapper(open(logfile,"ab",0), write_through=True)
-            if trade_count%5 == 0:
-                stat.fetch_all()
-            else:
-                stat.fetch_status()
+            rotator.rotate_if_needed(lambda: redirect_output(logfile))
+            with metrics.phase("fetch"):
+                if trade_count%5 == 0:
+                    stat.fetch_all()
+                else:
+                    stat.fetch_status()
             trade_count += 1
+            metrics.loop()
             sleep(60)
             # Refresh Instances if there are some new or removed
-            stat.instances = []
-            stat.load()
+            with metrics.phase("scan"):
+                stat.instances = []
+                stat.load()
         except Exception as e:
             print(f'Something went wrong, but continue {e}')
             traceback.print_exc()
@@ -0,0 +1,240 @@
+"""
+Transports move files between the local server and the remote storage used by PBRemote.
+
+RcloneTransport runs rclone against the configured bucket, this is what runs in production.
+
+LocalTransport uses a local directory as bucket. It can add latency to every call and delay
+the visibility of uploaded files (eventual consistency), so PBRemote can be run and measured
+offline, for example with two pbgui directories sharing the same bucket directory.
+
+Remote paths are strings in the rclone form "<bucket>:<path>", local paths are PurePath objects.
+"""
+import subprocess
+import platform
+import threading
+import shutil
+import uuid
+import re
+import os
+from pathlib import Path
+from time import sleep, time
+from Log import LogRotator
+
+# rclone tuning for many small files (configs, status and alive files)
+RCLONE_TRANSFERS = 8
+RCLONE_CHECKERS = 16
+
+sync_log_lock = threading.Lock()
+
+class Transport():
+    """Interface of a transport, paths and filters use the rclone syntax"""
+    name = None
+
+    def sync(self, source, destination, include: str = None, exclude: str = None):
+        """Make destination identical to source for all files that pass the include/exclude filter, returns True on success"""
+        raise NotImplementedError
+
+    def delete(self, path, include: str):
+        """Delete all files below path that match include, returns True on success"""
+        raise NotImplementedError
+
+class RcloneTransport(Transport):
+    name = "rclone"
+
+    def run(self, cmd: list):
+        """Runs a rclone command and logs the output to data/logs/sync.log, returns True if rclone succeeded"""
+        pbgdir = Path.cwd()
+        logfile = Path(f'{pbgdir}/data/logs/sync.log')
+        with sync_log_lock:
+            LogRotator(logfile, max_bytes=10485760).rotate_if_needed()
+        with open(logfile,"ab") as log:
+            if platform.system() == "Windows":
+                creationflags = subprocess.CREATE_NO_WINDOW
+                result = subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True, creationflags=creationflags)
+            else:
+                result = subprocess.run(cmd, stdout=log, stderr=log, cwd=pbgdir, text=True)
+        return result.returncode == 0
+
+    def sync(self, source, destination, include: str = None, exclude: str = None):
+        cmd = ['rclone', 'sync', '-v']
+        if include:
+            cmd += ['--include', include]
+        if exclude:
+            cmd += ['--exclude', exclude]
+        cmd += [source, destination, '--transfers', str(RCLONE_TRANSFERS), '--checkers', str(RCLONE_CHECKERS)]
+        return self.run(cmd)
+
+    def delete(self, path, include: str):
+        return self.run(['rclone', 'delete', '-v', path, '--include', include])
+
+def filter_regex(pattern: str):
+    """Translates a rclone filter pattern like {cmd_*/*,run_v7_**} into a regex on the relative file path"""
+    if pattern.startswith('{') and pattern.endswith('}'):
+        alternatives = pattern[1:-1].split(',')
+    else:
+        alternatives = [pattern]
+    regex = []
+    for alternative in alternatives:
+        body = '^' if alternative.startswith('/') else '(^|/)'
+        alternative = alternative.lstrip('/')
+        i = 0
+        while i < len(alternative):
+            if alternative.startswith('**', i):
+                body += '.*'
+                i += 2
+            elif alternative[i] == '*':
+                body += '[^/]*'
+                i += 1
+            elif alternative[i] == '?':
+                body += '[^/]'
+                i += 1
+            else:
+                body += re.escape(alternative[i])
+                i += 1
+        regex.append(f'{body}$')
+    return re.compile('|'.join(f'({r})' for r in regex))
+
+class LocalTransport(Transport):
+    """
+    Local directory as bucket.
+
+    latency (seconds) is added to every sync/delete call.
+    Files uploaded to the bucket become visible only after consistency_delay seconds.
+    Until then they wait in root/.staging and are moved into place by the next call after the delay.
+    A staging batch is written as <name>.partial and renamed when complete, so settle() never moves a
+    batch a sync is still writing. Other threads and processes may settle or sync the same bucket at
+    any time, all walks tolerate files that disappear while they run.
+    """
+    name = "local"
+    STAGING = ".staging"
+    PARTIAL = ".partial"
+
+    def __init__(self, root: str, latency: float = 0.0, consistency_delay: float = 0.0):
+        self.root = Path(root)
+        self.latency = latency
+        self.consistency_delay = consistency_delay
+        self.calls = 0
+        self.settle_lock = threading.Lock()
+        if not self.root.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    def resolve(self, path):
+        """Remote paths "<bucket>:<path>" map to root/<path>, local paths are used as they are"""
+        if isinstance(path, str):
+            return Path(f'{self.root}/{path.split(":", 1)[1]}')
+        return Path(path)
+
+    def is_remote(self, path):
+        return isinstance(path, str)
+
+    def walk(self, path: Path):
+        """All files below path, directories removed during the walk are skipped"""
+        for dirpath, dirnames, filenames in os.walk(path):
+            if Path(dirpath) == self.root and self.STAGING in dirnames:
+                dirnames.remove(self.STAGING)
+            for filename in filenames:
+                if not filename.endswith(self.PARTIAL):
+                    yield Path(f'{dirpath}/{filename}')
+
+    def list_files(self, path: Path, include: str = None, exclude: str = None):
+        files = {}
+        include_re = filter_regex(include) if include else None
+        exclude_re = filter_regex(exclude) if exclude else None
+        for file in self.walk(path):
+            relative = file.relative_to(path).as_posix()
+            if include_re and not include_re.search(relative):
+                continue
+            if exclude_re and exclude_re.search(relative):
+                continue
+            files[relative] = file
+        return files
+
+    def settle(self):
+        """Makes staged uploads visible when their consistency_delay is over"""
+        staging = Path(f'{self.root}/{self.STAGING}')
+        with self.settle_lock:
+            try:
+                batches = sorted(os.listdir(staging))
+            except FileNotFoundError:
+                return
+            now = time()
+            for name in batches:
+                if name.endswith(self.PARTIAL) or float(name.split('_')[0]) > now:
+                    continue
+                batch = Path(f'{staging}/{name}')
+                for file in sorted(self.walk(batch)):
+                    destination = Path(f'{self.root}/{file.relative_to(batch).as_posix()}')
+                    try:
+                        destination.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(file, destination)
+                    except FileNotFoundError:
+                        # settled by another process
+                        pass
+                shutil.rmtree(batch, ignore_errors=True)
+
+    def is_same(self, source: Path, destination: Path):
+        try:
+            if source.stat().st_size != destination.stat().st_size:
+                return False
+            with open(source, 'rb') as s, open(destination, 'rb') as d:
+                return s.read() == d.read()
+        except FileNotFoundError:
+            return False
+
+    def sync(self, source, destination, include: str = None, exclude: str = None):
+        self.calls += 1
+        if self.latency:
+            sleep(self.latency)
+        try:
+            self.sync_files(source, destination, include, exclude)
+        except OSError as e:
+            print(f'Error: local sync {source} -> {destination} failed {e}')
+            return False
+        return True
+
+    def sync_files(self, source, destination, include: str = None, exclude: str = None):
+        self.settle()
+        source_path = self.resolve(source)
+        destination_path = self.resolve(destination)
+        source_files = self.list_files(source_path, include, exclude)
+        destination_files = self.list_files(destination_path, include, exclude)
+        stage = None
+        if self.is_remote(destination) and self.consistency_delay:
+            stage = Path(f'{self.root}/{self.STAGING}/{time() + self.consistency_delay:.3f}_{uuid.uuid4().hex}{self.PARTIAL}')
+        for relative, file in source_files.items():
+            target = Path(f'{destination_path}/{relative}')
+            if self.is_same(file, target):
+                continue
+            if stage:
+                target = Path(f'{stage}/{target.relative_to(self.root).as_posix()}')
+            self.copy(file, target)
+        if stage and stage.exists():
+            os.replace(stage, Path(str(stage)[:-len(self.PARTIAL)]))
+        for relative, file in destination_files.items():
+            if relative not in source_files:
+                file.unlink(missing_ok=True)
+
+    def copy(self, source: Path, target: Path):
+        """Copies source to a partial file and renames it, readers never see a partly written target"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = Path(f'{target}.{uuid.uuid4().hex}{self.PARTIAL}')
+        try:
+            shutil.copy2(source, partial)
+        except FileNotFoundError:
+            # source removed since it was listed, like rclone the next sync handles it
+            partial.unlink(missing_ok=True)
+            return
+        os.replace(partial, target)
+
+    def delete(self, path, include: str):
+        self.calls += 1
+        if self.latency:
+            sleep(self.latency)
+        try:
+            self.settle()
+            for file in self.list_files(self.resolve(path), include=include).values():
+                file.unlink(missing_ok=True)
+        except OSError as e:
+            print(f'Error: local delete {path} failed {e}')
+            return False
+        return True
@@ -10,31 +10,124 @@ from pathlib import Path
 import glob
 import json
 from shutil import rmtree
+import os
+from pbgui_purefunc import file_version
+
+# Index of the v7 instances by config.json path: (file_version, index)
+v7_index_cache = {}
+
+def load_v7_index(config_file: Path):
+    """
+    Returns the fields the instance list needs (enabled_on, version, note, twe and n_positions) of a v7 config.
+    Memoized until config.json changes, the full config is only parsed when the instance is opened.
+    """
+    try:
+        stat = os.stat(config_file)
+    except FileNotFoundError:
+        v7_index_cache.pop(str(config_file), None)
+        return None
+    version = file_version(stat)
+    cached = v7_index_cache.get(str(config_file))
+    if version and cached and cached[0] == version:
+        return cached[1]
+    try:
+        with open(config_file, "r", encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception as e:
+        print(f'Error loading v7 config: {e}')
+        v7_index_cache.pop(str(config_file), None)
+        return None
+    defaults = ConfigV7()
+    pbgui = config.get("pbgui", {})
+    bot = config.get("bot", {})
+    index = {
+        "user": config.get("live", {}).get("user", defaults.live.user),
+        "enabled_on": pbgui.get("enabled_on", defaults.pbgui.enabled_on),
+        "version": pbgui.get("version", defaults.pbgui.version),
+        "note": pbgui.get("note", defaults.pbgui.note),
+        "mtime": stat.st_mtime,
+    }
+    for side in ["long", "short"]:
+        side_defaults = getattr(defaults.bot, side)
+        index[f'{side}_twe'] = bot.get(side, {}).get("total_wallet_exposure_limit", side_defaults.total_wallet_exposure_limit)
+        index[f'{side}_n_positions'] = bot.get(side, {}).get("n_positions", side_defaults.n_positions)
+    if version:
+        v7_index_cache[str(config_file)] = (version, index)
+    else:
+        v7_index_cache.pop(str(config_file), None)
+    return index
 
 class V7Instance():
     def __init__(self):
         self.instance_path = None
-        self._users = Users()
-        v7_users = self._users.list_v7()
-        if v7_users:
-            self._user = v7_users[0]
-        else:
-            self._user = ""
-        self.config = ConfigV7()
+        # Users, default user and config are loaded on first access
+        self._users = None
+        self._user = None
+        self._config = None
+        self.index = None
         self.initialize()
 
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = Users()
+        return self._users
+
     # user
     @property
-    def user(self): return self._user
+    def user(self):
+        if self._user is None:
+            v7_users = self.users.list_v7()
+            if v7_users:
+                self._user = v7_users[0]
+            else:
+                self._user = ""
+        return self._user
     @user.setter
     def user(self, new_user):
-        if new_user != self._user:
+        if new_user != self.user:
             self._user = new_user
             self.initialize()
+
+    # config
+    @property
+    def config(self):
+        """The full config, parsed on first access"""
+        if self._config is None:
+            self._config = ConfigV7()
+            if self.instance_path:
+                self._config.config_file = Path(f'{self.instance_path}/config.json')
+                self._config.load_config()
+            self._config.live.user = self.user
+        return self._config
+    @config.setter
+    def config(self, new_config):
+        self._config = new_config
+
     @property
-    def version(self): return self.config.pbgui.version
+    def version(self):
+        if self._config is None and self.index:
+            return self.index["version"]
+        return self.config.pbgui.version
     @property
-    def enabled_on(self): return self.config.pbgui.enabled_on
+    def enabled_on(self):
+        if self._config is None and self.index:
+            return self.index["enabled_on"]
+        return self.config.pbgui.enabled_on
+    @property
+    def note(self):
+        if self._config is None and self.index:
+            return self.index["note"]
+        return self.config.pbgui.note
+    @property
+    def twe(self):
+        """Wallet exposure and n_positions of long and short, from the index while the config is not loaded"""
+        if self._config is None and self.index:
+            return {side: (self.index[f'{side}_twe'], self.index[f'{side}_n_positions']) for side in ["long", "short"]}
+        return {
+            "long": (self.config.bot.long.total_wallet_exposure_limit, self.config.bot.long.n_positions),
+            "short": (self.config.bot.short.total_wallet_exposure_limit, self.config.bot.short.n_positions),
+        }
     @property
     def running_version(self):
         if self.enabled_on == self.remote.name:
@@ -47,7 +140,8 @@ class V7Instance():
 
     def initialize(self):
         # Init config
-        self.config.live.user = self._user
+        if self._config is not None:
+            self._config.live.user = self.user
         # Init PBremote
         if 'remote' not in st.session_state:
             st.session_state.remote = PBRemote()
@@ -85,21 +179,28 @@ class V7Instance():
         stx.scrollableTextbox(log,height="500")
 
     def load(self, path: Path):
+        """
+        Loads the index of the instance, the full config is parsed when it is opened.
+        Returns False if the instance has no config.json.
+        """
         self._user = path.split('/')[-1]
         self.instance_path = Path(f'{PBGDIR}/data/run_v7/{self.user}')
-        self.config.config_file = Path(f'{self.instance_path}/config.json') 
-        self.config.load_config()
+        self._config = None
+        config_file = Path(f'{self.instance_path}/config.json')
+        self.index = load_v7_index(config_file)
         self.initialize()
+        return self.index is not None or config_file.exists()
 
     def save(self):
         self.config.pbgui.version += 1
-        self.config.backtest.exchange = self._users.find_exchange(self.user)
+        self.config.backtest.exchange = self.users.find_exchange(self.user)
         if self.config.backtest.exchange in ['bitget', 'okx','hyperliquid']:
             self.config.backtest.exchange = 'binance'
         self.config.backtest.base_dir = f'backtests/pbgui/{self.user}'
         self.instance_path = Path(f'{PBGDIR}/data/run_v7/{self.user}')
         self.config.config_file = Path(f'{self.instance_path}/config.json') 
         self.config.save_config()
+        self.index = load_v7_index(self.config.config_file)
         if "edit_run_v7_version" in st.session_state:
             del st.session_state.edit_run_v7_version
 
@@ -110,8 +211,8 @@ class V7Instance():
             self.config.live.ignored_coins.short = []
         # Init coindata
         coindata = st.session_state.pbcoindata
-        if coindata.exchange != self._users.find_exchange(self.user):
-            coindata.exchange = self._users.find_exchange(self.user)
+        if coindata.exchange != self.users.find_exchange(self.user):
+            coindata.exchange = self.users.find_exchange(self.user)
         if coindata.market_cap != self.config.pbgui.market_cap:
             coindata.market_cap = self.config.pbgui.market_cap
         if coindata.vol_mcap != self.config.pbgui.vol_mcap:
@@ -126,7 +227,7 @@ class V7Instance():
         if "edit_run_v7_user" in st.session_state:
             if st.session_state.edit_run_v7_user != self.user:
                 self.user = st.session_state.edit_run_v7_user
-                coindata.exchange = self._users.find_exchange(self.user)
+                coindata.exchange = self.users.find_exchange(self.user)
         if "edit_run_v7_enabled_on" in st.session_state:
             if st.session_state.edit_run_v7_enabled_on != self.config.pbgui.enabled_on:
                 self.config.pbgui.enabled_on = st.session_state.edit_run_v7_enabled_on
@@ -225,11 +326,11 @@ class V7Instance():
         # Display Editor
         col1, col2, col3, col4 = st.columns([1,1,1,1])
         with col1:
-            if self.user in self._users.list_v7():
-                index = self._users.list_v7().index(self.user)
+            if self.user in self.users.list_v7():
+                index = self.users.list_v7().index(self.user)
             else:
                 index = 0
-            st.selectbox('User',self._users.list_v7(), index = index, key="edit_run_v7_user")
+            st.selectbox('User',self.users.list_v7(), index = index, key="edit_run_v7_user")
         with col2:
             slist = sorted(self.remote.list())
             enabled_on = ["disabled",self.remote.name] + slist
@@ -562,10 +663,10 @@ class V7Instance():
                 except:
                     error_popup("Invalid JSON")
             st.session_state.import_run_v7_config = json.dumps(self.config.config, indent=4)
-            if self.config.live.user in self._users.list_v7():
+            if self.config.live.user in self.users.list_v7():
                 self._user = self.config.live.user
         # Display import
-        st.selectbox('User',self._users.list_v7(), index = self._users.list_v7().index(self.user), key="import_run_v7_user")
+        st.selectbox('User',self.users.list_v7(), index = self.users.list_v7().index(self.user), key="import_run_v7_user")
         st.text_area(f'config', json.dumps(self.config.config, indent=4), key="import_run_v7_config", height=500)
         col1, col2 = st.columns([1,1])
         with col1:
@@ -649,8 +750,8 @@ class V7Instances:
         instances = glob.glob(p)
         for instance in instances:
             inst = V7Instance()
-            inst.load(instance)
-            self.instances.append(inst)
+            if inst.load(instance):
+                self.instances.append(inst)
         self.instances = sorted(self.instances, key=lambda d: d.user) 
 
     def is_user_used(self, user: str):
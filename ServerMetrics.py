@@ -0,0 +1,112 @@
+from pathlib import Path
+import sqlite3
+
+# Bucket size in seconds and how long the buckets are kept
+RESOLUTIONS = {
+    "1m": 60,
+    "1h": 3600,
+}
+RETENTION = {
+    "1m": 2 * 24 * 3600,
+    "1h": 90 * 24 * 3600,
+}
+METRICS = ["cpu", "mem", "swap", "disk"]
+# Delete expired buckets every n added samples
+PRUNE_EVERY = 60
+
+def bucket_start(timestamp: int, resolution: int):
+    """Start of the bucket the timestamp falls into"""
+    return int(timestamp) - int(timestamp) % resolution
+
+def server_sample(cpu, mem, swap, disk):
+    """Usage in percent from the alive values (psutil cpu_percent, virtual_memory, swap_memory and disk_usage)"""
+    return {
+        "cpu": float(cpu),
+        "mem": float(mem[2]),
+        "swap": float(swap[3]),
+        "disk": float(disk[3]),
+    }
+
+class ServerMetrics():
+    """
+    History of the system usage of all servers.
+
+    Every sample is added to a 1m and a 1h bucket. A bucket keeps the sum, count and max of each metric,
+    so the average of the bucket is sum / count.
+    """
+    def __init__(self):
+        pbgdir = Path.cwd()
+        self.db = Path(f'{pbgdir}/data/server_metrics.db')
+        self.db.parent.mkdir(parents=True, exist_ok=True)
+        self.added = 0
+        self.create_tables()
+
+    def create_tables(self):
+        columns = ", ".join(f"{m}_sum REAL NOT NULL, {m}_max REAL NOT NULL" for m in METRICS)
+        sql_statement = f"""CREATE TABLE IF NOT EXISTS server_metrics (
+                server TEXT NOT NULL,
+                resolution TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                {columns},
+                PRIMARY KEY (server, resolution, bucket)
+        );"""
+        try:
+            with sqlite3.connect(self.db) as conn:
+                conn.execute(sql_statement)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(e)
+
+    def add(self, server: str, timestamp: int, sample: dict):
+        """Adds one sample to the buckets of all resolutions"""
+        columns = ", ".join(f"{m}_sum, {m}_max" for m in METRICS)
+        values = ", ".join("?, ?" for m in METRICS)
+        update = ", ".join(f"{m}_sum = {m}_sum + excluded.{m}_sum, {m}_max = MAX({m}_max, excluded.{m}_max)" for m in METRICS)
+        sql = f"""INSERT INTO server_metrics (server, resolution, bucket, count, {columns})
+                  VALUES (?, ?, ?, 1, {values})
+                  ON CONFLICT (server, resolution, bucket) DO UPDATE SET count = count + 1, {update}"""
+        try:
+            with sqlite3.connect(self.db) as conn:
+                for name, resolution in RESOLUTIONS.items():
+                    params = [server, name, bucket_start(timestamp, resolution)]
+                    for m in METRICS:
+                        params += [sample[m], sample[m]]
+                    conn.execute(sql, params)
+                self.added += 1
+                if self.added % PRUNE_EVERY == 0:
+                    self.prune(conn, timestamp)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(e)
+
+    def prune(self, conn, now: int):
+        """Deletes buckets older than the retention of their resolution"""
+        for name, retention in RETENTION.items():
+            conn.execute("DELETE FROM server_metrics WHERE resolution = ? AND bucket < ?", (name, int(now) - retention))
+
+    def fetch(self, server: str, resolution: str = "1m", since: int = 0):
+        """Returns a list of dicts with bucket timestamp and avg/max of every metric"""
+        columns = ", ".join(f"{m}_sum / count, {m}_max" for m in METRICS)
+        sql = f"""SELECT bucket, {columns} FROM server_metrics
+                  WHERE server = ? AND resolution = ? AND bucket >= ? ORDER BY bucket"""
+        try:
+            with sqlite3.connect(self.db) as conn:
+                rows = conn.execute(sql, (server, resolution, since)).fetchall()
+        except sqlite3.Error as e:
+            print(e)
+            return []
+        result = []
+        for row in rows:
+            sample = {"timestamp": row[0]}
+            for index, m in enumerate(METRICS):
+                sample[m] = row[1 + index * 2]
+                sample[f"{m}_max"] = row[2 + index * 2]
+            result.append(sample)
+        return result
+
+def main():
+    print("Don't Run this Class from CLI")
+
+if __name__ == '__main__':
+    main()
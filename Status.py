@@ -9,6 +9,8 @@ This status list is then sent through PBRemote to the remote storage, enabling u
 """
 from pathlib import Path
 import json
+import uuid
+from pbgui_purefunc import write_json_atomic
 
 class InstanceStatus():
     """Stores information about one passivbot configuration."""
@@ -23,7 +25,8 @@ class InstancesStatus():
     """Stores every InstanceStatus into status.json, manages and loads them."""
     def __init__(self, status_file: str): 
         """status_file (str): Path to the status file."""
-        self.instances = []
+        # InstanceStatus by name, in the order they were added
+        self._instances = {}
         self.index = 0
         self.pbname = None
         self.activate_ts = 0
@@ -31,8 +34,22 @@ class InstancesStatus():
 #        self.status_file = f'{pbgdir}/data/cmd/status.json'
         self.status_file = status_file
         self.status_ts = 0
+        # Sequence number of the loaded status and the server that wrote it
+        self.status_seq = 0
+        self.origin = None
+        # Random id of the sequence, a new one starts when the status file is created again
+        self.epoch = None
+        self._stat = None
         self.load()
 
+    @property
+    def instances(self):
+        return list(self._instances.values())
+
+    @instances.setter
+    def instances(self, new_instances: list):
+        self._instances = {instance.name: instance for instance in new_instances}
+
     def __iter__(self):
         return iter(self.instances)
 
@@ -44,7 +61,7 @@ class InstancesStatus():
 
     def list(self): # Never referenced ?
         """Returns a list of names of all the passivbot instances in the status list."""
-        return list(map(lambda c: c.name, self.instances))
+        return list(self._instances)
 
     def add(self, istatus: InstanceStatus):
         """
@@ -53,11 +70,7 @@ class InstancesStatus():
         Args:
             istatus (InstanceStatus): The instance status to add or to update.
         """
-        for index, instance in enumerate(self.instances):
-            if instance.name == istatus.name:
-                self.instances[index] = istatus
-                return
-        self.instances.append(istatus)
+        self._instances[istatus.name] = istatus
 
     def remove(self, istatus: InstanceStatus):
         """
@@ -66,17 +79,14 @@ class InstancesStatus():
         Args:
             istatus (InstanceStatus): The instance status to remove.
         """
-        for index, instance in enumerate(self.instances):
-            if instance.name == istatus.name:
-                self.instances.pop(index)
-                return
+        self._instances.pop(istatus.name, None)
 
     def is_running(self, name: str):
         # if self.has_new_status():
         #     self.load()
-        for instance in self.instances:
-            if instance.name == name:
-                return instance.running
+        instance = self._instances.get(name)
+        if instance:
+            return instance.running
 
     def find_name(self, name: str):
         """
@@ -85,10 +95,7 @@ class InstancesStatus():
         Returns:
             InstanceStatus: The instance with the specified name, or None if not found.
         """
-        for instance in self.instances:
-            if instance.name == name:
-                return instance
-        return None
+        return self._instances.get(name)
 
     def find_version(self, name: str):
         """
@@ -100,17 +107,39 @@ class InstancesStatus():
         Returns:
             str: The version of the instance, or 0 if not found.
         """
-        for instance in self.instances:
-            if instance.name == name:
-                return instance.version
+        instance = self._instances.get(name)
+        if instance:
+            return instance.version
         return 0
 
     def has_new_status(self):
-        if Path(self.status_file).exists():
-            status_ts = Path(self.status_file).stat().st_mtime
-            if self.status_ts < status_ts:
-                self.load()
+        """
+        True if the status file is newer than the loaded status and applies it.
+        The file is only parsed when its mtime or size changed. Status files without seq (older pbgui) use the mtime.
+        Another epoch is a new sequence (the file was created again) and always newer. Within an epoch a
+        higher seq is newer, the same seq from another origin is the winner of two concurrent saves.
+        A lower seq is an older state (a late sync or a restored file) and is ignored.
+        """
+        file = Path(self.status_file)
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            return False
+        if self._stat == (stat.st_mtime_ns, stat.st_size):
+            return False
+        status = self.read()
+        if status is None:
+            return False
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        seq = status.get("seq", 0)
+        if seq == 0:
+            if self.status_ts < stat.st_mtime:
+                self.apply(status, stat.st_mtime)
                 return True
+            return False
+        if status.get("epoch") != self.epoch or seq > self.status_seq or (seq == self.status_seq and status.get("origin") != self.origin):
+            self.apply(status, stat.st_mtime)
+            return True
         return False
 
     def update_status(self):
@@ -118,43 +147,73 @@ class InstancesStatus():
         if Path(self.status_file).exists():
             self.status_ts = Path(self.status_file).stat().st_mtime
 
+    def read(self):
+        """Returns the content of the status file or None if it does not exist"""
+        file = Path(self.status_file)
+        if file.exists():
+            with open(file, "r", encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def apply(self, instances: dict, status_ts: float):
+        """Applies the content of a status file"""
+        self.status_ts = status_ts
+        if "activate_ts" in instances:
+            self.status_seq = instances.get("seq", 0)
+            self.origin = instances.get("origin")
+            self.epoch = instances.get("epoch")
+            self.activate_ts = instances["activate_ts"]
+            self.activate_pbname = instances["activate_pbname"]
+            for instance in instances["instances"]:
+                status = InstanceStatus()
+                status.name = instance
+                status.version = instances["instances"][instance]["version"]
+                status.multi = instances["instances"][instance]["multi"]
+                status.enabled_on = instances["instances"][instance]["enabled_on"]
+                status.running = instances["instances"][instance]["running"]
+                self.add(status)
+
     def load(self):
         """Loads the status information from the status list."""
         file = Path(self.status_file)
         if file.exists():
-            self.status_ts = file.stat().st_mtime
-            with open(file, "r", encoding='utf-8') as f:
-                instances = json.load(f)
-                if "activate_ts" in instances:
-                    self.activate_ts = instances["activate_ts"]
-                    self.activate_pbname = instances["activate_pbname"]
-                    for instance in instances["instances"]:
-                        status = InstanceStatus()
-                        status.name = instance
-                        status.version = instances["instances"][instance]["version"]
-                        status.multi = instances["instances"][instance]["multi"]
-                        status.enabled_on = instances["instances"][instance]["enabled_on"]
-                        status.running = instances["instances"][instance]["running"]
-                        self.add(status)
+            stat = file.stat()
+            self._stat = (stat.st_mtime_ns, stat.st_size)
+            self.apply(self.read(), stat.st_mtime)
 
     def save(self):
         """Saves the current status information to the status file."""
         instances = {}
-        for instance in self.instances:
+        for instance in self._instances.values():
             instances[instance.name] = ({
                 "enabled_on" : instance.enabled_on,
                 "version": instance.version,
                 "multi": instance.multi,
                 "running": instance.running
             })
+        # Continue from the file, another process may have saved the status in the meantime
+        try:
+            current = self.read() or {}
+        except ValueError:
+            current = {}
+        if current.get("epoch"):
+            if current["epoch"] != self.epoch:
+                self.status_seq = 0
+            self.epoch = current["epoch"]
+        elif not self.epoch:
+            self.epoch = uuid.uuid4().hex
+        self.status_seq = max(self.status_seq, current.get("seq", 0)) + 1
+        self.origin = self.pbname
         status = {
+            "seq": self.status_seq,
+            "epoch": self.epoch,
+            "origin": self.origin,
             "activate_ts": self.activate_ts,
             "activate_pbname": self.pbname,
             "instances": instances
         }
         file = Path(self.status_file)
-        with open(file, "w", encoding='utf-8') as f:
-            json.dump(status, f, indent=4)
+        write_json_atomic(file, status, indent=4)
 
 
 def main():
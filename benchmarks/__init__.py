@@ -0,0 +1,15 @@
+"""
+Benchmarks of the hot paths of pbgui, with synthetic data so they run offline.
+
+    python -m benchmarks                 run all benchmarks
+    python -m benchmarks -k database     run only benchmarks with "database" in the name
+    python -m benchmarks --save          run and save the results as new baseline
+    python -m benchmarks --compare       run and compare with the baseline, exit 1 on a regression
+
+Run it from the pbgui directory. The benchmarks run in a temporary directory, pbgui.ini and data/
+of the installation are not used or changed.
+
+The baseline (benchmarks/baseline.json) holds the fastest time per call of every benchmark. A
+benchmark is a regression if it is more than --threshold (default 0.25 = 25%) slower. Times depend
+on the machine, save a baseline on the machine you compare on.
+"""
@@ -0,0 +1,46 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the pbgui hot paths")
+    parser.add_argument("-k", dest="filter", default="", help="only run benchmarks with this text in the name")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument("--save", action="store_true", help="save the results as baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline, exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts as regression (0.25 = 25%%)")
+    parser.add_argument("--baseline", type=Path, default=None, help="baseline file (default benchmarks/baseline.json)")
+    args = parser.parse_args()
+
+    # pbgui modules are imported from the pbgui directory but run in an empty work directory
+    pbgdir = Path(__file__).resolve().parent.parent
+    sys.path.insert(0, str(pbgdir))
+    logging.disable(logging.WARNING)
+    from benchmarks import runner, cases
+    baseline_file = args.baseline or runner.BASELINE
+    names = [name for name in runner.BENCHMARKS if args.filter in name]
+    with tempfile.TemporaryDirectory(prefix="pbgui_bench_") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results, skipped = runner.run(Path(workdir), names, args.repeat)
+        finally:
+            os.chdir(cwd)
+    if args.save:
+        runner.save_baseline(results, baseline_file)
+        print(f'Saved baseline {baseline_file}')
+    if args.compare:
+        baseline = runner.load_baseline(baseline_file)
+        if baseline is None:
+            print(f'No baseline {baseline_file}, save one with --save')
+            sys.exit(1)
+        regressions = runner.compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'Regressions: {", ".join(regressions)}')
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+"""
+The benchmarks. Every setup builds its synthetic data in the work directory and imports the pbgui
+modules only then, most of them use the current directory as pbgui directory.
+"""
+import gzip
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from benchmarks.runner import benchmark
+from benchmarks import synthetic
+
+def write_json(file: Path, data):
+    file.parent.mkdir(parents=True, exist_ok=True)
+    with open(file, "w", encoding='utf-8') as f:
+        json.dump(data, f)
+
+# CoinData
+
+def coindata(workdir: Path):
+    cmc = synthetic.cmc_data(5000)
+    write_json(Path(f'{workdir}/data/coindata/coindata.json'), cmc)
+    write_json(Path(f'{workdir}/data/coindata/metadata.json'), synthetic.cmc_metadata(cmc))
+    swap = synthetic.swap_symbols(cmc, 500)
+    write_json(Path(f'{workdir}/data/symbols/binance.json'), {"swap": swap, "spot": [], "cpt": swap[::3]})
+    from PBCoinData import CoinData
+    coin_data = CoinData()
+    coin_data.exchange = "binance"
+    coin_data.list_symbols()
+    return coin_data
+
+@benchmark("coindata.list_symbols")
+def coindata_list_symbols(workdir: Path):
+    return coindata(workdir).list_symbols
+
+@benchmark("coindata.list_symbols_filtered")
+def coindata_list_symbols_filtered(workdir: Path):
+    coin_data = coindata(workdir)
+    coin_data.market_cap = 100
+    coin_data.vol_mcap = 0.5
+    coin_data.only_cpt = True
+    coin_data.notices_ignore = True
+    return coin_data.list_symbols
+
+# Database
+
+def database(workdir: Path):
+    from Database import Database
+    Path(f'{workdir}/data').mkdir(parents=True, exist_ok=True)
+    db = Database()
+    with sqlite3.connect(db.db) as conn:
+        if not conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]:
+            conn.executemany('INSERT INTO history (symbol, timestamp, income, uniqueid, user) VALUES (?, ?, ?, ?, ?)', synthetic.history_rows())
+            conn.commit()
+    return db
+
+# 2024 in ms, the synthetic history covers 2024
+START = "1704067200000"
+END = "1735689599000"
+
+@benchmark("database.select_pnl")
+def database_select_pnl(workdir: Path):
+    db = database(workdir)
+    return lambda: db.select_pnl(["ALL"], START, END)
+
+@benchmark("database.select_top")
+def database_select_top(workdir: Path):
+    db = database(workdir)
+    return lambda: db.select_top(["user1", "user2", "user3"], START, END, 10)
+
+@benchmark("database.select_ppl_week")
+def database_select_ppl(workdir: Path):
+    db = database(workdir)
+    return lambda: db.select_ppl(["ALL"], START, END, "WEEK")
+
+@benchmark("database.select_income_by_symbol")
+def database_select_income_by_symbol(workdir: Path):
+    db = database(workdir)
+    return lambda: db.select_income_by_symbol(["user1"], START, END)
+
+# Monitor
+
+@benchmark("monitor.watch_log")
+def monitor_watch_log(workdir: Path):
+    from PBRun import Monitor
+    path = Path(f'{workdir}/run_v7/bench')
+    path.mkdir(parents=True, exist_ok=True)
+    with open(Path(f'{path}/passivbot.log'), "w", encoding='utf-8') as f:
+        f.write(synthetic.passivbot_log(50000))
+    def watch_log():
+        # A new Monitor reads the whole log, like after a PBRun start
+        monitor = Monitor()
+        monitor.path = str(path)
+        monitor.watch_log()
+    return watch_log
+
+# PBRemote
+
+PBREMOTE_INI = """[main]
+pbname = bench
+role = master
+pb7dir = {pb7dir}
+pb7venv = {python}
+
+[pbremote]
+transport = local
+local_path = {bucket}
+local_latency = {latency}
+bucket = local:
+"""
+
+@contextmanager
+def pbgui_directory(path: Path):
+    """Runs the with block in the pbgui directory path with the output of PBRemote discarded"""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        with redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+
+def pbremote(workdir: Path, name: str, servers: int, latency: float = 0.0):
+    """
+    PBRemote in its own pbgui directory {workdir}/{name} with a LocalTransport bucket of servers remote
+    servers, each with a v7 configuration in the bucket
+    """
+    pbgdir = Path(f'{workdir}/{name}')
+    bucket = Path(f'{workdir}/{name}_bucket')
+    Path(f'{workdir}/pb7').mkdir(parents=True, exist_ok=True)
+    pbgdir.mkdir(parents=True, exist_ok=True)
+    with open(Path(f'{pbgdir}/pbgui.ini'), "w", encoding='utf-8') as f:
+        f.write(PBREMOTE_INI.format(pb7dir=f'{workdir}/pb7', python=sys.executable, bucket=bucket, latency=latency))
+    for n in range(servers):
+        Path(f'{pbgdir}/data/remote/cmd_server{n}').mkdir(parents=True, exist_ok=True)
+        write_json(Path(f'{bucket}/local/run_v7_server{n}/bot{n}/config.json'), {"live": {"user": f'bot{n}'}})
+    from PBRemote import PBRemote
+    with pbgui_directory(pbgdir):
+        remote = PBRemote()
+        remote.update_remote_servers()
+    return pbgdir, remote
+
+@benchmark("pbremote.sync_servers_down_20")
+def pbremote_sync_servers_down(workdir: Path):
+    # Every sync call of the bucket takes 20 ms like a fast rclone call, the syncs run on the worker pool
+    pbgdir, remote = pbremote(workdir, "sync_servers_down", 20, latency=0.02)
+    def sync_servers_down():
+        with pbgui_directory(pbgdir):
+            for server in remote.remote_servers:
+                # A failed sync is retried, so every server syncs its v7 configurations down
+                server._sync_failed.add('run_v7')
+                server._manifest_applied.clear()
+            remote.sync_servers_down()
+    return sync_servers_down
+
+@benchmark("pbremote.update_remote_servers_100")
+def pbremote_update_remote_servers(workdir: Path):
+    # An idle pass over 100 servers with 9 alive files each, none of them changed since the last pass
+    pbgdir, remote = pbremote(workdir, "update_remote_servers", 0)
+    for n in range(100):
+        path = Path(f'{pbgdir}/data/remote/cmd_server{n}')
+        path.mkdir(parents=True, exist_ok=True)
+        for ts in range(1800000000, 1800000540, 60):
+            with gzip.open(Path(f'{path}/alive_{ts}.cmd.gz'), "wt", encoding='utf-8') as f:
+                json.dump({"v": 2, "type": "full", "name": f'server{n}', "timestamp": ts, "api_md5": "0" * 32, "monitor": []}, f)
+        # Older than MTIME_GRANULARITY, so the directory is not loaded again
+        os.utime(path, (1700000000, 1700000000))
+    with pbgui_directory(pbgdir):
+        remote.update_remote_servers()
+    def update_remote_servers():
+        with pbgui_directory(pbgdir):
+            remote.update_remote_servers()
+    return update_remote_servers
+
+# pbgui.ini
+
+def ini_symbols(workdir: Path, name: str, value: str):
+    """pbgui directory {workdir}/{name} with 3,000 symbols in [exchanges] binance.swap"""
+    pbgdir = Path(f'{workdir}/{name}')
+    pbgdir.mkdir(parents=True, exist_ok=True)
+    with open(Path(f'{pbgdir}/pbgui.ini'), "w", encoding='utf-8') as f:
+        f.write(f'[main]\npbdir = /pb\n\n[exchanges]\nbinance.swap = {value}\n')
+    return pbgdir
+
+SYMBOLS_3000 = [f'COIN{n}USDT' for n in range(3000)]
+
+@benchmark("ini.load_ini_list_3000")
+def ini_load_ini_list(workdir: Path):
+    # First load after pbgui.ini changed, pbgui.ini is read and the JSON list parsed
+    import pbgui_purefunc
+    pbgdir = ini_symbols(workdir, "ini_load_ini_list", json.dumps(SYMBOLS_3000))
+    def load_ini_list():
+        with pbgui_directory(pbgdir):
+            pbgui_purefunc.ini_cache["stat"] = None
+            pbgui_purefunc.ini_list_cache.clear()
+            pbgui_purefunc.load_ini_list("exchanges", "binance.swap")
+    return load_ini_list
+
+@benchmark("ini.load_ini_list_3000_cached")
+def ini_load_ini_list_cached(workdir: Path):
+    # pbgui.ini unchanged, like every rerun of a streamlit page
+    import pbgui_purefunc
+    pbgdir = ini_symbols(workdir, "ini_load_ini_list_cached", json.dumps(SYMBOLS_3000))
+    def load_ini_list():
+        with pbgui_directory(pbgdir):
+            pbgui_purefunc.load_ini_list("exchanges", "binance.swap")
+    return load_ini_list
+
+@benchmark("ini.parse_ini_list_3000_legacy")
+def ini_parse_ini_list_legacy(workdir: Path):
+    # A list saved with str() by older pbgui versions, parsed once before it is saved back as JSON
+    from pbgui_purefunc import parse_ini_list
+    value = str(SYMBOLS_3000)
+    return lambda: parse_ini_list(value)
+
+# Run v7
+
+def v7_instances(workdir: Path, name: str, count: int):
+    """pbgui directory {workdir}/{name} with count v7 instances and a PBRemote in the session state"""
+    import streamlit as st
+    import RunV7
+    pbgdir, remote = pbremote(workdir, name, 0)
+    for n in range(count):
+        write_json(Path(f'{pbgdir}/data/run_v7/bot{n}/config.json'), {
+            "pbgui": {"version": n % 10, "enabled_on": f'server{n % 20}', "note": f'bot {n}'},
+            "live": {"user": f'bot{n}', "coin_flags": {}, "approved_coins": {"long": [f'COIN{c}' for c in range(100)], "short": []}},
+            "bot": {side: {"total_wallet_exposure_limit": 1.0, "n_positions": 10} for side in ("long", "short")},
+        })
+    # Older than MTIME_GRANULARITY, so the index cache trusts the mtime
+    for file in Path(f'{pbgdir}/data/run_v7').glob("*/config.json"):
+        os.utime(file, (1700000000, 1700000000))
+    st.session_state.remote = remote
+    RunV7.PBGDIR = pbgdir
+    return pbgdir
+
+@benchmark("run_v7.list_300")
+def run_v7_list(workdir: Path):
+    # The v7 Run page after a restart of streamlit, every config.json is indexed
+    import RunV7
+    pbgdir = v7_instances(workdir, "run_v7_list", 300)
+    def list_instances():
+        with pbgui_directory(pbgdir):
+            RunV7.v7_index_cache.clear()
+            for instance in RunV7.V7Instances():
+                instance.version, instance.enabled_on, instance.note, instance.twe
+    return list_instances
+
+@benchmark("run_v7.list_300_cached")
+def run_v7_list_cached(workdir: Path):
+    # Every rerun of the v7 Run page, no config.json changed
+    import RunV7
+    pbgdir = v7_instances(workdir, "run_v7_list_cached", 300)
+    def list_instances():
+        with pbgui_directory(pbgdir):
+            for instance in RunV7.V7Instances():
+                instance.version, instance.enabled_on, instance.note, instance.twe
+    return list_instances
+
+# Status
+
+def instance_statuses(count: int):
+    from Status import InstanceStatus
+    statuses = []
+    for n in range(count):
+        status = InstanceStatus()
+        status.name = f'bot{n}'
+        status.version = n % 7
+        status.multi = n % 2 == 0
+        status.enabled_on = f'server{n % 20}'
+        status.running = n % 3 == 0
+        statuses.append(status)
+    return statuses
+
+@benchmark("status.add_2000")
+def status_add(workdir: Path):
+    from Status import InstancesStatus
+    statuses = instance_statuses(2000)
+    def add():
+        instances_status = InstancesStatus(f'{workdir}/data/cmd/status_bench.json')
+        for status in statuses:
+            instances_status.add(status)
+    return add
+
+@benchmark("status.lookup_2000")
+def status_lookup(workdir: Path):
+    from Status import InstancesStatus
+    instances_status = InstancesStatus(f'{workdir}/data/cmd/status_bench.json')
+    for status in instance_statuses(2000):
+        instances_status.add(status)
+    names = [f'bot{n}' for n in range(2000)]
+    def lookup():
+        # PBRun looks up every instance by name, version and running state
+        for name in names:
+            instances_status.find_name(name)
+            instances_status.find_version(name)
+            instances_status.is_running(name)
+    return lookup
+
+@benchmark("status.load_2000")
+def status_load(workdir: Path):
+    from Status import InstancesStatus
+    file = Path(f'{workdir}/data/cmd/status_bench.json')
+    file.parent.mkdir(parents=True, exist_ok=True)
+    instances_status = InstancesStatus(str(file))
+    instances_status.pbname = "bench"
+    for status in instance_statuses(2000):
+        instances_status.add(status)
+    instances_status.save()
+    # A new InstancesStatus loads the status file, like PBRun and PBRemote at start
+    return lambda: InstancesStatus(str(file))
+
+# Instance
+
+@benchmark("instance.trades_to_df")
+def instance_trades_to_df(workdir: Path):
+    from Instance import Instance
+    from Exchange import Exchange
+    path = Path(f'{workdir}/instances/bench')
+    write_json(Path(f'{path}/trades.json'), synthetic.bybit_trades(2000))
+    instance = Instance()
+    instance._instance_path = str(path)
+    instance._exchange = Exchange("bybit")
+    # A start balance, so trades_to_df does not fetch the balance from the exchange
+    instance._sb_change = True
+    instance._sb = 1000.0
+    return instance.trades_to_df
+
+# GridVisualizerV7
+
+def grid(name: str):
+    from GridVisualizerV7 import ExchangeParams, StateParams, BotParams, OrderBook, EmaBands, TrailingPriceBundle
+    exchange_params = ExchangeParams(min_qty=0.001, min_cost=5.0, qty_step=0.001, price_step=0.01, c_mult=1.0)
+    state_params = StateParams(balance=10000.0, order_book=OrderBook(bid=100.0, ask=100.01), ema_bands=EmaBands(lower=99.5, upper=100.5))
+    bot_params = BotParams(**synthetic.grid_configs()[name])
+    trailing = TrailingPriceBundle(max_since_open=101.0, min_since_open=99.0, max_since_min=100.5, min_since_max=99.5)
+    return exchange_params, state_params, bot_params, trailing
+
+@benchmark("grid_v7.calc_entries_long")
+def grid_calc_entries_long(workdir: Path):
+    from GridVisualizerV7 import calc_entries_long, Position
+    exchange_params, state_params, bot_params, trailing = grid("grid")
+    return lambda: calc_entries_long(exchange_params, state_params, bot_params, Position(0.0, 0.0), trailing)
+
+@benchmark("grid_v7.calc_entries_short_trailing")
+def grid_calc_entries_short(workdir: Path):
+    from GridVisualizerV7 import calc_entries_short, Position
+    exchange_params, state_params, bot_params, trailing = grid("trailing")
+    return lambda: calc_entries_short(exchange_params, state_params, bot_params, Position(0.0, 0.0), trailing)
+
+@benchmark("grid_v7.calc_closes_long")
+def grid_calc_closes_long(workdir: Path):
+    from GridVisualizerV7 import calc_closes_long, Position
+    exchange_params, state_params, bot_params, trailing = grid("grid")
+    return lambda: calc_closes_long(exchange_params, state_params, bot_params, Position(50.0, 100.0), trailing)
+
+@benchmark("grid_v7.calc_closes_short_trailing")
+def grid_calc_closes_short(workdir: Path):
+    from GridVisualizerV7 import calc_closes_short, Position
+    exchange_params, state_params, bot_params, trailing = grid("trailing")
+    return lambda: calc_closes_short(exchange_params, state_params, bot_params, Position(-50.0, 100.0), trailing)
+
+@benchmark("grid_v7.interpolate")
+def grid_interpolate(workdir: Path):
+    from GridVisualizerV7 import interpolate
+    rng = random.Random(synthetic.SEED)
+    # The grid functions interpolate between two points that change on every call
+    points = [(rng.uniform(0.0, 1.0), [0.0, rng.uniform(0.5, 2.0)], [rng.uniform(0.001, 0.1), rng.uniform(0.01, 0.5)]) for _ in range(1000)]
+    def run():
+        for x, xs, ys in points:
+            interpolate(x, xs, ys)
+    return run
+
+# One render of the v7 grid visualizer: show_visualizer calculates the normal and the grid only
+# grid, entries and closes of both sides, so 8 calc calls. Renders per second = 1 / time.
+
+def grid_render(module):
+    rng = random.Random(synthetic.SEED)
+    cases = [synthetic.random_grid_case(rng) for _ in range(50)]
+    from GridVisualizerV7 import Position
+    state = {"n": 0}
+    def render():
+        for _ in range(2):
+            exchange_params, state_params, bot_params, price, close_size, trailing = cases[state["n"] % len(cases)]
+            state["n"] += 1
+            module.calc_entries_long(exchange_params, state_params, bot_params, Position(0.0, price), trailing)
+            module.calc_closes_long(exchange_params, state_params, bot_params, Position(close_size, price), trailing)
+            module.calc_entries_short(exchange_params, state_params, bot_params, Position(0.0, price), trailing)
+            module.calc_closes_short(exchange_params, state_params, bot_params, Position(-close_size, price), trailing)
+    # the first call compiles the numba kernels
+    render()
+    return render
+
+@benchmark("grid_v7.render")
+def grid_v7_render(workdir: Path):
+    import GridVisualizerV7
+    return grid_render(GridVisualizerV7)
+
+@benchmark("grid_v7.render_fast")
+def grid_v7_render_fast(workdir: Path):
+    import GridVisualizerV7Fast
+    return grid_render(GridVisualizerV7Fast)
@@ -0,0 +1,93 @@
+"""Registry, timing and baseline comparison of the benchmarks"""
+import json
+import platform
+import statistics
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+BASELINE = Path(__file__).parent / "baseline.json"
+# Minimum time of one timing round, the number of calls per round is chosen to reach it
+MIN_ROUND_TIME = 0.2
+REPEAT = 5
+THRESHOLD = 0.25
+
+# Setup functions by benchmark name, a setup returns the function to time
+BENCHMARKS = {}
+
+def benchmark(name: str):
+    """Registers a setup function. It gets the work directory and returns the function to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def measure(func, repeat: int = REPEAT):
+    """Returns the fastest and median seconds per call and the calls per round"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= MIN_ROUND_TIME or number >= 1000000:
+            break
+        number *= 10
+    rounds = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"min": min(rounds), "median": statistics.median(rounds), "number": number}
+
+def run(workdir: Path, names: list, repeat: int = REPEAT):
+    """Runs the benchmarks, benchmarks that can not run here are returned as skipped with the reason"""
+    results = {}
+    skipped = {}
+    for name in names:
+        try:
+            func = BENCHMARKS[name](workdir)
+        except ImportError as e:
+            skipped[name] = f'{type(e).__name__}: {e}'
+            continue
+        results[name] = measure(func, repeat)
+        print(f'{name:40s} {format_time(results[name]["min"]):>10s}  median {format_time(results[name]["median"]):>10s}  ({results[name]["number"]} calls/round)')
+    for name, reason in skipped.items():
+        print(f'{name:40s} skipped, {reason}')
+    return results, skipped
+
+def format_time(seconds: float):
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if seconds * factor >= 1:
+            return f'{seconds * factor:.2f} {unit}'
+    return f'{seconds * 1e9:.0f} ns'
+
+def load_baseline(file: Path = BASELINE):
+    if not file.exists():
+        return None
+    with open(file, "r", encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baseline(results: dict, file: Path = BASELINE):
+    """Saves the results, benchmarks not run this time keep their baseline"""
+    old = load_baseline(file) or {}
+    baseline = {
+        "created": datetime.now().isoformat(sep=" ", timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f'{platform.system()} {platform.machine()}',
+        "results": dict(old.get("results", {})),
+    }
+    for name, result in results.items():
+        baseline["results"][name] = {key: round(value, 9) if isinstance(value, float) else value for key, value in result.items()}
+    baseline["results"] = dict(sorted(baseline["results"].items()))
+    with open(file, "w", encoding='utf-8') as f:
+        json.dump(baseline, f, indent=4)
+        f.write("\n")
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD):
+    """Returns the names of the benchmarks that are more than threshold slower than the baseline"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f'{name:40s} no baseline')
+            continue
+        change = result["min"] / base["min"] - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f'{name:40s} {format_time(base["min"]):>10s} -> {format_time(result["min"]):>10s}  {change:+7.1%}  {status}')
+        if change > threshold:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,198 @@
+"""Generators for synthetic benchmark data. A fixed seed makes every run use the same data."""
+import random
+import string
+from datetime import datetime, timedelta
+
+SEED = 42
+
+def coin_names(count: int, seed: int = SEED):
+    """Unique coin symbols like BTC, ABCD"""
+    rng = random.Random(seed)
+    names = ["BTC", "ETH", "SOL", "XRP", "DOGE"]
+    seen = set(names)
+    while len(names) < count:
+        name = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 6)))
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names[:count]
+
+def cmc_data(coins: int = 5000, seed: int = SEED):
+    """CoinMarketCap listings/latest response like data/coindata/coindata.json"""
+    rng = random.Random(seed)
+    tags = ["defi", "meme", "layer-1", "layer-2", "gaming", "ai", "pow", "pos"]
+    data = []
+    for id, symbol in enumerate(coin_names(coins, seed), start=1):
+        market_cap = rng.choice([0, rng.uniform(1e5, 1e11)])
+        data.append({
+            "id": id,
+            "name": f'{symbol} coin',
+            "symbol": symbol,
+            "slug": symbol.lower(),
+            "tags": rng.sample(tags, rng.randint(0, 3)),
+            "self_reported_market_cap": rng.uniform(1e5, 1e9) if not market_cap else None,
+            "quote": {"USD": {
+                "price": rng.uniform(0.0001, 60000),
+                "volume_24h": rng.uniform(1e4, 1e10),
+                "market_cap": market_cap,
+            }},
+        })
+    return {"data": data}
+
+def cmc_metadata(cmc: dict, notice_pct: float = 0.05, seed: int = SEED):
+    """CoinMarketCap info response like data/coindata/metadata.json"""
+    rng = random.Random(seed)
+    metadata = {}
+    for coin in cmc["data"]:
+        notice = "Trading of this coin is suspended" if rng.random() < notice_pct else ""
+        metadata[str(coin["id"])] = {"id": coin["id"], "notice": notice}
+    return {"data": metadata}
+
+def swap_symbols(cmc: dict, count: int = 500, unknown_pct: float = 0.1, seed: int = SEED):
+    """USDT swap symbols of an exchange, most of them listed on CoinMarketCap"""
+    rng = random.Random(seed)
+    listed = [coin["symbol"] for coin in cmc["data"]]
+    unknown = iter(coin_names(len(listed) + count, seed + 1)[len(listed):])
+    symbols = []
+    for symbol in rng.sample(listed, min(count, len(listed))):
+        if rng.random() < unknown_pct:
+            symbol = next(unknown)
+        symbols.append(f'{symbol}USDT')
+    return sorted(set(symbols))
+
+def history_rows(users: int = 10, days: int = 365, per_day: int = 50, seed: int = SEED):
+    """Rows (symbol, timestamp ms, income, uniqueid, user) for the history table of data/pbgui.db"""
+    rng = random.Random(seed)
+    symbols = [f'{coin}USDT' for coin in coin_names(40, seed)]
+    start = datetime(2024, 1, 1)
+    rows = []
+    for user in range(users):
+        for day in range(days):
+            day_ts = start + timedelta(days=day)
+            for n in range(per_day):
+                ts = int((day_ts + timedelta(seconds=rng.randint(0, 86399))).timestamp() * 1000)
+                rows.append((rng.choice(symbols), ts, rng.gauss(0.05, 1.0), f'{user}_{day}_{n}', f'user{user}'))
+    return rows
+
+def passivbot_log(lines: int = 50000, day: datetime = None, seed: int = SEED):
+    """passivbot v7 log lines of one day with INFO, pnl, ERROR and traceback lines"""
+    rng = random.Random(seed)
+    day = day or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    log = []
+    seconds_per_line = max(1, 86400 // lines)
+    for n in range(lines):
+        ts = (day + timedelta(seconds=min(86399, n * seconds_per_line))).isoformat(timespec="seconds")
+        kind = rng.random()
+        if kind < 0.05:
+            log.append(f'{ts} INFO {rng.randint(1, 5)} new pnl: {rng.gauss(0.1, 1):.4f} USDT')
+        elif kind < 0.07:
+            log.append(f'{ts} ERROR error fetching positions: RequestTimeout')
+        elif kind < 0.075:
+            log.append('Traceback (most recent call last):')
+            log.append('  File "passivbot.py", line 1234, in execution_loop')
+            log.append('ccxt.base.errors.RequestTimeout: bybit GET timeout')
+        else:
+            log.append(f'{ts} INFO balance: {rng.uniform(900, 1100):.2f} equity: {rng.uniform(900, 1100):.2f}')
+    return "\n".join(log) + "\n"
+
+def bybit_trades(count: int = 2000, seed: int = SEED):
+    """ccxt fetch_my_trades results of bybit like trades.json of a v6 single instance"""
+    rng = random.Random(seed)
+    ts = int(datetime(2024, 1, 1).timestamp() * 1000)
+    trades = []
+    psize = 0.0
+    for n in range(count):
+        ts += rng.randint(60000, 3600000)
+        side = "buy" if psize <= 0.01 or rng.random() < 0.55 else "sell"
+        amount = round(rng.uniform(0.001, 0.05), 3)
+        if side == "sell":
+            amount = min(amount, round(psize, 3))
+            psize -= amount
+        else:
+            psize += amount
+        price = round(rng.uniform(40000, 70000), 2)
+        trades.append({
+            "id": str(n),
+            "timestamp": ts,
+            "symbol": "BTC/USDT:USDT",
+            "type": "limit",
+            "side": side,
+            "price": price,
+            "amount": amount,
+            "fee": {"cost": amount * price * 0.0002, "currency": "USDT"},
+            "info": {"execFee": str(amount * price * 0.0002)},
+        })
+    return trades
+
+def grid_configs(seed: int = SEED):
+    """Bot parameters of a passivbot v7 config as used by GridVisualizerV7, grid only and with trailing"""
+    grid = {
+        "wallet_exposure_limit": 1.0,
+        "n_positions": 1.0,
+        "entry_initial_qty_pct": 0.01,
+        "entry_initial_ema_dist": -0.002,
+        "entry_grid_spacing_pct": 0.01,
+        "entry_grid_spacing_weight": 1.0,
+        "entry_grid_double_down_factor": 1.0,
+        "entry_trailing_threshold_pct": 0.0,
+        "entry_trailing_retracement_pct": 0.0,
+        "entry_trailing_grid_ratio": 0.0,
+        "close_grid_min_markup": 0.002,
+        "close_grid_markup_range": 0.01,
+        "close_grid_qty_pct": 0.05,
+        "close_trailing_threshold_pct": 0.0,
+        "close_trailing_retracement_pct": 0.0,
+        "close_trailing_qty_pct": 0.0,
+        "close_trailing_grid_ratio": 0.0,
+    }
+    trailing = dict(grid, **{
+        "entry_trailing_threshold_pct": 0.01,
+        "entry_trailing_retracement_pct": 0.005,
+        "entry_trailing_grid_ratio": 0.5,
+        "close_trailing_threshold_pct": 0.01,
+        "close_trailing_retracement_pct": 0.005,
+        "close_trailing_qty_pct": 0.2,
+        "close_trailing_grid_ratio": 0.5,
+    })
+    return {"grid": grid, "trailing": trailing}
+
+def random_grid_case(rng: random.Random):
+    """
+    A random GridVisualizerV7 case: (exchange_params, state_params, bot_params, price, close_size, trailing_price_bundle).
+    close_size is a long position size that can be closed, use -close_size for short.
+    """
+    import GridVisualizerV7 as gv
+    price = rng.uniform(0.5, 200.0)
+    exchange_params = gv.ExchangeParams(min_qty=0.001, min_cost=1.0, qty_step=0.001, price_step=0.01, c_mult=1.0)
+    state_params = gv.StateParams(
+        balance=rng.uniform(100.0, 10000.0),
+        order_book=gv.OrderBook(bid=price, ask=price),
+        ema_bands=gv.EmaBands(lower=price, upper=price),
+    )
+    trailing_price_bundle = gv.TrailingPriceBundle(
+        max_since_open=price * rng.uniform(1.0, 1.2),
+        min_since_open=price * rng.uniform(0.8, 1.0),
+        max_since_min=price * rng.uniform(0.8, 1.2),
+        min_since_max=price * rng.uniform(0.8, 1.2),
+    )
+    bot_params = gv.BotParams(
+        wallet_exposure_limit=rng.uniform(0.1, 3.0),
+        n_positions=rng.randint(1, 10),
+        entry_initial_qty_pct=rng.uniform(0.005, 0.1),
+        entry_initial_ema_dist=rng.uniform(-0.1, 0.05),
+        entry_grid_spacing_pct=rng.uniform(0.001, 0.12),
+        entry_grid_spacing_weight=rng.uniform(0.0, 10.0),
+        entry_grid_double_down_factor=rng.uniform(0.1, 3.0),
+        entry_trailing_threshold_pct=rng.uniform(-0.1, 0.1),
+        entry_trailing_retracement_pct=rng.uniform(0.0, 0.1),
+        entry_trailing_grid_ratio=rng.choice([0.0, -1.0, 1.0, rng.uniform(-1.0, 1.0)]),
+        close_grid_min_markup=rng.uniform(0.001, 0.03),
+        close_grid_markup_range=rng.uniform(0.0, 0.03),
+        close_grid_qty_pct=rng.uniform(0.05, 1.0),
+        close_trailing_threshold_pct=rng.uniform(-0.1, 0.1),
+        close_trailing_retracement_pct=rng.uniform(0.0, 0.1),
+        close_trailing_qty_pct=rng.uniform(0.05, 1.0),
+        close_trailing_grid_ratio=rng.choice([0.0, -1.0, 1.0, rng.uniform(-1.0, 1.0)]),
+    )
+    close_size = 10.0 * bot_params.wallet_exposure_limit
+    return exchange_params, state_params, bot_params, price, close_size, trailing_price_bundle
@@ -260,6 +260,7 @@ def manage_master():
     monitor.servers = []
     monitor.servers.append(monitor.server)
     monitor.view_server()
+    monitor.view_server_metrics()
     monitor.view_server_instances()
 
 def manage_vps():
@@ -497,6 +498,7 @@ def manage_vps():
         monitor.servers = []
         monitor.servers.append(monitor.server)
         monitor.view_server()
+        monitor.view_server_metrics()
         monitor.view_server_instances()
         logs = ["logs/PBCoinData.log", "logs/PBRun.log", "logs/PBRemote.log", "logs/sync.log"] + monitor.logfiles
         view_log(vps, logs)
@@ -10,11 +10,18 @@ from Config import ConfigV7
 import json
 from dataclasses import dataclass, field, asdict
 from typing import List
-from GridVisualizerV7 import (
+from GridVisualizerV7Fast import (
     calc_entries_long,
     calc_closes_long,
     calc_entries_short,
     calc_closes_short,
+    calc_sweep,
+    sweep_range,
+    calc_cached,
+    SWEEP_PARAMS,
+    SWEEP_METRICS,
+)
+from GridVisualizerV7 import (
     ExchangeParams,
     StateParams,
     BotParams,
@@ -814,30 +821,30 @@ def show_visualizer():
 
     
     # NORMAL LONG ENTRIES
-    normal_entries_long = calc_entries_long(data.exchange_params, data.state_params, data.normal_bot_params_long, data.position_long_enty, data.trailing_price_bundle)
+    normal_entries_long = calc_cached(calc_entries_long, data.exchange_params, data.state_params, data.normal_bot_params_long, data.position_long_enty, data.trailing_price_bundle)
     data.normal_entries_long = adjust_order_quantities(normal_entries_long) 
     # GRIDONLY LONG ENTRIES
-    gridonly_entries_long = calc_entries_long(data.exchange_params, data.state_params, data.gridonly_bot_params_long, data.position_long_enty, data.trailing_price_bundle)
+    gridonly_entries_long = calc_cached(calc_entries_long, data.exchange_params, data.state_params, data.gridonly_bot_params_long, data.position_long_enty, data.trailing_price_bundle)
     data.gridonly_entries_long = adjust_order_quantities(gridonly_entries_long) 
     
     # NORMAL LONG CLOSES
-    normal_closes_long = calc_closes_long(data.exchange_params, data.state_params, data.normal_bot_params_long, data.position_long_close, data.trailing_price_bundle)
+    normal_closes_long = calc_cached(calc_closes_long, data.exchange_params, data.state_params, data.normal_bot_params_long, data.position_long_close, data.trailing_price_bundle)
     data.normal_closes_long = adjust_order_quantities(normal_closes_long) 
     # GRIDONLY LONG CLOSES
-    gridonly_closes_long = calc_closes_long(data.exchange_params, data.state_params, data.gridonly_bot_params_long, data.position_long_close, data.trailing_price_bundle)
+    gridonly_closes_long = calc_cached(calc_closes_long, data.exchange_params, data.state_params, data.gridonly_bot_params_long, data.position_long_close, data.trailing_price_bundle)
     data.gridonly_closes_long = adjust_order_quantities(gridonly_closes_long) 
     
     # NORMAL SHORT ENTRIES
-    normal_entries_short = calc_entries_short(data.exchange_params, data.state_params, data.normal_bot_params_short, data.position_short_entry, data.trailing_price_bundle)
+    normal_entries_short = calc_cached(calc_entries_short, data.exchange_params, data.state_params, data.normal_bot_params_short, data.position_short_entry, data.trailing_price_bundle)
     data.normal_entries_short = adjust_order_quantities(normal_entries_short)
     # GRIDONLY SHORT ENTRIES
-    gridonly_entries_short = calc_entries_short(data.exchange_params, data.state_params, data.gridonly_bot_params_short, data.position_short_entry, data.trailing_price_bundle)
+    gridonly_entries_short = calc_cached(calc_entries_short, data.exchange_params, data.state_params, data.gridonly_bot_params_short, data.position_short_entry, data.trailing_price_bundle)
     data.gridonly_entries_short = adjust_order_quantities(gridonly_entries_short)
     # NORMAL SHORT CLOSES
-    normal_closes_short = calc_closes_short(data.exchange_params, data.state_params, data.normal_bot_params_short, data.position_short_close, data.trailing_price_bundle)
+    normal_closes_short = calc_cached(calc_closes_short, data.exchange_params, data.state_params, data.normal_bot_params_short, data.position_short_close, data.trailing_price_bundle)
     data.normal_closes_short = adjust_order_quantities(normal_closes_short)
     # GRIDONLY SHORT CLOSES
-    gridonly_closes_short = calc_closes_short(data.exchange_params, data.state_params, data.gridonly_bot_params_short, data.position_short_close, data.trailing_price_bundle)
+    gridonly_closes_short = calc_cached(calc_closes_short, data.exchange_params, data.state_params, data.gridonly_bot_params_short, data.position_short_close, data.trailing_price_bundle)
     data.gridonly_closes_short = adjust_order_quantities(gridonly_closes_short)
 
     st.session_state.v7_grid_visualizer_data = data
@@ -857,6 +864,57 @@ def show_visualizer():
             st.write("SHORT is inactive")
 
 
+def show_sweep():
+    data = st.session_state.v7_grid_visualizer_data
+    with st.expander("Parameter Sweep"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            side = st.selectbox("Side", [Side.Long, Side.Short], format_func=lambda s: s.name.upper(), key="v7_gv_sweep_side")
+            metric = st.selectbox("Metric", SWEEP_METRICS, key="v7_gv_sweep_metric")
+        bot_params = data.normal_bot_params_long if side == Side.Long else data.normal_bot_params_short
+        with col2:
+            param_x = st.selectbox("X Parameter", SWEEP_PARAMS, index=SWEEP_PARAMS.index("entry_grid_spacing_pct"), key="v7_gv_sweep_param_x")
+            param_y = st.selectbox("Y Parameter", SWEEP_PARAMS, index=SWEEP_PARAMS.index("entry_grid_double_down_factor"), key="v7_gv_sweep_param_y")
+        default_x = sweep_range(getattr(bot_params, param_x))
+        default_y = sweep_range(getattr(bot_params, param_y))
+        with col3:
+            x_min = st.number_input("X min", value=default_x[0], format="%.5f", key=f"v7_gv_sweep_x_min_{param_x}")
+            x_max = st.number_input("X max", value=default_x[1], format="%.5f", key=f"v7_gv_sweep_x_max_{param_x}")
+            x_steps = st.number_input("X steps", min_value=2, max_value=50, value=10, key="v7_gv_sweep_x_steps")
+        with col4:
+            y_min = st.number_input("Y min", value=default_y[0], format="%.5f", key=f"v7_gv_sweep_y_min_{param_y}")
+            y_max = st.number_input("Y max", value=default_y[1], format="%.5f", key=f"v7_gv_sweep_y_max_{param_y}")
+            y_steps = st.number_input("Y steps", min_value=2, max_value=50, value=10, key="v7_gv_sweep_y_steps")
+        if param_x == param_y:
+            st.warning("X and Y parameter must be different")
+            return
+        if x_min >= x_max or y_min >= y_max:
+            st.warning("Min must be lower than max")
+            return
+        if st.button("Run Sweep"):
+            values_x = np.linspace(x_min, x_max, int(x_steps))
+            values_y = np.linspace(y_min, y_max, int(y_steps))
+            if side == Side.Long:
+                entry_position, close_position = data.position_long_enty, data.position_long_close
+            else:
+                entry_position, close_position = data.position_short_entry, data.position_short_close
+            with st.spinner("Calculating sweep..."):
+                result = calc_sweep(data.exchange_params, data.state_params, bot_params, entry_position, close_position,
+                                    data.trailing_price_bundle, side, param_x, values_x, param_y, values_y)
+            st.session_state.v7_grid_visualizer_sweep = (side, param_x, values_x, param_y, values_y, result)
+        if "v7_grid_visualizer_sweep" in st.session_state:
+            side, param_x, values_x, param_y, values_y, result = st.session_state.v7_grid_visualizer_sweep
+            fig = go.Figure(data=go.Heatmap(z=result[metric], x=values_x, y=values_y, colorscale="Viridis", colorbar=dict(title=metric)))
+            fig.update_layout(
+                template='plotly_dark',
+                title=f'{side.name.upper()} {metric}',
+                xaxis=dict(title=param_x),
+                yaxis=dict(title=param_y),
+                margin=dict(l=40, r=40, t=40, b=40),
+                height=600,
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
 def build_sidebar():
     # Navigation
     with st.sidebar:
@@ -865,6 +923,8 @@ def build_sidebar():
                 del st.session_state.v7_grid_visualizer_data
             if "v7_grid_visualizer_config" in st.session_state:
                 del st.session_state.v7_grid_visualizer_config
+            if "v7_grid_visualizer_sweep" in st.session_state:
+                del st.session_state.v7_grid_visualizer_sweep
             st.rerun()
 
 # Redirect to Login if not authenticated or session state not initialized
@@ -879,3 +939,4 @@ st.info("Visualization of trailing parameters is currently very limited. Range o
 
 build_sidebar()
 show_visualizer()
+show_sweep()
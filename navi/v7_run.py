@@ -96,9 +96,11 @@ def select_instance():
                     delete_instance(instance)
     d = []
     for id, instance in enumerate(v7_instances):
-        twe_str: str = (f"{ 'L=' + str( round(instance.config.bot.long.total_wallet_exposure_limit,2)) if instance.config.bot.long.n_positions > 0 else ''}"
-                        f"{' | ' if instance.config.bot.long.n_positions > 0 and instance.config.bot.short.n_positions > 0 else ''}"
-                        f"{ 'S=' + str( round(instance.config.bot.short.total_wallet_exposure_limit,2)) if instance.config.bot.short.n_positions > 0 else ''}")
+        long_twe, long_n_positions = instance.twe["long"]
+        short_twe, short_n_positions = instance.twe["short"]
+        twe_str: str = (f"{ 'L=' + str( round(long_twe,2)) if long_n_positions > 0 else ''}"
+                        f"{' | ' if long_n_positions > 0 and short_n_positions > 0 else ''}"
+                        f"{ 'S=' + str( round(short_twe,2)) if short_n_positions > 0 else ''}")
         running_on = instance.is_running_on()
         if instance.enabled_on in running_on and (instance.version == instance.running_version):
             remote_str = f'✅ Running {instance.is_running_on()}'
@@ -111,13 +113,13 @@ def select_instance():
         d.append({
             'id': id,
             'Edit': False,
-            'User': instance.config.live.user,
-            'Enabled On': instance.config.pbgui.enabled_on,
+            'User': instance.user,
+            'Enabled On': instance.enabled_on,
             'TWE': twe_str,
-            'Version': instance.config.pbgui.version,
+            'Version': instance.version,
             'Remote': remote_str,
             'Remote Version': instance.running_version,
-            'Note': instance.config.pbgui.note,
+            'Note': instance.note,
             'Delete': False,
         })
     column_config = {
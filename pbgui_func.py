@@ -4,11 +4,10 @@ import hjson
 import pprint
 import uuid
 import requests
-import configparser
 import os
 from time import sleep
 from pathlib import Path
-from pbgui_purefunc import load_ini, save_ini
+from pbgui_purefunc import load_ini, save_ini, load_symbols_from_ini
 from Log import LogHandler
 
 @st.dialog("Select file")
@@ -253,13 +252,6 @@ def upload_pbconfigdb(config: str, symbol: str, source_name : str):
     else:
         st.error("Invalid config", icon="🚨")
 
-def load_symbols_from_ini(exchange: str, market_type: str):
-    pb_config = configparser.ConfigParser()
-    pb_config.read('pbgui.ini')
-    if pb_config.has_option("exchanges", f'{exchange}.{market_type}'):
-        return eval(pb_config.get("exchanges", f'{exchange}.{market_type}'))
-    else:
-        return []
 
 def update_dir(key):
     choice = st.session_state[key]
@@ -1,26 +1,160 @@
 import json
 import hjson
+import ast
 import pprint
 import configparser
+import threading
+import os
+import hashlib
+import shutil
 from pathlib import Path
+from time import sleep, time
+from contextlib import contextmanager
+
+# Parsed pbgui.ini and the (mtime, size) it was parsed for
+ini_cache = {"stat": None, "config": None}
+ini_lock = threading.Lock()
+INI_LOCK_TIMEOUT = 10
+
+def ini_stat():
+    try:
+        stat = os.stat('pbgui.ini')
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+def read_ini():
+    """Returns the parsed pbgui.ini, only parsed again when mtime or size of the file changed"""
+    stat = ini_stat()
+    if stat is None or ini_cache["stat"] != stat:
+        pb_config = configparser.ConfigParser()
+        pb_config.read('pbgui.ini')
+        ini_cache["config"] = pb_config
+        ini_cache["stat"] = stat
+    return ini_cache["config"]
+
+@contextmanager
+def ini_file_lock():
+    """
+    Lock pbgui.ini against writers in other processes (PBRun, PBRemote, Streamlit) with a lock file.
+    A lock file older than INI_LOCK_TIMEOUT is left over from a crashed process and is removed.
+    """
+    lock_file = Path('pbgui.ini.lock')
+    with ini_lock:
+        start = time()
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time() - lock_file.stat().st_mtime > INI_LOCK_TIMEOUT:
+                        lock_file.unlink(missing_ok=True)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time() - start > INI_LOCK_TIMEOUT * 2:
+                    raise TimeoutError('pbgui.ini is locked')
+                sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            lock_file.unlink(missing_ok=True)
+
+def ini_values(pb_config: configparser.ConfigParser):
+    return {section: dict(pb_config.items(section, raw=True)) for section in pb_config.sections()}
+
+@contextmanager
+def edit_ini():
+    """
+    Locked read-modify-write of pbgui.ini, every writer of pbgui.ini uses it.
+    Yields the ConfigParser read from the file, it is written back if it was changed in the block.
+
+        with edit_ini() as pb_config:
+            pb_config.set("main", "activate_ts", "0")
+    """
+    with ini_file_lock():
+        # Read from file, not from cache, so changes of other processes are kept
+        pb_config = configparser.ConfigParser()
+        pb_config.read('pbgui.ini')
+        before = ini_values(pb_config)
+        yield pb_config
+        if ini_values(pb_config) != before:
+            with atomic_write('pbgui.ini') as pbgui_configfile:
+                pb_config.write(pbgui_configfile)
+        ini_cache["config"] = pb_config
+        ini_cache["stat"] = ini_stat()
 
 def save_ini(section : str, parameter : str, value : str):
-    pb_config = configparser.ConfigParser()
-    pb_config.read('pbgui.ini')
-    if not pb_config.has_section(section):
-        pb_config.add_section(section)
-    pb_config.set(section, parameter, value)
-    with open('pbgui.ini', 'w') as pbgui_configfile:
-        pb_config.write(pbgui_configfile)
+    with edit_ini() as pb_config:
+        if not pb_config.has_section(section):
+            pb_config.add_section(section)
+        pb_config.set(section, parameter, value)
+
+def save_ini_defaults(section : str, defaults : dict):
+    """Adds the options of defaults that are missing in section, options already set are kept"""
+    pb_config = read_ini()
+    if pb_config.has_section(section) and all(pb_config.has_option(section, option) for option in defaults):
+        return
+    with edit_ini() as pb_config:
+        if not pb_config.has_section(section):
+            pb_config.add_section(section)
+        for option, value in defaults.items():
+            if not pb_config.has_option(section, option):
+                pb_config.set(section, option, value)
 
 def load_ini(section : str, parameter : str):
-    pb_config = configparser.ConfigParser()
-    pb_config.read('pbgui.ini')
+    pb_config = read_ini()
     if pb_config.has_option(section, parameter):
         return pb_config.get(section, parameter)
     else:
         return ""
 
+# Parsed lists by (section, parameter) with the pbgui.ini (mtime, size) they were parsed for
+ini_list_cache = {}
+
+def parse_ini_list(value : str):
+    """
+    Returns the parsed list and True if it was stored as Python repr by an older pbgui version.
+    Raises ValueError if value is not a list.
+    """
+    try:
+        values, legacy = json.loads(value), False
+    except ValueError:
+        try:
+            values, legacy = ast.literal_eval(value), True
+        except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+            raise ValueError(f'Not a list: {value!r}') from e
+    if not isinstance(values, list):
+        raise ValueError(f'Not a list: {value!r}')
+    return values, legacy
+
+def load_ini_list(section : str, parameter : str):
+    """
+    Returns a list stored as JSON in pbgui.ini, memoized until pbgui.ini changes.
+    A list stored as Python repr (older pbgui versions) is converted and saved back as JSON.
+    A value that is not a list is returned as empty list and left in pbgui.ini as it is.
+    """
+    pb_config = read_ini()
+    if not pb_config.has_option(section, parameter):
+        return []
+    cached = ini_list_cache.get((section, parameter))
+    if cached and cached[0] == ini_cache["stat"]:
+        return list(cached[1])
+    try:
+        values, legacy = parse_ini_list(pb_config.get(section, parameter))
+    except ValueError as e:
+        print(f'Error: pbgui.ini [{section}] {parameter}: {e}')
+        values, legacy = [], False
+    if legacy:
+        save_ini_list(section, parameter, values)
+    ini_list_cache[(section, parameter)] = (ini_cache["stat"], values)
+    return list(values)
+
+def save_ini_list(section : str, parameter : str, values : list):
+    save_ini(section, parameter, json.dumps(values))
+
 def pbdir(): return load_ini("main", "pbdir")
 
 def pbvenv(): return load_ini("main", "pbvenv")
@@ -41,6 +175,79 @@ def is_pb7_installed():
 
 PBGDIR = Path.cwd()
 
+@contextmanager
+def atomic_write(file):
+    """
+    Opens a temp file next to file for writing. On success it is fsynced and renamed over file.
+    Readers (PBRemote, PBRun, Streamlit) see either the old or the new file, never a partial one.
+    """
+    file = Path(file)
+    tmp = Path(f'{file.parent}/.{file.name}.{os.getpid()}_{threading.get_ident()}.tmp')
+    try:
+        with open(tmp, "w", encoding='utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # On Windows the rename fails while a reader has the file open
+        for retry in range(20):
+            try:
+                os.replace(tmp, file)
+                return
+            except PermissionError:
+                if retry == 19:
+                    raise
+                sleep(0.05)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def write_json_atomic(file, data, **kwargs):
+    """Writes data as JSON with atomic_write, kwargs are passed to json.dump"""
+    with atomic_write(file) as f:
+        json.dump(data, f, **kwargs)
+
+# md5 of files by path: (file_version, md5)
+md5_cache = {}
+# Seconds a file has to be unchanged before its mtime is trusted. Two writes within the timestamp
+# granularity of the filesystem can leave the same mtime, and a config rewritten with the same size
+# (0.5 -> 0.7) would look unchanged.
+MTIME_GRANULARITY = 2
+
+def file_version(stat: os.stat_result):
+    """
+    Version of a file for the caches, a new write changes it. None if the file was changed less than
+    MTIME_GRANULARITY seconds ago, then the content must be read again.
+    """
+    if time() - stat.st_mtime_ns / 1e9 < MTIME_GRANULARITY:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino, stat.st_ctime_ns)
+
+def file_md5(file: Path):
+    """md5 of the file content, only recomputed when the file_version of the file changed"""
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    key = str(file)
+    version = file_version(stat)
+    cached = md5_cache.get(key)
+    if version and cached and cached[0] == version:
+        return cached[1]
+    with open(file, 'rb') as file_obj:
+        digest = hashlib.md5(file_obj.read()).hexdigest()
+    if version:
+        md5_cache[key] = (version, digest)
+    else:
+        md5_cache.pop(key, None)
+    return digest
+
+def copy_if_changed(source, destination):
+    """Copies source to destination only if the content differs, returns True if it was copied"""
+    source_md5 = file_md5(source)
+    if source_md5 is not None and source_md5 == file_md5(destination):
+        return False
+    shutil.copy(source, destination)
+    return True
+
 def validateJSON(jsonData):
     try:
         json.loads(jsonData)
@@ -61,10 +268,69 @@ def config_pretty_str(config: dict):
         pretty_str = pretty_str.replace(*r)
     return pretty_str
 
-def load_symbols_from_ini(exchange: str, market_type: str):
-    pb_config = configparser.ConfigParser()
-    pb_config.read('pbgui.ini')
-    if pb_config.has_option("exchanges", f'{exchange}.{market_type}'):
-        return eval(pb_config.get("exchanges", f'{exchange}.{market_type}'))
+def delete_ini_section(section : str):
+    with edit_ini() as pb_config:
+        pb_config.remove_section(section)
+
+# Symbol files by exchange with the file_version they were loaded for
+symbols_cache = {}
+
+def symbols_file(exchange: str):
+    return Path(f'{PBGDIR}/data/symbols/{exchange}.json')
+
+def migrate_symbols_from_ini():
+    """Moves the symbol lists of older pbgui versions from the [exchanges] section of pbgui.ini to data/symbols"""
+    pb_config = read_ini()
+    if not pb_config.has_section("exchanges"):
+        return
+    exchanges = {}
+    for option in pb_config.options("exchanges"):
+        exchange, _, market_type = option.rpartition('.')
+        if market_type not in ("swap", "spot", "cpt"):
+            continue
+        exchanges.setdefault(exchange, {})[market_type] = load_ini_list("exchanges", option)
+    for exchange, symbols in exchanges.items():
+        # Symbols fetched by a newer version are kept
+        current = read_symbols_file(exchange)
+        save_symbols_file(exchange, **{**symbols, **{k: v for k, v in current.items() if k in symbols}})
+    # Only after all symbol files are written, a failed write leaves the section for the next run
+    delete_ini_section("exchanges")
+
+def load_symbols_file(exchange: str):
+    """Returns {"fetched_at": ts, "swap": [...], "spot": [...], "cpt": [...]} from data/symbols/{exchange}.json"""
+    migrate_symbols_from_ini()
+    return read_symbols_file(exchange)
+
+def read_symbols_file(exchange: str):
+    """Reads data/symbols/{exchange}.json, memoized until the file changes"""
+    file = symbols_file(exchange)
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return {}
+    version = file_version(stat)
+    cached = symbols_cache.get(exchange)
+    if version and cached and cached[0] == version:
+        return cached[1]
+    with open(file, "r", encoding='utf-8') as f:
+        symbols = json.load(f)
+    if version:
+        symbols_cache[exchange] = (version, symbols)
     else:
-        return []
+        symbols_cache.pop(exchange, None)
+    return symbols
+
+def save_symbols_file(exchange: str, swap: list = None, spot: list = None, cpt: list = None):
+    """Saves the symbols of an exchange, market types that are None keep their saved symbols"""
+    file = symbols_file(exchange)
+    symbols = dict(read_symbols_file(exchange))
+    for market_type, values in (("swap", swap), ("spot", spot), ("cpt", cpt)):
+        if values is not None:
+            symbols[market_type] = values
+    symbols["fetched_at"] = int(time())
+    file.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(file, symbols)
+
+def load_symbols_from_ini(exchange: str, market_type: str):
+    """Returns the symbols of an exchange. Older versions stored them in pbgui.ini, now they are in data/symbols"""
+    return list(load_symbols_file(exchange).get(market_type, []))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The pbgui modules are top level modules in the pbgui directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,96 @@
+"""
+Writers replace status, monitor and queue JSON files 10k times while readers parse them.
+A reader must never see a partial file, and no temp files may be left over.
+"""
+import json
+import threading
+from pathlib import Path
+from time import sleep
+import pytest
+from pbgui_purefunc import atomic_write, write_json_atomic
+from PBRun import Monitor
+from Status import InstancesStatus, InstanceStatus
+
+WRITES = 10000
+
+def status_with_instances(file: Path, pbname: str):
+    status = InstancesStatus(str(file))
+    status.pbname = pbname
+    status.activate_pbname = pbname
+    for n in range(50):
+        instance = InstanceStatus()
+        instance.name = f'bot{n}'
+        instance.version = n
+        instance.multi = False
+        instance.enabled_on = pbname
+        instance.running = True
+        status.add(instance)
+    return status
+
+def reader(file: Path, done: threading.Event, result: dict):
+    while not done.is_set():
+        try:
+            with open(file, "r", encoding='utf-8') as f:
+                json.load(f)
+            result["reads"] += 1
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            result["errors"] += 1
+        sleep(0.001)
+
+def test_concurrent_writers_and_readers(tmp_path):
+    status_file = tmp_path / "status_v7.json"
+    monitor = Monitor()
+    monitor.path = str(tmp_path)
+    monitor.user = "user1"
+    queue_file = tmp_path / "queue_item.json"
+    gui = status_with_instances(status_file, "gui")
+    pbrun = status_with_instances(status_file, "pbrun")
+    writes = WRITES // 4
+    def write_queue():
+        for n in range(writes):
+            write_json_atomic(queue_file, {"name": f'bt{n}', "filename": "x" * 500, "status": "running"}, indent=4)
+    def write_monitor():
+        for n in range(writes):
+            monitor.pnl_today = n
+            monitor.save_monitor()
+    def save_status(status):
+        for n in range(writes):
+            status.save()
+    writers = [
+        threading.Thread(target=save_status, args=(gui,)),
+        threading.Thread(target=save_status, args=(pbrun,)),
+        threading.Thread(target=write_monitor),
+        threading.Thread(target=write_queue),
+    ]
+    done = threading.Event()
+    results = {file: {"reads": 0, "errors": 0} for file in (status_file, tmp_path / "monitor.json", queue_file)}
+    readers = [threading.Thread(target=reader, args=(file, done, result)) for file, result in results.items()]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+    for file, result in results.items():
+        assert result["errors"] == 0, file
+        assert result["reads"] > 0, file
+    status = InstancesStatus(str(status_file))
+    assert len(status.instances) == 50
+    assert status.status_seq >= writes
+    assert json.loads((tmp_path / "monitor.json").read_text())["pt"] == writes - 1
+    assert sorted(file.name for file in tmp_path.iterdir()) == ["monitor.json", "queue_item.json", "status_v7.json"]
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    file = tmp_path / "status.json"
+    write_json_atomic(file, {"seq": 1})
+    with pytest.raises(TypeError):
+        write_json_atomic(file, {"seq": 2, "bad": object()})
+    with pytest.raises(RuntimeError):
+        with atomic_write(file) as f:
+            f.write('{"seq": ')
+            raise RuntimeError("writer crashed")
+    assert json.loads(file.read_text()) == {"seq": 1}
+    assert [path.name for path in tmp_path.iterdir()] == ["status.json"]
@@ -0,0 +1,67 @@
+import json
+import os
+from PBRun import RunV7, parse_coin_flags, format_coin_flags, fix_coin_flags
+
+def test_parse_coin_flags():
+    assert parse_coin_flags("-lm n -lw 0.5 -sm gs -sw 0.0") == {"-lm": "n", "-lw": "0.5", "-sm": "gs", "-sw": "0.0"}
+    # Paths with spaces are kept, extra whitespace is dropped
+    assert parse_coin_flags("  -lc /my configs/BTC.json   -lev 10 ") == {"-lc": "/my configs/BTC.json", "-lev": "10"}
+    # Negative numbers are values, not options
+    assert parse_coin_flags("-lw -1") == {"-lw": "-1"}
+    assert parse_coin_flags("") == {}
+
+def test_format_coin_flags_roundtrip():
+    flags = {"-lc": "/my configs/BTC.json", "-x": "1", "-sw": "0.5", "-lm": "n"}
+    formatted = format_coin_flags(flags)
+    # Known options in COIN_FLAGS order, unknown options last
+    assert formatted == "-lm n -sw 0.5 -lc /my configs/BTC.json -x 1"
+    assert parse_coin_flags(formatted) == flags
+    for text in ("-lm n -lw 0.5 -sm gs -sw 0.0", "-lm gs -lc /pb/run_v7/bot1/BTC.json"):
+        assert format_coin_flags(parse_coin_flags(text)) == text
+
+def test_fix_coin_flags_points_lc_to_path():
+    coin_flags = {"BTC": "-lm n -lc /old/path/BTC.json", "ETH": "-lm gs"}
+    new, diff = fix_coin_flags(coin_flags, "/pb/run_v7/bot1")
+    assert new == {"BTC": "-lm n -lc /pb/run_v7/bot1/BTC.json", "ETH": "-lm gs"}
+    assert diff == {"BTC": ("-lm n -lc /old/path/BTC.json", "-lm n -lc /pb/run_v7/bot1/BTC.json")}
+    # The input is not modified
+    assert coin_flags["BTC"] == "-lm n -lc /old/path/BTC.json"
+
+def test_fix_coin_flags_no_op():
+    # Already correct, only order and whitespace differ: nothing changes and the flags are kept as they are
+    coin_flags = {"BTC": "-lc /pb/run_v7/bot1/BTC.json  -lm n", "ETH": "-lm gs"}
+    new, diff = fix_coin_flags(coin_flags, "/pb/run_v7/bot1")
+    assert diff == {}
+    assert new == coin_flags
+    assert fix_coin_flags({}, "/pb/run_v7/bot1") == ({}, {})
+
+def write_config(path, coin_flags: dict):
+    config = {"pbgui": {"version": 3, "enabled_on": "server1"}, "live": {"user": "bot1", "coin_flags": coin_flags}}
+    file = path / "config.json"
+    file.write_text(json.dumps(config))
+    return file
+
+def run_v7(path):
+    run = RunV7()
+    run.name = "server1"
+    run.user = "bot1"
+    run.path = str(path)
+    return run
+
+def test_load_writes_config_only_when_changed(tmp_path):
+    file = write_config(tmp_path, {"BTC": f'-lm n -lc {tmp_path}/BTC.json'})
+    stat = os.stat(file)
+    run = run_v7(tmp_path)
+    assert run.load()
+    assert run.coin_flags_diff == {}
+    assert os.stat(file).st_mtime_ns == stat.st_mtime_ns and os.stat(file).st_ino == stat.st_ino
+    # A wrong -lc path is fixed and written, the diff is kept for the log
+    file = write_config(tmp_path, {"BTC": "-lm n -lc /old/BTC.json"})
+    assert run.load()
+    assert run.coin_flags_diff == {"BTC": ("-lm n -lc /old/BTC.json", f'-lm n -lc {tmp_path}/BTC.json')}
+    assert json.loads(file.read_text())["live"]["coin_flags"] == {"BTC": f'-lm n -lc {tmp_path}/BTC.json'}
+    # Loading the fixed config again changes nothing
+    stat = os.stat(file)
+    assert run.load()
+    assert run.coin_flags_diff == {}
+    assert os.stat(file).st_ino == stat.st_ino
@@ -0,0 +1,65 @@
+import json
+import pytest
+from DaemonMetrics import DaemonMetrics, PhaseStats, percentile, histogram, HISTOGRAM_BUCKETS
+
+def test_percentile():
+    durations = [float(n) for n in range(1, 101)]
+    assert percentile(durations, 50) == 50.0
+    assert percentile(durations, 90) == 90.0
+    assert percentile(durations, 99) == 99.0
+    assert percentile(durations, 100) == 100.0
+    assert percentile(durations, 0) == 1.0
+    # Nearest rank rounds up
+    assert percentile([1.0, 2.0, 3.0], 50) == 2.0
+    assert percentile([1.0, 2.0], 50) == 1.0
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([], 50) == 0.0
+
+def test_histogram():
+    counts = histogram([0.0005, 0.001, 0.002, 0.05, 0.3, 2, 60, 299, 300, 301, 1000])
+    assert list(counts) == [f'<={bound}' for bound in HISTOGRAM_BUCKETS] + [f'>{HISTOGRAM_BUCKETS[-1]}']
+    # Bounds are inclusive
+    assert counts["<=0.001"] == 2
+    assert counts["<=0.005"] == 1
+    assert counts["<=0.05"] == 1
+    assert counts["<=0.5"] == 1
+    assert counts["<=5"] == 1
+    assert counts["<=60"] == 1
+    assert counts["<=300"] == 2
+    assert counts[">300"] == 2
+    assert sum(counts.values()) == 11
+    assert sum(histogram([]).values()) == 0
+
+def test_phase_stats_window():
+    stats = PhaseStats(window=10)
+    for n in range(1, 21):
+        stats.add(n / 1000)
+    summary = stats.summary()
+    # Only the last 10 durations, 0.011 to 0.020, total counts all
+    assert summary["count"] == 10
+    assert summary["total"] == 20
+    assert summary["last"] == 0.02
+    assert summary["max"] == 0.02
+    assert summary["mean"] == pytest.approx(0.0155)
+    assert summary["p50"] == 0.015
+    assert summary["p90"] == 0.019
+    assert sum(summary["histogram"].values()) == 10
+    assert summary["histogram"]["<=0.05"] == 10
+
+def test_dump_every(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics = DaemonMetrics("PBTest", dump_every=3)
+    for n in range(2):
+        with metrics.phase("scan"):
+            pass
+        metrics.add("sync", 0.2)
+        metrics.loop()
+    assert not metrics.metrics_file.exists()
+    with pytest.raises(ValueError):
+        with metrics.phase("scan"):
+            raise ValueError
+    metrics.loop()
+    dump = json.loads(metrics.metrics_file.read_text())
+    assert dump["daemon"] == "PBTest" and dump["loops"] == 3
+    assert dump["phases"]["scan"]["count"] == 3
+    assert dump["phases"]["sync"]["histogram"]["<=0.5"] == 2
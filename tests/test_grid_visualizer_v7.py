@@ -0,0 +1,63 @@
+import math
+import random
+import pytest
+from GridVisualizerV7 import interpolate, lagrange_weights
+
+def reference_interpolate(x: float, xs: list, ys: list) -> float:
+    """The Lagrange loop interpolate used before the closed form and barycentric rewrite"""
+    n = len(xs)
+    result = 0.0
+    for i in range(n):
+        term = ys[i]
+        for j in range(n):
+            if i != j:
+                term *= (x - xs[j]) / (xs[i] - xs[j])
+        result += term
+    return result
+
+def random_points(rng: random.Random, n: int):
+    """n distinct xs at least 0.05 apart, like the wallet exposure ratios of the grid functions"""
+    while True:
+        xs = [rng.uniform(0.0, 2.0) for _ in range(n)]
+        if all(abs(a - b) >= 0.05 for i, a in enumerate(xs) for b in xs[i + 1:]):
+            return xs, [rng.uniform(-100.0, 100.0) for _ in range(n)]
+
+def test_two_points_bit_identical():
+    rng = random.Random(0)
+    for _ in range(10000):
+        xs, ys = random_points(rng, 2)
+        x = rng.uniform(-1.0, 3.0)
+        assert interpolate(x, xs, ys) == reference_interpolate(x, xs, ys)
+        for xi in xs:
+            assert interpolate(xi, xs, ys) == reference_interpolate(xi, xs, ys)
+
+@pytest.mark.parametrize("n", range(2, 7))
+def test_parity_with_lagrange_loop(n):
+    rng = random.Random(n)
+    for _ in range(2000):
+        xs, ys = random_points(rng, n)
+        scale = max(abs(y) for y in ys)
+        for x in [rng.uniform(-0.5, 2.5), rng.choice(xs)]:
+            expected = reference_interpolate(x, xs, ys)
+            assert math.isclose(interpolate(x, xs, ys), expected, rel_tol=1e-9, abs_tol=1e-9 * scale), (x, xs, ys)
+    # At a node the barycentric form returns the node value exactly
+    xs, ys = random_points(rng, n)
+    assert [interpolate(x, xs, ys) for x in xs] == ys
+
+def test_weights_are_cached():
+    lagrange_weights.cache_clear()
+    xs, ys = random_points(random.Random(1), 4)
+    for x in (0.1, 0.2, 0.3):
+        interpolate(x, xs, ys)
+    assert lagrange_weights.cache_info().misses == 1
+
+def test_invalid_points():
+    with pytest.raises(ValueError):
+        interpolate(0.5, [1.0, 1.0], [1.0, 2.0])
+    with pytest.raises(ValueError):
+        interpolate(0.5, [1.0, 2.0, 1.0], [1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        interpolate(0.5, [1.0, 2.0], [1.0])
+    with pytest.raises(ValueError):
+        interpolate(0.5, [], [])
+    assert interpolate(0.5, [1.0], [3.0]) == 3.0
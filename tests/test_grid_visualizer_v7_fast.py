@@ -0,0 +1,88 @@
+import math
+import random
+import pytest
+import GridVisualizerV7 as gv
+import GridVisualizerV7Fast as fast
+from benchmarks.synthetic import random_grid_case
+
+def orders_equal(a: list, b: list, rel_tol: float = 1e-9) -> bool:
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.order_type != y.order_type:
+            return False
+        if not math.isclose(x.qty, y.qty, rel_tol=rel_tol, abs_tol=1e-12):
+            return False
+        if not math.isclose(x.price, y.price, rel_tol=rel_tol, abs_tol=1e-12):
+            return False
+    return True
+
+@pytest.mark.parametrize("seed", range(5))
+def test_parity_with_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        exchange_params, state_params, bot_params, price, close_size, trailing = random_grid_case(rng)
+        pairs = [
+            (gv.calc_entries_long, fast.calc_entries_long, gv.Position(0.0, price)),
+            (gv.calc_closes_long, fast.calc_closes_long, gv.Position(close_size, price)),
+            (gv.calc_entries_short, fast.calc_entries_short, gv.Position(0.0, price)),
+            (gv.calc_closes_short, fast.calc_closes_short, gv.Position(-close_size, price)),
+        ]
+        for reference, calc, position in pairs:
+            expected = reference(exchange_params, state_params, bot_params, position, trailing)
+            result = calc(exchange_params, state_params, bot_params, position, trailing)
+            assert orders_equal(expected, result), (reference.__name__, bot_params)
+
+@pytest.mark.parametrize("side", [gv.Side.Long, gv.Side.Short])
+def test_sweep_matches_individual_calls(side):
+    exchange_params, state_params, bot_params, price, close_size, trailing = random_grid_case(random.Random(0))
+    values_x = [0.01, 0.03, 0.05]
+    values_y = [0.5, 1.0, 2.0]
+    sign = 1.0 if side == gv.Side.Long else -1.0
+    entry_position = gv.Position(0.0, price)
+    close_position = gv.Position(sign * close_size, price)
+    sweep = fast.calc_sweep(exchange_params, state_params, bot_params, entry_position, close_position, trailing,
+                            side, "entry_grid_spacing_pct", values_x, "entry_grid_double_down_factor", values_y)
+    for iy, value_y in enumerate(values_y):
+        for ix, value_x in enumerate(values_x):
+            bot_params_single = bot_params.clone()
+            bot_params_single.entry_grid_spacing_pct = value_x
+            bot_params_single.entry_grid_double_down_factor = value_y
+            if side == gv.Side.Long:
+                entries = gv.calc_entries_long(exchange_params, state_params, bot_params_single, entry_position, trailing)
+                closes = gv.calc_closes_long(exchange_params, state_params, bot_params_single, close_position, trailing)
+            else:
+                entries = gv.calc_entries_short(exchange_params, state_params, bot_params_single, entry_position, trailing)
+                closes = gv.calc_closes_short(exchange_params, state_params, bot_params_single, close_position, trailing)
+            metrics = fast.calc_grid_metrics(exchange_params, state_params, entries, closes, entry_position)
+            for metric in fast.SWEEP_METRICS:
+                assert math.isclose(sweep[metric][iy, ix], metrics[metric], rel_tol=1e-9, abs_tol=1e-12), metric
+
+@pytest.mark.parametrize("side", [gv.Side.Long, gv.Side.Short])
+def test_grid_metrics_start_from_position(side):
+    exchange_params, state_params, bot_params, price, close_size, trailing = random_grid_case(random.Random(1))
+    sign = 1.0 if side == gv.Side.Long else -1.0
+    position = gv.Position(sign * close_size, price)
+    calc_entries = gv.calc_entries_long if side == gv.Side.Long else gv.calc_entries_short
+    entries = calc_entries(exchange_params, state_params, bot_params, position, trailing)
+    psize, pprice = close_size, price
+    for entry in entries:
+        psize, pprice = gv.calc_new_psize_pprice(psize, pprice, abs(entry.qty), entry.price, exchange_params.qty_step)
+    expected = gv.calc_wallet_exposure(exchange_params.c_mult, state_params.balance, psize, pprice)
+    metrics = fast.calc_grid_metrics(exchange_params, state_params, entries, [], position)
+    assert metrics["max_wallet_exposure"] == pytest.approx(expected)
+    assert metrics["max_wallet_exposure"] > fast.calc_grid_metrics(exchange_params, state_params, entries, [])["max_wallet_exposure"]
+    # Without entries the exposure is the one of the position
+    metrics = fast.calc_grid_metrics(exchange_params, state_params, [], [], position)
+    assert metrics["max_wallet_exposure"] == pytest.approx(gv.calc_wallet_exposure(exchange_params.c_mult, state_params.balance, close_size, price))
+
+@pytest.mark.parametrize("value, expected", [
+    (0.02, (0.01, 0.03)),
+    (-0.1, (-0.15, -0.05)),
+    (0.0, (0.0, 0.01)),
+])
+def test_sweep_range(value, expected):
+    low, high = fast.sweep_range(value)
+    assert low < high
+    assert low == pytest.approx(expected[0])
+    assert high == pytest.approx(expected[1])
@@ -0,0 +1,122 @@
+import configparser
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+import pytest
+import pbgui_purefunc
+from pbgui_purefunc import save_ini, load_ini, edit_ini, save_ini_defaults, delete_ini_section, parse_ini_list, load_ini_list, save_ini_list
+
+PBGUI = Path(__file__).resolve().parent.parent
+
+WRITER = """
+import sys
+from pbgui_purefunc import save_ini
+name, count = sys.argv[1], int(sys.argv[2])
+for n in range(count):
+    save_ini("writers", f"{name}_{n}", str(n))
+"""
+
+@pytest.fixture
+def ini(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("pbgui.ini").write_text("[main]\npbname = server1\n")
+    return Path(tmp_path / "pbgui.ini")
+
+def read(file: Path):
+    pb_config = configparser.ConfigParser()
+    pb_config.read(file)
+    return pb_config
+
+def test_concurrent_writers_keep_all_options(ini):
+    """Processes (PBRun, PBRemote, Streamlit) and threads write at the same time, no option is lost"""
+    count = 40
+    env = dict(os.environ, PYTHONPATH=str(PBGUI))
+    processes = [subprocess.Popen([sys.executable, "-c", WRITER, f'process{n}', str(count)], env=env) for n in range(4)]
+    def thread_writer(name):
+        for n in range(count):
+            save_ini("writers", f'{name}_{n}', str(n))
+    threads = [threading.Thread(target=thread_writer, args=(f'thread{n}',)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for process in processes:
+        assert process.wait(timeout=60) == 0
+    pb_config = read(ini)
+    assert len(pb_config.options("writers")) == 8 * count
+    assert pb_config.get("main", "pbname") == "server1"
+    assert not Path("pbgui.ini.lock").exists()
+
+def test_edit_ini_writes_only_changes(ini):
+    with edit_ini() as pb_config:
+        pb_config.set("main", "role", "master")
+    assert load_ini("main", "role") == "master"
+    stat = ini.stat()
+    with edit_ini() as pb_config:
+        pb_config.set("main", "role", "master")
+    assert ini.stat().st_mtime_ns == stat.st_mtime_ns
+    # A failing edit leaves the file as it was
+    with pytest.raises(ValueError):
+        with edit_ini() as pb_config:
+            pb_config.set("main", "role", "slave")
+            raise ValueError("failed")
+    assert read(ini).get("main", "role") == "master"
+    assert not Path("pbgui.ini.lock").exists()
+
+def test_save_ini_defaults_keeps_set_options(ini):
+    save_ini("backtest_v7", "cpu", "8")
+    save_ini_defaults("backtest_v7", {"autostart": "False", "cpu": "1"})
+    pb_config = read(ini)
+    assert pb_config.get("backtest_v7", "cpu") == "8"
+    assert pb_config.get("backtest_v7", "autostart") == "False"
+    save_ini_defaults("optimize_v7", {"autostart": "False"})
+    assert read(ini).get("optimize_v7", "autostart") == "False"
+
+def test_delete_ini_section(ini):
+    save_ini("exchanges", "binance.swap", "[]")
+    delete_ini_section("exchanges")
+    assert not read(ini).has_section("exchanges")
+    assert load_ini("exchanges", "binance.swap") == ""
+    assert read(ini).get("main", "pbname") == "server1"
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "1000PEPEUSDT", "it's"]
+
+def test_parse_ini_list():
+    assert parse_ini_list('["BTCUSDT", "ETHUSDT"]') == (["BTCUSDT", "ETHUSDT"], False)
+    assert parse_ini_list(repr(SYMBOLS)) == (SYMBOLS, True)
+    assert parse_ini_list("[]") == ([], False)
+
+@pytest.mark.parametrize("value", ["['BTCUSDT'", "BTCUSDT, ETHUSDT", "", "{'a': 1}", '"BTCUSDT"', "__import__('os').getcwd()", "[1, 2] + [3]"])
+def test_parse_ini_list_malformed(value):
+    with pytest.raises(ValueError):
+        parse_ini_list(value)
+
+def test_legacy_list_is_rewritten_as_json(ini):
+    # Written by older pbgui versions with str(list)
+    save_ini("exchanges", "binance.swap", str(SYMBOLS))
+    assert load_ini_list("exchanges", "binance.swap") == SYMBOLS
+    assert read(ini).get("exchanges", "binance.swap") == json.dumps(SYMBOLS)
+    # The JSON loads to the same list, without another write
+    pbgui_purefunc.ini_list_cache.clear()
+    stat = ini.stat()
+    assert load_ini_list("exchanges", "binance.swap") == SYMBOLS
+    assert ini.stat().st_mtime_ns == stat.st_mtime_ns
+
+def test_malformed_list_is_empty_and_kept(ini, capsys):
+    save_ini("pbdata", "fetch_users", "['user1',")
+    assert load_ini_list("pbdata", "fetch_users") == []
+    assert "fetch_users" in capsys.readouterr().out
+    assert read(ini).get("pbdata", "fetch_users") == "['user1',"
+    assert load_ini_list("pbdata", "missing") == []
+
+def test_load_ini_list_memoized(ini):
+    save_ini_list("backtest", "view_col", ["a", "b"])
+    values = load_ini_list("backtest", "view_col")
+    values.append("c")
+    # The caller gets a copy, the memoized list is not changed
+    assert load_ini_list("backtest", "view_col") == ["a", "b"]
+    save_ini_list("backtest", "view_col", ["a"])
+    assert load_ini_list("backtest", "view_col") == ["a"]
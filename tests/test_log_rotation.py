@@ -0,0 +1,89 @@
+import gzip
+import threading
+from pathlib import Path
+from Log import LogRotator, LogHandler
+
+def read_generations(logfile: Path, backup_count: int):
+    """Lines of all generations, oldest first"""
+    lines = []
+    for generation in range(backup_count, 0, -1):
+        backup = Path(f'{logfile}.{generation}.gz')
+        if backup.exists():
+            with gzip.open(backup, "rt", encoding='utf-8') as f:
+                lines += f.read().splitlines()
+    if logfile.exists():
+        lines += logfile.read_text(encoding='utf-8').splitlines()
+    return lines
+
+def assert_all_lines(lines: list, writers: int, count: int):
+    for writer in range(writers):
+        written = [line for line in lines if line.startswith(f'writer{writer} ')]
+        assert written == [f'writer{writer} line{n}' for n in range(count)]
+
+def test_rotator_with_writers(tmp_path):
+    """Threads write while the log is renamed and compressed, every line is in one of the generations"""
+    logfile = tmp_path / "daemon.log"
+    rotator = LogRotator(logfile, max_bytes=5_000, max_age=0, backup_count=1000)
+    lock = threading.Lock()
+    log = {"file": open(logfile, "ab", 0)}
+    def reopen():
+        # Like redirect_output in the daemons, the writers pick up the new file on the next line
+        old = log["file"]
+        log["file"] = open(logfile, "ab", 0)
+        old.close()
+    def writer(n):
+        for line in range(5000):
+            with lock:
+                log["file"].write(f'writer{n} line{line}\n'.encode())
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    rotations = 0
+    while any(thread.is_alive() for thread in threads):
+        with lock:
+            rotated = rotator.rotate_if_needed(reopen)
+        rotations += rotated
+    for thread in threads:
+        thread.join()
+    rotator.compressor.wait()
+    log["file"].close()
+    assert 2 <= rotations < 1000
+    assert not list(tmp_path.glob("daemon.log.*[0-9]"))
+    lines = read_generations(logfile, 1000)
+    assert len(lines) == 20000
+    assert_all_lines(lines, 4, 5000)
+
+def test_rotator_keeps_backup_count(tmp_path):
+    logfile = tmp_path / "daemon.log"
+    rotator = LogRotator(logfile, max_bytes=10, max_age=0, backup_count=3)
+    for n in range(5):
+        logfile.write_text(f'generation {n}\n' * 2)
+        assert rotator.rotate_if_needed()
+    rotator.compressor.wait()
+    assert sorted(file.name for file in tmp_path.iterdir()) == ["daemon.log.1.gz", "daemon.log.2.gz", "daemon.log.3.gz"]
+    assert read_generations(logfile, 3) == [f'generation {n}' for n in (2, 2, 3, 3, 4, 4)]
+
+def test_log_handler_with_writers(tmp_path):
+    """LogHandler rotates with compressed generations while threads log, no line is lost"""
+    handler = LogHandler("test_log_rotation", base_dir=str(tmp_path), max_bytes=20_000, backup_count=100, compress=True)
+    logger = handler.get_logger()
+    try:
+        def writer(n):
+            for line in range(2000):
+                handler.info(f'writer{n} line{line}')
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rotating_handler = logger.handlers[0]
+        rotating_handler.rotator.wait()
+        logfile = Path(handler.get_log_path())
+        assert len(list(tmp_path.glob("debug.log.*.gz"))) >= 5
+        lines = [line.split("] ", 1)[1] for line in read_generations(logfile, 100)]
+        assert len(lines) == 8000
+        assert_all_lines(lines, 4, 2000)
+    finally:
+        for rotating_handler in logger.handlers[:]:
+            rotating_handler.close()
+            logger.removeHandler(rotating_handler)
@@ -0,0 +1,146 @@
+import json
+import os
+from pathlib import Path
+import streamlit as st
+import pytest
+import pbgui_purefunc
+from pbgui_purefunc import copy_if_changed, file_md5
+from Config import Config
+from Multi import MultiInstance, load_symbol_config
+
+class FakeInstance():
+    """The parts of an Instance generate_active_symbols reads, counts save()"""
+    def __init__(self, path, symbol: str, enabled_on: str):
+        self.user = "user1"
+        self.market_type = "futures"
+        self.symbol = symbol
+        self.multi = True
+        self.enabled_on = enabled_on
+        self.long_mode = None
+        self.short_mode = None
+        self.instance_path = str(path)
+        self._config = Config()
+        self.saves = 0
+        path.mkdir(parents=True)
+        (path / "config.json").write_text(json.dumps({"symbol": symbol}))
+
+    def save(self):
+        self.saves += 1
+
+def age(file, seconds: int = 100):
+    """Moves mtime of file to the past, a rewrite shows up as a new mtime"""
+    stat = os.stat(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 1_000_000_000))
+    return os.stat(file).st_mtime_ns
+
+def test_copy_if_changed(tmp_path):
+    source = tmp_path / "source.json"
+    destination = tmp_path / "destination.json"
+    source.write_text('{"a": 1}')
+    assert copy_if_changed(source, destination)
+    assert destination.read_text() == '{"a": 1}'
+    # Same content, destination is not written again
+    mtime = age(destination)
+    assert not copy_if_changed(source, destination)
+    assert os.stat(destination).st_mtime_ns == mtime
+    # Changed source is copied again
+    source.write_text('{"a": 2}')
+    assert copy_if_changed(source, destination)
+    assert destination.read_text() == '{"a": 2}'
+    # Changed destination is overwritten
+    destination.write_text('{"a": 3}')
+    assert copy_if_changed(source, destination)
+    assert destination.read_text() == '{"a": 2}'
+
+def test_copy_if_changed_same_size_and_mtime(tmp_path):
+    """A rewrite with the same size and mtime, like 0.5 -> 0.7 within the mtime granularity, is still copied"""
+    source = tmp_path / "source.json"
+    destination = tmp_path / "destination.json"
+    source.write_text('{"we": 0.5}')
+    mtime = age(source)
+    assert copy_if_changed(source, destination)
+    age(destination)
+    assert not copy_if_changed(source, destination)
+    source.write_text('{"we": 0.7}')
+    os.utime(source, ns=(mtime, mtime))
+    assert copy_if_changed(source, destination)
+    assert destination.read_text() == '{"we": 0.7}'
+
+def test_copy_if_changed_recent_rewrite(tmp_path):
+    """Files changed within MTIME_GRANULARITY are read again, also when mtime and ctime did not change"""
+    source = tmp_path / "source.json"
+    destination = tmp_path / "destination.json"
+    source.write_text('{"we": 0.5}')
+    assert copy_if_changed(source, destination)
+    assert str(source) not in pbgui_purefunc.md5_cache
+    with open(source, "r+", encoding='utf-8') as f:
+        f.write('{"we": 0.7}')
+    assert copy_if_changed(source, destination)
+    assert destination.read_text() == '{"we": 0.7}'
+
+def test_file_md5_cache(tmp_path, monkeypatch):
+    file = tmp_path / "file"
+    file.write_text("abc")
+    age(file)
+    digest = file_md5(file)
+    assert file_md5(tmp_path / "missing") is None
+    # Unchanged file is not read again
+    version = pbgui_purefunc.md5_cache[str(file)][0]
+    monkeypatch.setitem(pbgui_purefunc.md5_cache, str(file), (version, "cached"))
+    assert file_md5(file) == "cached"
+    file.write_text("abcd")
+    assert file_md5(file) not in (digest, "cached")
+
+def symbol_config(long_we: float):
+    return json.dumps({"long": {"enabled": True, "wallet_exposure_limit": long_we}, "short": {"enabled": False, "wallet_exposure_limit": 0.5}})
+
+def test_load_symbol_config_cache(tmp_path):
+    file = tmp_path / "BTCUSDT.json"
+    file.write_text(symbol_config(1.0))
+    # A file changed within MTIME_GRANULARITY is parsed on every call
+    assert load_symbol_config(file) is not load_symbol_config(file)
+    age(file)
+    config = load_symbol_config(file)
+    assert load_symbol_config(file) is config
+    # Changed file is parsed again
+    file.write_text(symbol_config(1.25))
+    age(file)
+    config = load_symbol_config(file)
+    assert config.long_we == 1.25 and not config.short_enabled
+    assert load_symbol_config(file) is config
+
+@pytest.fixture
+def multi(tmp_path, monkeypatch):
+    path = tmp_path / "multi" / "user1"
+    path.mkdir(parents=True)
+    multi = MultiInstance(defaults=False)
+    multi.instance_path = str(path)
+    multi._user = "user1"
+    multi._enabled_on = "server1"
+    multi._auto_gs = True
+    multi._symbols = []
+    instances = [FakeInstance(tmp_path / "instances" / symbol, symbol, "server1") for symbol in ("BTCUSDT", "ETHUSDT")]
+    monkeypatch.setattr(st.session_state, "pbgui_instances", instances, raising=False)
+    return multi, instances
+
+def test_generate_active_symbols_writes_only_changes(multi):
+    multi, instances = multi
+    symbols = multi.generate_active_symbols()
+    assert set(symbols) == {"BTCUSDT", "ETHUSDT"}
+    assert [instance.saves for instance in instances] == [0, 0]
+    copies = {instance.symbol: f'{multi.instance_path}/{instance.symbol}.json' for instance in instances}
+    assert all(json.loads(Path(file).read_text()) == {"symbol": symbol} for symbol, file in copies.items())
+    # Nothing changed, no instance is saved and no symbol config is written again
+    mtimes = {symbol: age(file) for symbol, file in copies.items()}
+    assert multi.generate_active_symbols() == symbols
+    assert [instance.saves for instance in instances] == [0, 0]
+    assert {symbol: os.stat(file).st_mtime_ns for symbol, file in copies.items()} == mtimes
+    # A changed config is copied, a new enabled_on saves every instance once
+    with open(f'{instances[0].instance_path}/config.json', "w", encoding='utf-8') as f:
+        f.write('{"symbol": "BTCUSDT", "v": 2}')
+    multi._enabled_on = "server2"
+    multi.generate_active_symbols()
+    multi.generate_active_symbols()
+    assert [instance.saves for instance in instances] == [1, 1]
+    assert json.loads(Path(copies["BTCUSDT"]).read_text()) == {"symbol": "BTCUSDT", "v": 2}
+    assert os.stat(copies["ETHUSDT"]).st_mtime_ns == mtimes["ETHUSDT"]
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+from pathlib import Path
+import pytest
+import OptimizeV7
+from OptimizeV7 import OptimizeV7AnalysisJob
+
+STUB = '''
+import sys, time
+mode = open(sys.argv[1]).read().strip()
+for i in range(3):
+    print(f"step {i}", flush=True)
+    time.sleep(0.3)
+print("warning on stderr", file=sys.stderr)
+if mode == "fail":
+    print("error: no results")
+    sys.exit(1)
+print("written best config")
+'''
+
+@pytest.fixture
+def pb7(tmp_path, monkeypatch):
+    """A pb7 directory with a stub extract_best_config.py that runs about one second"""
+    tools = tmp_path / "pb7" / "src" / "tools"
+    tools.mkdir(parents=True)
+    (tools / "extract_best_config.py").write_text(STUB)
+    monkeypatch.setattr(OptimizeV7, "pb7dir", lambda: str(tmp_path / "pb7"))
+    monkeypatch.setattr(OptimizeV7, "pb7venv", lambda: sys.executable)
+    monkeypatch.setattr(OptimizeV7, "PBGDIR", tmp_path)
+    # JobRunner.py runs from the pbgui directory
+    (tmp_path / "JobRunner.py").symlink_to(Path(__file__).resolve().parent.parent / "JobRunner.py")
+    return tmp_path
+
+def wait_done(job, timeout=20):
+    end = time.time() + timeout
+    while job.status() == "running" and time.time() < end:
+        time.sleep(0.1)
+    return job.status()
+
+def result_file(pb7, content="ok"):
+    file = pb7 / "result.txt"
+    file.write_text(content)
+    return file
+
+def test_submit_does_not_block_and_deduplicates(pb7):
+    file = result_file(pb7)
+    job = OptimizeV7AnalysisJob(file)
+    start = time.time()
+    assert job.submit()
+    assert time.time() - start < 0.5
+    # A second request for the same result finds the running job
+    again = OptimizeV7AnalysisJob(file)
+    assert again.job_id == job.job_id
+    assert again.status() == "running"
+    assert not again.submit()
+    assert wait_done(job) == "complete"
+    assert "written best config" in job.output()
+    assert job.progress()["lines"] == 4
+    assert not OptimizeV7AnalysisJob(file).submit()
+
+def test_changed_result_is_a_new_job(pb7):
+    file = result_file(pb7)
+    job = OptimizeV7AnalysisJob(file)
+    os.utime(file, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+    assert OptimizeV7AnalysisJob(file).job_id != job.job_id
+
+def test_failed_job_can_be_submitted_again(pb7):
+    file = result_file(pb7, "fail")
+    job = OptimizeV7AnalysisJob(file)
+    assert job.submit()
+    assert wait_done(job) == "error"
+    assert job.progress()["returncode"] == 1
+    assert job.submit()
+    assert job.status() == "running"
+    assert wait_done(job) == "error"
+
+def test_stderr_warning_is_not_an_error(pb7):
+    job = OptimizeV7AnalysisJob(result_file(pb7))
+    job.submit()
+    assert wait_done(job) == "complete"
+    assert "warning" in job.error_output()
+
+def test_quick_job_is_not_shown_running(pb7):
+    """JobRunner finishing before submit returns keeps its finished progress"""
+    tools = pb7 / "pb7" / "src" / "tools"
+    (tools / "extract_best_config.py").write_text('print("written best config")\n')
+    job = OptimizeV7AnalysisJob(result_file(pb7))
+    assert job.submit()
+    assert wait_done(job) == "complete"
+    time.sleep(0.5)
+    progress = job.progress()
+    assert progress["state"] == "finished" and progress["pid"]
+    assert job.status() == "complete"
+
+def test_job_runner_not_started(pb7, monkeypatch):
+    """Progress written by submit only counts as running until JobRunner should have started"""
+    monkeypatch.setattr(OptimizeV7.subprocess, "Popen", lambda *args, **kwargs: None)
+    job = OptimizeV7AnalysisJob(result_file(pb7))
+    assert job.submit()
+    assert job.progress()["pid"] is None
+    assert job.status() == "running"
+    assert not job.submit()
+    monkeypatch.setattr(OptimizeV7AnalysisJob, "STARTUP_TIMEOUT", 0)
+    assert job.status() == "error"
@@ -0,0 +1,121 @@
+import glob
+import gzip
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+import pytest
+import PBRemote as pbremote
+from PBRemote import PBRemote, RemoteServer, alive_delta, apply_alive_delta, CAPABILITIES_FILE, ALIVE_FULL_EVERY
+
+INI = """[main]
+pbname = server1
+role = master
+pb7dir = {pb7dir}
+pb7venv = {python}
+
+[pbremote]
+transport = local
+local_path = {bucket}
+bucket = local:
+"""
+
+FULL = {
+    "timestamp": 100, "name": "server1", "cpu": 5.0, "reboot": False,
+    "monitor": [
+        {"u": "bot1", "p": 1.0, "e": 2},
+        {"u": "bot2", "p": 3.0, "e": 0},
+    ],
+}
+
+class Clock():
+    """datetime with now() one minute later on every call, every alive() writes a new file"""
+    ts = 1800000000
+    @classmethod
+    def now(cls):
+        cls.ts += 60
+        return datetime.fromtimestamp(cls.ts)
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    (tmp_path / "pb7").mkdir()
+    pbgdir = tmp_path / "server1"
+    pbgdir.mkdir()
+    (pbgdir / "pbgui.ini").write_text(INI.format(pb7dir=tmp_path / "pb7", python=sys.executable, bucket=tmp_path / "bucket"))
+    monkeypatch.chdir(pbgdir)
+    monkeypatch.setattr(pbremote, "datetime", Clock)
+    return PBRemote()
+
+def add_peer(remote: PBRemote, name: str, alive_schema: int = None):
+    """A remote server, alive_schema None is an older pbgui without capabilities file"""
+    path = Path(f'{remote.remote_path}/cmd_{name}')
+    path.mkdir(parents=True)
+    if alive_schema:
+        (path / CAPABILITIES_FILE).write_text(json.dumps({"alive_schema": alive_schema}))
+    remote.update_remote_servers()
+
+def heartbeats(remote: PBRemote, count: int):
+    for n in range(count):
+        remote.alivets = 0
+        remote.alive()
+
+def read(file):
+    with gzip.open(file, "rt", encoding='utf-8') as f:
+        return json.load(f)
+
+def test_delta_roundtrip():
+    cfg = json.loads(json.dumps(FULL))
+    cfg["timestamp"] = 160
+    cfg["monitor"][0].pop("e")
+    cfg["monitor"][1]["p"] = 4.0
+    cfg["monitor"].append({"u": "bot3", "p": 0.0})
+    cfg.pop("reboot")
+    delta = alive_delta(FULL, cfg)
+    assert delta["type"] == "delta" and delta["base"] == 100
+    # Changed instances are sent whole, removed keys are listed
+    assert delta["monitor"]["d"] == {"0": {"u": "bot1", "p": 1.0}, "1": {"u": "bot2", "p": 4.0, "e": 0}, "2": {"u": "bot3", "p": 0.0}}
+    assert delta["del"] == ["reboot"]
+    assert "cpu" not in delta
+    rebuilt = apply_alive_delta(FULL, delta)
+    for key in ("v", "type", "base"):
+        rebuilt.pop(key)
+    assert rebuilt == cfg
+
+def test_delta_removed_instance():
+    cfg = json.loads(json.dumps(FULL))
+    cfg["timestamp"] = 160
+    cfg["monitor"].pop(0)
+    rebuilt = apply_alive_delta(FULL, alive_delta(FULL, cfg))
+    assert rebuilt["monitor"] == cfg["monitor"]
+
+def test_only_full_snapshots_for_older_servers(remote):
+    add_peer(remote, "server2", alive_schema=2)
+    add_peer(remote, "old")
+    heartbeats(remote, ALIVE_FULL_EVERY + 2)
+    files = sorted(Path(remote.cmd_path).glob("alive_*"))
+    assert len(files) == 9
+    assert all(file.name.endswith(".cmd.gz") and read(file)["type"] == "full" for file in files)
+
+def test_deltas_when_all_servers_read_them(remote):
+    add_peer(remote, "server2", alive_schema=2)
+    heartbeats(remote, 5)
+    files = sorted(Path(remote.cmd_path).glob("alive_*"))
+    assert [file.name.split(".", 1)[1] for file in files] == ["cmd.gz"] + ["delta.gz"] * 4
+    # An older pbgui globs alive_*.cmd* and finds only the full snapshot
+    assert glob.glob(f'{remote.cmd_path}/alive_*.cmd*') == [str(files[0])]
+    # A new server reads the newest delta on top of the full snapshot
+    server = RemoteServer(remote.cmd_path)
+    server.load()
+    assert server.ts == Clock.ts
+    # An older server shows up, the next alive is a full snapshot again
+    add_peer(remote, "old")
+    heartbeats(remote, 1)
+    newest = sorted(Path(remote.cmd_path).glob("alive_*"), key=lambda file: file.name.split(".")[0])[-1]
+    assert newest.name.endswith(".cmd.gz")
+    assert read(newest)["type"] == "full"
+
+def test_capabilities_are_published(remote):
+    assert json.loads(Path(f'{remote.cmd_path}/{CAPABILITIES_FILE}').read_text()) == {"alive_schema": 2}
+    heartbeats(remote, 1)
+    bucket = Path(remote.transport.root) / "local" / "cmd_server1"
+    assert (bucket / CAPABILITIES_FILE).exists()
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+import pytest
+import PBRemote as pbremote
+from PBRemote import PBRemote
+
+INI = """[main]
+pbname = server1
+role = master
+pb7dir = {pb7dir}
+pb7venv = {python}
+
+[pbremote]
+transport = local
+local_path = {bucket}
+bucket = local:
+"""
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    pb7dir = tmp_path / "pb7"
+    pb7dir.mkdir()
+    (pb7dir / "api-keys.json").write_text('{"user1": {"key": "a"}}')
+    pbgdir = tmp_path / "server1"
+    pbgdir.mkdir()
+    (pbgdir / "pbgui.ini").write_text(INI.format(pb7dir=pb7dir, python=sys.executable, bucket=tmp_path / "bucket"))
+    monkeypatch.chdir(pbgdir)
+    remote = PBRemote()
+    Path(f'{remote.remote_path}/cmd_server2').mkdir(parents=True)
+    remote.update_remote_servers()
+    return remote
+
+def alive(remote: PBRemote, timestamp: int, api_md5: str):
+    """server2 reports api_md5 in a new alive file"""
+    cfg = {"v": 2, "type": "full", "name": "server2", "timestamp": timestamp, "api_md5": api_md5}
+    with gzip.open(Path(f'{remote.remote_path}/cmd_server2/alive_{timestamp}.cmd.gz'), "wt", encoding='utf-8') as f:
+        json.dump(cfg, f)
+
+def test_ack_follows_the_newest_alive(remote):
+    api_md5 = remote.api_md5
+    server = remote.servers["server2"]
+    assert not remote.is_api_acked(server, api_md5)
+    assert remote.unsynced_api == 1
+    alive(remote, 1800000000, api_md5)
+    assert remote.is_api_acked(server, api_md5)
+    assert remote.unsynced_api == 0
+    assert remote.check_if_api_synced()
+    # server2 reports other api-keys later (restored backup, manual edit), it is not synced anymore
+    alive(remote, 1800000060, "other")
+    assert not remote.is_api_acked(server, api_md5)
+    assert remote.unsynced_api == 1
+    assert not remote.check_if_api_synced()
+
+def test_ack_follows_changed_local_api_keys(remote):
+    server = remote.servers["server2"]
+    alive(remote, 1800000000, remote.api_md5)
+    assert remote.unsynced_api == 0
+    (Path(remote.pb7dir) / "api-keys.json").write_text('{"user1": {"key": "b"}, "user2": {"key": "c"}}')
+    new_md5 = remote.api_md5
+    assert not remote.is_api_acked(server, new_md5)
+    alive(remote, 1800000060, new_md5)
+    assert remote.is_api_acked(server, new_md5)
+
+def test_acknowledgement_is_remembered(remote, monkeypatch):
+    """Repeated checks of an idle master neither hash the api-keys again nor load the servers"""
+    api_file = Path(remote.pb7dir) / "api-keys.json"
+    os.utime(api_file, (1700000000, 1700000000))
+    api_md5 = remote.api_md5
+    alive(remote, 1800000000, api_md5)
+    server = remote.servers["server2"]
+    assert remote.is_api_acked(server, api_md5)
+    assert remote.api_acked == {"server2": api_md5}
+    path = Path(server.path)
+    os.utime(path, (1700000000, 1700000000))
+    remote.update_remote_servers()
+    md5_calls = []
+    md5 = hashlib.md5
+    monkeypatch.setattr(hashlib, "md5", lambda *args: md5_calls.append(args) or md5(*args))
+    loads = []
+    load = pbremote.RemoteServer.load
+    monkeypatch.setattr(pbremote.RemoteServer, "load", lambda server: loads.append(server.name) or load(server))
+    for _ in range(5):
+        assert remote.check_if_api_synced()
+        assert remote.unsynced_api == 0
+    assert md5_calls == []
+    assert loads == []
+    # Another md5 in a new alive clears the acknowledgement
+    alive(remote, 1800000060, "other")
+    os.utime(path, (1700000060, 1700000060))
+    assert not remote.is_api_acked(server, api_md5)
+    assert "server2" not in remote.api_acked
+    assert md5_calls == []
@@ -0,0 +1,120 @@
+"""
+Two PBRemote processes share one local bucket with latency and eventual consistency.
+Each runs the main loop in its own pbgui directory, like two servers syncing through rclone.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from pbgui_purefunc import write_json_atomic
+from RemoteTransport import LocalTransport
+from Status import InstancesStatus
+
+PBGUI = Path(__file__).resolve().parent.parent
+
+INI = """[main]
+pbname = {name}
+role = master
+pb7dir = {pb7dir}
+pb7venv = {python}
+
+[pbremote]
+transport = local
+local_path = {bucket}
+local_latency = 0.02
+local_consistency_delay = 0.3
+bucket = local:
+"""
+
+NODE = """
+from pathlib import Path
+from time import sleep
+from datetime import datetime
+from PBRemote import PBRemote
+from DaemonMetrics import DaemonMetrics
+remote = PBRemote()
+remote.startts = round(datetime.now().timestamp())
+metrics = DaemonMetrics("PBRemote")
+while not Path("stop").exists():
+    remote.cycle(metrics)
+    sleep(0.05)
+"""
+
+def wait_for(condition, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+@pytest.fixture
+def servers(tmp_path):
+    """Starts PBRemote for server1 and server2, stops them after the test"""
+    (tmp_path / "pb7").mkdir()
+    processes = {}
+    env = dict(os.environ, PYTHONPATH=str(PBGUI))
+    for name in ("server1", "server2"):
+        pbgdir = tmp_path / name
+        pbgdir.mkdir()
+        (pbgdir / "pbgui.ini").write_text(INI.format(name=name, pb7dir=tmp_path / "pb7", python=sys.executable, bucket=tmp_path / "bucket"))
+        processes[name] = subprocess.Popen([sys.executable, "-c", NODE], cwd=pbgdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    yield tmp_path
+    outputs = {}
+    for name, process in processes.items():
+        (tmp_path / name / "stop").touch()
+    for name, process in processes.items():
+        outputs[name] = process.communicate(timeout=30)[0]
+        assert process.returncode == 0, outputs[name]
+        assert "Traceback" not in outputs[name], outputs[name]
+
+def test_status_and_alive_propagate(servers):
+    server1 = servers / "server1"
+    server2 = servers / "server2"
+    # Every server sees the alive file of the other one
+    assert wait_for(lambda: list(server1.glob("data/remote/cmd_server2/alive_*.cmd*")))
+    assert wait_for(lambda: list(server2.glob("data/remote/cmd_server1/alive_*.cmd*")))
+    # A new v7 configuration and status on server1, written like PBRun does
+    config = server1 / "data" / "run_v7" / "bot1" / "config.json"
+    config.parent.mkdir(parents=True)
+    write_json_atomic(config, {"live": {"user": "bot1"}})
+    status = InstancesStatus(str(server1 / "data" / "cmd" / "status_v7.json"))
+    status.pbname = "server1"
+    status.activate_pbname = "server1"
+    status.save()
+    remote_config = server2 / "data" / "remote" / "run_v7_server1" / "bot1" / "config.json"
+    assert wait_for(remote_config.exists)
+    assert json.loads(remote_config.read_text()) == {"live": {"user": "bot1"}}
+    remote_status = InstancesStatus(str(server2 / "data" / "remote" / "cmd_server1" / "status_v7.json"))
+    assert remote_status.status_seq == status.status_seq
+    assert remote_status.origin == "server1"
+    # The status of the new configuration is passed on to PBRun of server2
+    assert wait_for(lambda: list(server2.glob("data/cmd/update_status_*.cmd")))
+
+def test_settle_during_syncs(tmp_path):
+    """settle() and syncs of other threads run at the same time without errors or lost files"""
+    bucket = LocalTransport(tmp_path / "bucket", consistency_delay=0.01)
+    errors = []
+    def worker(n):
+        source = tmp_path / f'source{n}'
+        source.mkdir()
+        for i in range(20):
+            (source / f'{i}.json').write_text(json.dumps({"n": n, "i": i}))
+            if not bucket.sync(source, f'local:dir{n}'):
+                errors.append(n)
+            bucket.settle()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    time.sleep(0.02)
+    bucket.settle()
+    for n in range(8):
+        assert len(bucket.list_files(bucket.resolve(f'local:dir{n}'))) == 20
+    assert not list((tmp_path / "bucket" / LocalTransport.STAGING).iterdir())
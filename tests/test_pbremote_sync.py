@@ -0,0 +1,225 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import pytest
+import PBRemote as pbremote
+from pbgui_purefunc import write_json_atomic
+from PBRemote import PBRemote, snapshot_tree, calculate_manifest
+from Status import InstancesStatus
+
+INI = """[main]
+pbname = {name}
+role = {role}
+pb7dir = {pb7dir}
+pb7venv = {python}
+
+[pbremote]
+transport = local
+local_path = {bucket}
+bucket = local:
+"""
+
+@pytest.fixture
+def nodes(tmp_path, monkeypatch):
+    """Two pbgui directories, sender (slave) and receiver (master), with a local directory as bucket"""
+    (tmp_path / "pb7").mkdir()
+    for name, role in (("sender", "slave"), ("receiver", "master")):
+        pbgdir = tmp_path / name
+        pbgdir.mkdir()
+        (pbgdir / "pbgui.ini").write_text(INI.format(name=name, role=role, pb7dir=tmp_path / "pb7", python=sys.executable, bucket=tmp_path / "bucket"))
+    remotes = {}
+    def open_node(name):
+        monkeypatch.chdir(tmp_path / name)
+        if name not in remotes:
+            remotes[name] = PBRemote()
+        return remotes[name]
+    return open_node
+
+def cycle(remote: PBRemote):
+    """One run of the PBRemote main loop"""
+    remote.sync_up()
+    remote.alive()
+    remote.sync_status_down()
+    remote.update_remote_servers()
+    remote.sync_servers_down()
+
+def connect(nodes):
+    """Both nodes publish their alive file and the receiver adds the sender"""
+    sender = nodes("sender")
+    cycle(sender)
+    receiver = nodes("receiver")
+    cycle(receiver)
+    assert "sender" in receiver.servers
+    return sender, receiver
+
+def write_config(name: str, content: dict):
+    file = Path(f'{Path.cwd()}/data/run_v7/{name}/config.json')
+    file.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(file, content)
+
+def write_status(remote: PBRemote):
+    """Saves a new status_v7.json like PBRun in its own process"""
+    status = InstancesStatus(remote.local_run.instances_status_v7.status_file)
+    status.pbname = remote.name
+    status.save()
+
+def test_snapshot_tree_mirrors_synced_files(tmp_path):
+    source = tmp_path / "run_v7"
+    (source / "bot1").mkdir(parents=True)
+    (source / "bot1" / "config.json").write_text('{"a": 1}')
+    (source / "bot1" / "passivbot.log").write_text("log")
+    destination = tmp_path / "upload"
+    manifest = snapshot_tree(source, destination, ["*.json"])
+    assert manifest == calculate_manifest(source, ["*.json"])
+    assert not (destination / "bot1" / "passivbot.log").exists()
+    # Changes after the snapshot do not change the snapshot or its manifest
+    (source / "bot1" / "config.json").write_text('{"a": 2}')
+    assert calculate_manifest(destination, ["*.json"]) == manifest
+    (source / "bot1" / "config.json").unlink()
+    assert snapshot_tree(source, destination, ["*.json"])["files"] == {}
+    assert not (destination / "bot1").exists()
+
+def test_idle_cycles_do_not_sync_configurations(nodes):
+    sender, receiver = connect(nodes)
+    nodes("sender")
+    write_config("bot1", {"live": {"user": "bot1"}})
+    write_status(sender)
+    cycle(sender)
+    manifest = json.loads(Path("data/cmd/manifest_run_v7.json").read_text())
+    nodes("receiver")
+    cycle(receiver)
+    assert json.loads(Path("data/remote/run_v7_sender/bot1/config.json").read_text()) == {"live": {"user": "bot1"}}
+    assert receiver.servers["sender"]._manifest_applied["run_v7"] == manifest["hash"]
+    # Idle: only the status sync down runs
+    for remote in (sender, receiver):
+        nodes(remote.name)
+        calls = remote.transport.calls
+        for _ in range(5):
+            cycle(remote)
+        assert remote.transport.calls - calls == 5
+    # A new status with unchanged configurations skips the configuration sync on both sides
+    nodes("sender")
+    calls = sender.transport.calls
+    write_status(sender)
+    cycle(sender)
+    # snapshot upload and status upload, then the status sync down
+    assert sender.transport.calls - calls == 3
+    nodes("receiver")
+    calls = receiver.transport.calls
+    cycle(receiver)
+    cycle(receiver)
+    assert receiver.transport.calls - calls == 2
+    # Every new status is passed on to PBRun
+    assert len(list(Path("data/cmd").glob("update_status_*.cmd"))) == 2
+
+def test_failed_sync_down_is_retried(nodes, monkeypatch):
+    sender, receiver = connect(nodes)
+    nodes("sender")
+    write_config("bot1", {"live": {"user": "bot1"}})
+    write_status(sender)
+    cycle(sender)
+    nodes("receiver")
+    sync = receiver.transport.sync
+    def failing_sync(source, destination, include=None, exclude=None):
+        if "run_v7_" in str(source):
+            return False
+        return sync(source, destination, include, exclude)
+    monkeypatch.setattr(receiver.transport, "sync", failing_sync)
+    cycle(receiver)
+    server = receiver.servers["sender"]
+    assert "run_v7" not in server._manifest_applied
+    assert "run_v7" in server._sync_failed
+    assert not Path("data/remote/run_v7_sender/bot1/config.json").exists()
+    monkeypatch.setattr(receiver.transport, "sync", sync)
+    cycle(receiver)
+    assert server._manifest_applied["run_v7"]
+    assert not server._sync_failed
+    assert Path("data/remote/run_v7_sender/bot1/config.json").exists()
+
+def test_failed_sync_up_is_retried(nodes, monkeypatch):
+    sender = nodes("sender")
+    write_config("bot1", {"live": {"user": "bot1"}})
+    write_status(sender)
+    sync = sender.transport.sync
+    monkeypatch.setattr(sender.transport, "sync", lambda *args, **kwargs: False)
+    sender.sync_up()
+    assert "run_v7" in sender._sync_failed
+    monkeypatch.setattr(sender.transport, "sync", sync)
+    sender.sync_up()
+    assert not sender._sync_failed
+    assert (Path(sender.transport.root) / "local" / "run_v7_sender" / "bot1" / "config.json").exists()
+
+def test_status_files_are_synced_up_together(nodes, monkeypatch):
+    sender = nodes("sender")
+    write_config("bot1", {"live": {"user": "bot1"}})
+    for status in (sender.local_run.instances_status_v7, sender.local_run.instances_status, sender.local_run.instances_status_single):
+        new_status = InstancesStatus(status.status_file)
+        new_status.pbname = sender.name
+        new_status.save()
+    destinations = []
+    sync = sender.transport.sync
+    def recording_sync(source, destination, include=None, exclude=None):
+        destinations.append((str(destination), include))
+        return sync(source, destination, include, exclude)
+    monkeypatch.setattr(sender.transport, "sync", recording_sync)
+    sender.sync_up()
+    cmd_syncs = [include for destination, include in destinations if destination.endswith("cmd_sender")]
+    assert len(cmd_syncs) == 1
+    assert all(file in cmd_syncs[0] for spath in ("run_v7", "multi", "instances") for file in pbremote.STATUS_FILES[spath])
+    bucket = Path(sender.transport.root) / "local" / "cmd_sender"
+    assert sorted(file.name for file in bucket.iterdir() if file.name.startswith("status")) == ["status.json", "status_single.json", "status_v7.json"]
+    assert not sender._sync_failed
+    # Nothing new, nothing synced
+    destinations.clear()
+    sender.sync_up()
+    assert destinations == []
+
+def test_api_keys_are_synced_one_server_after_the_other(nodes, monkeypatch):
+    receiver = nodes("receiver")
+    for name in ("server2", "server3", "server4"):
+        Path(f'{receiver.remote_path}/cmd_{name}').mkdir(parents=True)
+    receiver.update_remote_servers()
+    assert len(receiver.servers) == 3
+    running = []
+    overlaps = []
+    def sync_api(server):
+        running.append(server.name)
+        if len(running) > 1:
+            overlaps.append(list(running))
+        time.sleep(0.05)
+        running.remove(server.name)
+    monkeypatch.setattr(pbremote.RemoteServer, "sync_api", sync_api)
+    receiver.sync_servers_down()
+    assert not overlaps
+
+def test_idle_servers_are_not_loaded_again(nodes, monkeypatch):
+    receiver = nodes("receiver")
+    path = Path(f'{receiver.remote_path}/cmd_server2')
+    path.mkdir(parents=True)
+    receiver.update_remote_servers()
+    loads = []
+    load = pbremote.RemoteServer.load
+    def counting_load(server):
+        loads.append(server.name)
+        return load(server)
+    monkeypatch.setattr(pbremote.RemoteServer, "load", counting_load)
+    # Just changed: loaded on every pass, a second change could keep the same mtime
+    receiver.update_remote_servers()
+    assert loads == ["server2"]
+    os.utime(path, (1700000000, 1700000000))
+    receiver.update_remote_servers()
+    loads.clear()
+    for _ in range(3):
+        receiver.update_remote_servers()
+        receiver.sync_servers_down()
+        receiver.check_if_api_synced()
+    assert loads == []
+    # A new alive file changes the directory
+    (path / "alive_1800000000.cmd").write_text(json.dumps({"name": "server2", "timestamp": 1800000000}))
+    os.utime(path, (1700000060, 1700000060))
+    receiver.update_remote_servers()
+    receiver.sync_servers_down()
+    assert loads == ["server2"]
+    assert receiver.servers["server2"].ts == 1800000000
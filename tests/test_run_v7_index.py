@@ -0,0 +1,109 @@
+import json
+import os
+from pathlib import Path
+import pytest
+import streamlit as st
+import Multi
+import RunV7
+from RunV7 import V7Instances, load_v7_index, v7_index_cache
+from Config import ConfigV7
+
+def write_config(pbgdir: Path, user: str, twe: float = 1.0, note: str = ""):
+    file = pbgdir / f'data/run_v7/{user}/config.json'
+    file.parent.mkdir(parents=True, exist_ok=True)
+    config = {
+        "pbgui": {"version": 3, "enabled_on": "server1", "note": note},
+        "live": {"user": user},
+        "bot": {"long": {"total_wallet_exposure_limit": twe, "n_positions": 5}, "short": {"total_wallet_exposure_limit": 0.0}},
+    }
+    file.write_text(json.dumps(config))
+    return file
+
+def age(file: Path):
+    """Older than MTIME_GRANULARITY, so the index cache trusts the mtime of the file"""
+    os.utime(file, (1700000000, 1700000000))
+
+@pytest.fixture
+def pbgdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(RunV7, "PBGDIR", tmp_path)
+    monkeypatch.setattr(st.session_state, "remote", object(), raising=False)
+    v7_index_cache.clear()
+    return tmp_path
+
+@pytest.fixture
+def no_full_config(monkeypatch):
+    """Fails the test if a full config.json is parsed"""
+    def load_config(self):
+        raise AssertionError(f'full config parsed: {self.config_file}')
+    monkeypatch.setattr(ConfigV7, "load_config", load_config)
+
+def test_list_reads_index_only(pbgdir, no_full_config):
+    for n in range(3):
+        write_config(pbgdir, f'bot{n}', twe=n + 0.5, note=f'note {n}')
+    instances = V7Instances()
+    assert instances.list() == ["bot0", "bot1", "bot2"]
+    for n, instance in enumerate(instances):
+        # Everything the list page shows
+        assert (instance.version, instance.enabled_on, instance.note) == (3, "server1", f'note {n}')
+        assert instance.twe["long"] == (n + 0.5, 5)
+        assert instance._config is None and instance._users is None
+
+def test_open_parses_full_config(pbgdir):
+    write_config(pbgdir, "bot1", twe=0.7)
+    instance = list(V7Instances())[0]
+    assert instance._config is None
+    assert instance.config.bot.long.total_wallet_exposure_limit == 0.7
+    assert instance.config.live.user == "bot1"
+
+def test_edited_config_is_indexed_again(pbgdir):
+    file = write_config(pbgdir, "bot1", twe=0.5)
+    age(file)
+    assert load_v7_index(file)["long_twe"] == 0.5
+    assert load_v7_index(file) is load_v7_index(file)
+    # Same size, written right after the first version
+    write_config(pbgdir, "bot1", twe=0.7)
+    assert load_v7_index(file)["long_twe"] == 0.7
+    assert list(V7Instances())[0].twe["long"] == (0.7, 5)
+
+def test_deleted_config_disappears(pbgdir):
+    file = write_config(pbgdir, "bot1")
+    age(file)
+    write_config(pbgdir, "bot2")
+    assert V7Instances().list() == ["bot1", "bot2"]
+    file.unlink()
+    assert load_v7_index(file) is None
+    assert str(file) not in v7_index_cache
+    assert V7Instances().list() == ["bot2"]
+
+def test_broken_config(pbgdir, capsys):
+    file = write_config(pbgdir, "bot1")
+    file.write_text('{"pbgui": ')
+    assert load_v7_index(file) is None
+    assert "Error loading v7 config" in capsys.readouterr().out
+    # Still listed, so it can be opened and fixed
+    assert V7Instances().list() == ["bot1"]
+
+def write_multi(pbgdir: Path, user: str, note: str):
+    file = pbgdir / f'data/multi/{user}/multi.hjson'
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(json.dumps({"user": user, "version": 2, "enabled_on": "server1", "note": note}))
+    return file
+
+def test_multi_list_is_lazy(pbgdir, monkeypatch):
+    def users():
+        raise AssertionError("Users loaded")
+    monkeypatch.setattr(Multi, "Users", users)
+    monkeypatch.setattr(st.session_state, "pbgui_instances", [], raising=False)
+    Multi.multi_config_cache.clear()
+    file = write_multi(pbgdir, "bot1", "old")
+    age(file)
+    instances = Multi.MultiInstances()
+    assert instances.list() == ["bot1"]
+    assert [(instance.version, instance.note) for instance in instances] == [(2, "old")]
+    assert all(instance._default_config is None for instance in instances)
+    # Same size, written right after the first version
+    write_multi(pbgdir, "bot1", "new")
+    assert [instance.note for instance in Multi.MultiInstances()] == ["new"]
+    file.unlink()
+    assert Multi.MultiInstances().list() == []
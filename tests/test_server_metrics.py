@@ -0,0 +1,71 @@
+from collections import namedtuple
+import pytest
+import ServerMetrics
+from ServerMetrics import ServerMetrics as Metrics, bucket_start, server_sample, RETENTION
+
+# 2024-01-01 00:00:00 UTC, the start of a 1m and a 1h bucket
+T0 = 1704067200
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return Metrics()
+
+def sample(cpu, mem=10.0, swap=0.0, disk=50.0):
+    return {"cpu": cpu, "mem": mem, "swap": swap, "disk": disk}
+
+def test_bucket_start():
+    assert bucket_start(T0, 60) == T0
+    assert bucket_start(T0 + 59, 60) == T0
+    assert bucket_start(T0 + 60, 60) == T0 + 60
+    assert bucket_start(T0 + 3599, 3600) == T0
+    assert bucket_start(float(T0 + 61.9), 60) == T0 + 60
+
+def test_server_sample_from_psutil_values():
+    vmem = namedtuple("svmem", "total available percent used free")(8, 4, 42.5, 4, 4)
+    swap = namedtuple("sswap", "total used free percent sin sout")(2, 1, 1, 50.0, 0, 0)
+    disk = namedtuple("sdiskusage", "total used free percent")(100, 70, 30, 70.0)
+    assert server_sample(12, vmem, swap, disk) == {"cpu": 12.0, "mem": 42.5, "swap": 50.0, "disk": 70.0}
+    # Alive files carry the tuples as JSON lists
+    assert server_sample(12, list(vmem), list(swap), list(disk)) == server_sample(12, vmem, swap, disk)
+
+def test_minute_buckets_average_and_max(metrics):
+    metrics.add("server1", T0 + 5, sample(10))
+    metrics.add("server1", T0 + 30, sample(30, mem=20.0))
+    metrics.add("server1", T0 + 65, sample(50))
+    rows = metrics.fetch("server1", "1m")
+    assert [row["timestamp"] for row in rows] == [T0, T0 + 60]
+    assert rows[0]["cpu"] == pytest.approx(20.0)
+    assert rows[0]["cpu_max"] == 30.0
+    assert rows[0]["mem"] == pytest.approx(15.0)
+    assert rows[0]["mem_max"] == 20.0
+    assert rows[1]["cpu"] == rows[1]["cpu_max"] == 50.0
+
+def test_hour_bucket_holds_all_samples_of_the_hour(metrics):
+    for minute in range(60):
+        metrics.add("server1", T0 + minute * 60, sample(minute))
+    metrics.add("server1", T0 + 3600, sample(100))
+    assert len(metrics.fetch("server1", "1m")) == 61
+    hours = metrics.fetch("server1", "1h")
+    assert [row["timestamp"] for row in hours] == [T0, T0 + 3600]
+    # mean of 0..59
+    assert hours[0]["cpu"] == pytest.approx(29.5)
+    assert hours[0]["cpu_max"] == 59.0
+    assert hours[1]["cpu"] == 100.0
+
+def test_fetch_since_and_server(metrics):
+    metrics.add("server1", T0, sample(1))
+    metrics.add("server1", T0 + 120, sample(2))
+    metrics.add("server2", T0 + 120, sample(3))
+    assert [row["cpu"] for row in metrics.fetch("server1", "1m", since=T0 + 60)] == [2.0]
+    assert [row["cpu"] for row in metrics.fetch("server2", "1m")] == [3.0]
+    assert metrics.fetch("unknown", "1m") == []
+
+def test_prune_keeps_retention(metrics, monkeypatch):
+    monkeypatch.setattr(ServerMetrics, "PRUNE_EVERY", 2)
+    old = T0 - RETENTION["1m"] - 60
+    metrics.add("server1", old, sample(1))
+    metrics.add("server1", T0, sample(2))
+    # The old minute bucket is gone, its hour bucket is still within the 1h retention
+    assert [row["timestamp"] for row in metrics.fetch("server1", "1m")] == [T0]
+    assert len(metrics.fetch("server1", "1h")) == 2
@@ -0,0 +1,145 @@
+import json
+import os
+from pathlib import Path
+import pytest
+from pbgui_purefunc import write_json_atomic
+from Status import InstancesStatus, InstanceStatus
+
+def writer(file: Path, pbname: str, bots: list):
+    """A status of bots saved by pbname, like PBRun or the GUI of server pbname"""
+    status = InstancesStatus(str(file))
+    status.pbname = pbname
+    status.activate_pbname = pbname
+    for name in bots:
+        instance = InstanceStatus()
+        instance.name = name
+        instance.version = 1
+        instance.multi = False
+        instance.enabled_on = pbname
+        instance.running = True
+        status.add(instance)
+    return status
+
+def publish(source: Path, destination: Path):
+    """Copies a saved status to destination like the sync to another server, always with a new mtime"""
+    content = source.read_bytes()
+    stat = destination.stat() if destination.exists() else None
+    destination.write_bytes(content)
+    if stat:
+        os.utime(destination, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+@pytest.fixture
+def files(tmp_path):
+    return tmp_path / "server1.json", tmp_path / "server2.json", tmp_path / "remote.json"
+
+def test_newer_seq_is_applied_once(files):
+    local, _, remote = files
+    status = writer(local, "server1", ["bot1"])
+    status.save()
+    publish(local, remote)
+    reader = InstancesStatus(str(remote))
+    assert reader.status_seq == 1
+    assert not reader.has_new_status()
+    status.add(writer(local, "server1", ["bot2"]).find_name("bot2"))
+    status.save()
+    publish(local, remote)
+    assert reader.has_new_status()
+    assert reader.status_seq == 2
+    assert reader.find_name("bot2")
+    assert not reader.has_new_status()
+
+def test_older_status_out_of_order_is_ignored(files):
+    local, _, remote = files
+    status = writer(local, "server1", ["bot1"])
+    status.save()
+    old = local.read_bytes()
+    status.save()
+    publish(local, remote)
+    reader = InstancesStatus(str(remote))
+    assert reader.status_seq == 2
+    # A late sync brings back the status of seq 1
+    remote.write_bytes(old)
+    os.utime(remote, ns=(0, remote.stat().st_mtime_ns + 1_000_000))
+    assert not reader.has_new_status()
+    assert reader.status_seq == 2
+
+def test_older_status_from_another_origin_is_ignored(files):
+    local, other, remote = files
+    status = writer(local, "server1", ["bot1"])
+    status.save()
+    publish(local, other)
+    # server2 continues from seq 1, server1 saves twice more
+    stale = writer(other, "server2", ["bot9"])
+    stale.save()
+    status.save()
+    status.save()
+    publish(local, remote)
+    reader = InstancesStatus(str(remote))
+    assert reader.status_seq == 3
+    publish(other, remote)
+    assert not reader.has_new_status()
+    assert reader.origin == "server1"
+    assert not reader.find_name("bot9")
+
+def test_same_seq_from_another_origin_wins(files):
+    local, other, remote = files
+    status = writer(local, "server1", ["bot1"])
+    status.save()
+    publish(local, other)
+    publish(local, remote)
+    reader = InstancesStatus(str(remote))
+    # Both save seq 2 at the same time, the file of server2 is the one that stays
+    status.save()
+    concurrent = writer(other, "server2", ["bot2"])
+    concurrent.save()
+    assert json.loads(local.read_text())["seq"] == json.loads(other.read_text())["seq"] == 2
+    publish(local, remote)
+    assert reader.has_new_status()
+    publish(other, remote)
+    assert reader.has_new_status()
+    assert reader.origin == "server2"
+
+def test_reset_starts_a_new_sequence(files):
+    local, _, remote = files
+    status = writer(local, "server1", ["bot1"])
+    for _ in range(50):
+        status.save()
+    publish(local, remote)
+    reader = InstancesStatus(str(remote))
+    assert reader.status_seq == 50
+    # server1 is reinstalled, its status file starts again at seq 1
+    local.unlink()
+    fresh = writer(local, "server1", ["bot2"])
+    fresh.save()
+    assert fresh.status_seq == 1
+    publish(local, remote)
+    assert reader.has_new_status()
+    assert reader.status_seq == 1
+    assert reader.find_name("bot2")
+    fresh.save()
+    publish(local, remote)
+    assert reader.has_new_status()
+    assert reader.status_seq == 2
+
+def test_writer_continues_the_epoch_of_the_file(files):
+    local, _, _ = files
+    first = writer(local, "server1", ["bot1"])
+    first.save()
+    second = writer(local, "gui", ["bot1"])
+    second.save()
+    assert second.epoch == first.epoch
+    assert second.status_seq == 2
+    # The writer keeps its sequence if the file is deleted
+    local.unlink()
+    second.save()
+    assert json.loads(local.read_text())["seq"] == 3
+
+def test_status_without_seq_uses_mtime(files):
+    _, _, remote = files
+    write_json_atomic(remote, {"activate_ts": 1, "activate_pbname": "old", "instances": {}})
+    reader = InstancesStatus(str(remote))
+    assert not reader.has_new_status()
+    write_json_atomic(remote, {"activate_ts": 2, "activate_pbname": "old", "instances": {}})
+    os.utime(remote, (reader.status_ts + 10, reader.status_ts + 10))
+    assert reader.has_new_status()
+    assert reader.activate_ts == 2
@@ -0,0 +1,90 @@
+import configparser
+import json
+import os
+from pathlib import Path
+import pytest
+import pbgui_purefunc
+from pbgui_purefunc import migrate_symbols_from_ini, load_symbols_file, read_symbols_file, save_symbols_file, symbols_file
+
+@pytest.fixture
+def pbgdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pbgui_purefunc, "PBGDIR", tmp_path)
+    pbgui_purefunc.symbols_cache.clear()
+    pbgui_purefunc.ini_list_cache.clear()
+    Path("pbgui.ini").write_text(
+        "[main]\npbname = server1\n\n"
+        "[exchanges]\n"
+        "binance.swap = ['BTCUSDT', 'ETHUSDT']\n"
+        "binance.spot = [\"BTCUSDT\"]\n"
+        "bybit.swap = [\"XRPUSDT\"]\n")
+    return tmp_path
+
+def read_ini(path: Path):
+    pb_config = configparser.ConfigParser()
+    pb_config.read(path / "pbgui.ini")
+    return pb_config
+
+def age(file: Path):
+    """Older than MTIME_GRANULARITY, so the symbols cache trusts the mtime of the file"""
+    os.utime(file, (1700000000, 1700000000))
+
+def test_migrate_symbols(pbgdir):
+    migrate_symbols_from_ini()
+    assert json.loads(symbols_file("binance").read_text())["swap"] == ["BTCUSDT", "ETHUSDT"]
+    assert read_symbols_file("binance")["spot"] == ["BTCUSDT"]
+    assert read_symbols_file("bybit")["swap"] == ["XRPUSDT"]
+    assert "fetched_at" in read_symbols_file("bybit")
+    pb_config = read_ini(pbgdir)
+    assert not pb_config.has_section("exchanges")
+    assert pb_config.get("main", "pbname") == "server1"
+
+def test_symbols_file_wins_over_ini(pbgdir):
+    # Fetched by a newer version while an older one still wrote pbgui.ini
+    save_symbols_file("binance", swap=["SOLUSDT"])
+    migrate_symbols_from_ini()
+    symbols = read_symbols_file("binance")
+    assert symbols["swap"] == ["SOLUSDT"]
+    # Market types only in pbgui.ini are added
+    assert symbols["spot"] == ["BTCUSDT"]
+
+def test_section_is_kept_when_write_fails(pbgdir, monkeypatch):
+    write = pbgui_purefunc.write_json_atomic
+    def write_json_atomic(file, data, **kwargs):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(pbgui_purefunc, "write_json_atomic", write_json_atomic)
+    with pytest.raises(OSError):
+        migrate_symbols_from_ini()
+    assert read_ini(pbgdir).get("exchanges", "bybit.swap") == '["XRPUSDT"]'
+    # The next run migrates the section
+    monkeypatch.setattr(pbgui_purefunc, "write_json_atomic", write)
+    migrate_symbols_from_ini()
+    assert read_symbols_file("bybit")["swap"] == ["XRPUSDT"]
+    assert not read_ini(pbgdir).has_section("exchanges")
+
+def test_second_run_changes_nothing(pbgdir):
+    migrate_symbols_from_ini()
+    files = {file: (file.stat().st_mtime_ns, file.stat().st_ino) for file in (pbgdir / "data/symbols").iterdir()}
+    ini = (pbgdir / "pbgui.ini").stat()
+    assert load_symbols_file("binance")["swap"] == ["BTCUSDT", "ETHUSDT"]
+    migrate_symbols_from_ini()
+    assert {file: (file.stat().st_mtime_ns, file.stat().st_ino) for file in (pbgdir / "data/symbols").iterdir()} == files
+    assert (pbgdir / "pbgui.ini").stat().st_mtime_ns == ini.st_mtime_ns
+
+def test_unknown_options_are_dropped(pbgdir):
+    with open(pbgdir / "pbgui.ini", "a") as f:
+        f.write("timestamp = 1700000000\nkucoin.futures = [\"BTCUSDT\"]\n")
+    migrate_symbols_from_ini()
+    assert sorted(file.name for file in (pbgdir / "data/symbols").iterdir()) == ["binance.json", "bybit.json"]
+    assert not read_ini(pbgdir).has_section("exchanges")
+
+def test_read_symbols_file_cache(pbgdir):
+    save_symbols_file("okx", swap=["BTCUSDT"])
+    # Rewritten with the same size right after the first write, the new symbols are read
+    assert read_symbols_file("okx")["swap"] == ["BTCUSDT"]
+    save_symbols_file("okx", swap=["ETHUSDT"])
+    assert read_symbols_file("okx")["swap"] == ["ETHUSDT"]
+    age(symbols_file("okx"))
+    symbols = read_symbols_file("okx")
+    assert read_symbols_file("okx") is symbols
+    assert read_symbols_file("missing") == {}
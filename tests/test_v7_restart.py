@@ -0,0 +1,72 @@
+import copy
+import pytest
+from PBRun import v7_restart_required, normalize_v7_config, config_diff
+
+PATH = "/pb/run_v7/bot1"
+
+CONFIG = {
+    "pbgui": {"version": 3, "enabled_on": "server1", "note": "", "dynamic_ignore": False, "market_cap": 0, "vol_mcap": 10.0},
+    "live": {"user": "bot1", "leverage": 10, "ignored_coins": {"long": [], "short": []},
+             "coin_flags": {"BTC": f'-lm n -lc {PATH}/BTC.json'}},
+    "bot": {"long": {"total_wallet_exposure_limit": 1.0}, "short": {"total_wallet_exposure_limit": 0.0}},
+    "backtest": {"start_date": "2024-01-01"},
+    "optimize": {"iters": 1000},
+}
+
+def changed(**changes):
+    """A copy of CONFIG with keys like live__leverage set to new values"""
+    config = copy.deepcopy(CONFIG)
+    for key, value in changes.items():
+        *parents, last = key.split("__")
+        section = config
+        for parent in parents:
+            section = section[parent]
+        section[last] = value
+    return config
+
+def test_config_diff():
+    assert config_diff(CONFIG, copy.deepcopy(CONFIG)) == []
+    new = changed(live__leverage=5, bot__long__total_wallet_exposure_limit=1.5)
+    new["live"]["new_key"] = 1
+    del new["optimize"]
+    assert config_diff(CONFIG, new) == ["bot.long.total_wallet_exposure_limit", "live.leverage", "live.new_key", "optimize"]
+
+def test_normalize_v7_config():
+    old = changed(live__coin_flags={"BTC": "-lm n -lc /old/BTC.json"}, pbgui__dynamic_ignore=True)
+    normalized = normalize_v7_config(old, PATH)
+    assert normalized["live"]["coin_flags"] == {"BTC": f'-lm n -lc {PATH}/BTC.json'}
+    assert normalized["live"]["ignored_coins"] == f'{PATH}/ignored_coins.json'
+    # The config itself is not modified
+    assert old["live"]["coin_flags"] == {"BTC": "-lm n -lc /old/BTC.json"}
+
+@pytest.mark.parametrize("new, restart", [
+    # Sections passivbot does not read
+    (changed(pbgui__note="new note"), False),
+    (changed(pbgui__version=4), False),
+    (changed(pbgui__market_cap=100), False),
+    (changed(backtest__start_date="2025-01-01"), False),
+    (changed(optimize__iters=5000), False),
+    # Everything passivbot reads at start
+    (changed(live__coin_flags={"BTC": f'-lm gs -lc {PATH}/BTC.json'}), True),
+    (changed(live__coin_flags={"BTC": f'-lm n -lc {PATH}/BTC.json', "ETH": "-lm n"}), True),
+    (changed(live__leverage=5), True),
+    (changed(live__ignored_coins={"long": ["DOGE"], "short": []}), True),
+    (changed(bot__long__total_wallet_exposure_limit=1.5), True),
+    (changed(pbgui__dynamic_ignore=True), True),
+])
+def test_v7_restart_required(new, restart):
+    keys, required = v7_restart_required(CONFIG, new, PATH)
+    assert keys
+    assert required == restart
+
+def test_dynamic_ignore_reloads_ignored_coins():
+    # With dynamic_ignore passivbot reads ignored_coins.json while running
+    old = changed(pbgui__dynamic_ignore=True)
+    new = changed(pbgui__dynamic_ignore=True, pbgui__market_cap=100, live__ignored_coins={"long": ["DOGE"], "short": []})
+    assert v7_restart_required(old, new, PATH) == (["pbgui.market_cap"], False)
+
+def test_unchanged_config():
+    assert v7_restart_required(CONFIG, copy.deepcopy(CONFIG), PATH) == ([], False)
+    # Only the -lc path differs, RunV7.load writes the same config
+    new = changed(live__coin_flags={"BTC": "-lm n -lc /other/BTC.json"})
+    assert v7_restart_required(CONFIG, new, PATH) == ([], False)